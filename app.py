@@ -6,21 +6,30 @@ Run with: python3 -m streamlit run app.py
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.patches as mpatches
 import seaborn as sns
-from sklearn.model_selection import train_test_split
 from dotenv import load_dotenv
 import os
 
-from src.data_loader import load_data, get_feature_lists
-from src.pipeline import create_pipeline
-from src.evaluation import evaluate_model, plot_confusion_matrix
-from src.agent import build_agent_graph
+from src.data_loader import load_data, get_feature_lists, unknown_categories
+from src.overview import get_overview
+from src.figure_cache import cached_png, render_all
+from src.jobs import get_job_manager
+from src.training import STRATIFIED_SPLIT, cached_split
+from src.fast_inference import get_fast_scorer
+from src.tuning import SEARCH_SPACES
+from src.evaluation import evaluate_model, plot_confusion_matrix, threshold_analysis
+from src.agent import get_agent_graph, agent_config, warm_up
+from src.model_registry import load_model, list_models, promote_model
 
 # Load environment variables
 load_dotenv()
 
+# The strategy database loads on first use. Set CHURNIQ_WARM_UP=1 to load it at boot instead.
+if os.environ.get("CHURNIQ_WARM_UP") == "1":
+    warm_up()
+
 # ── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
     page_title="ChurnIQ – Player Churn Prediction",
@@ -264,6 +273,152 @@ if 'df' not in st.session_state:
 
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# OVERVIEW CHARTS
+# Drawn in background threads by src/figure_cache.py, so they build a
+# matplotlib Figure directly instead of using pyplot.
+# ══════════════════════════════════════════════════════════════════════════════
+def chart_style(ax):
+    ax.set_facecolor('#0F0F1A')
+    ax.tick_params(colors='#9CA3AF', labelsize=11)
+    for spine in ax.spines.values():
+        spine.set_edgecolor('#2D2D4E')
+
+
+def draw_churn_donut(overview):
+    churn_count, retain_count = overview['churn_count'], overview['retain_count']
+    fig = Figure(figsize=(5, 4.5), facecolor='#0F0F1A')
+    ax = fig.subplots()
+    ax.set_facecolor('#0F0F1A')
+    ax.pie(
+        [retain_count, churn_count],
+        colors=['#10B981', '#EF4444'],
+        startangle=90,
+        wedgeprops=dict(width=0.52, edgecolor='#0F0F1A', linewidth=2.5)
+    )
+    ax.text(0, 0.05, f"{overview['churn_rate'] * 100:.1f}%", ha='center', va='center',
+            fontsize=20, fontweight='bold', color='#E2E8F0')
+    ax.text(0, -0.22, "Churn", ha='center', va='center',
+            fontsize=12, color='#9CA3AF')
+    patches = [mpatches.Patch(color='#10B981', label=f'Retained  ({retain_count:,})'),
+               mpatches.Patch(color='#EF4444', label=f'Churn  ({churn_count:,})')]
+    ax.legend(handles=patches, loc='lower center', ncol=2, frameon=False,
+              labelcolor='#9CA3AF', fontsize=12, bbox_to_anchor=(0.5, -0.08))
+    ax.set_title("Churn Distribution", color='#E2E8F0', fontsize=15, fontweight='600', pad=14)
+    fig.tight_layout()
+    return fig
+
+
+def draw_histogram(overview, column, color, title, xlabel, height):
+    # Draws the pre-binned counts; looks exactly like ax.hist on the raw column
+    histogram = overview['histograms'][column]
+    fig = Figure(figsize=(5, height), facecolor='#0F0F1A')
+    ax = fig.subplots()
+    chart_style(ax)
+    ax.hist(histogram['edges'][:-1], bins=histogram['edges'], weights=histogram['counts'],
+            color=color, edgecolor='#0F0F1A', alpha=0.9)
+    ax.set_title(title, color='#E2E8F0', fontsize=15, fontweight='600')
+    ax.set_xlabel(xlabel, color='#9CA3AF', fontsize=12)
+    ax.set_ylabel("Number of Players", color='#9CA3AF', fontsize=12)
+    fig.tight_layout()
+    return fig
+
+
+def draw_correlation(overview):
+    fig = Figure(figsize=(12, 5), facecolor='#0F0F1A')
+    ax = fig.subplots()
+    ax.set_facecolor('#0F0F1A')
+    sns.heatmap(overview['correlation'], annot=True, fmt='.2f', cmap='coolwarm',
+                linewidths=0.6, linecolor='#1E293B',
+                annot_kws={"size": 11, "color": "#E2E8F0", "weight": "500"},
+                ax=ax, cbar_kws={"shrink": 0.8})
+    ax.tick_params(colors='#9CA3AF', labelsize=11)
+    ax.set_title("Pearson Correlation between Features and Churn",
+                 color='#E2E8F0', fontsize=13, fontweight='600', pad=14)
+    fig.tight_layout()
+    return fig
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TRAINING JOBS
+# ══════════════════════════════════════════════════════════════════════════════
+ALGORITHMS = ["LogisticRegression", "DecisionTree", "RandomForest", "HistGradientBoosting"]
+
+STATUS_ICONS = {'queued': '🕒', 'running': '⏳', 'done': '✅', 'failed': '❌', 'cancelled': '🚫'}
+
+
+def use_trained_model(job, df):
+    """ Makes a finished job's model the one this session predicts with. """
+    st.session_state['pipeline'] = job.pipeline
+    st.session_state['model_info'] = job.model_info
+    st.session_state['trained_job'] = job.job_id
+    # Compile the fast single-player scorer now (checked against predict_proba)
+    _, X_test, _, _ = cached_split(df, job.test_size, method=job.split)
+    get_fast_scorer(job.pipeline, check_rows=X_test.head(200))
+
+
+def training_jobs_panel(df, refreshing=False):
+    """ Progress of this session's training jobs, plus a comparison of the finished ones. """
+    manager = get_job_manager()
+    jobs = [job for job in map(manager.get, st.session_state.get('training_jobs', [])) if job is not None]
+    if len(jobs) == 0:
+        return
+    if refreshing and all(job.finished for job in jobs):
+        # Everything is done: rerun the whole page once, which also stops the refreshing
+        st.rerun()
+
+    # The model the user clicked "Train" for is adopted as soon as it is ready
+    awaited = manager.get(st.session_state['awaited_job']) if 'awaited_job' in st.session_state else None
+    if awaited is not None and awaited.finished:
+        del st.session_state['awaited_job']
+        if awaited.status == 'done' and awaited.data_fingerprint == df.attrs.get('fingerprint'):
+            use_trained_model(awaited, df)
+        st.rerun()
+
+    st.markdown('<div class="sec-hdr">🏃 Training Jobs</div>', unsafe_allow_html=True)
+    for job in reversed(jobs[-8:]):
+        bar_col, cancel_col = st.columns([6, 1])
+        with bar_col:
+            label = f"{STATUS_ICONS[job.status]} {job.model_type} — {job.stage} ({job.elapsed_seconds:.1f}s)"
+            if job.history:
+                latest = job.history[-1]
+                label += " · " + ", ".join(f"{name} {value:.3f}" if isinstance(value, float) else f"{name} {value}"
+                                           for name, value in latest.items())
+            st.progress(job.progress, text=label)
+            if job.error:
+                st.caption(f"⚠️ {job.error}")
+        with cancel_col:
+            if job.finished == False and st.button("✖ Cancel", key=f"cancel-job-{job.job_id}"):
+                manager.cancel(job.job_id)
+
+    finished = [job for job in jobs if job.status == 'done' and job.data_fingerprint == df.attrs.get('fingerprint')]
+    if len(finished) > 1:
+        st.dataframe(pd.DataFrame([
+            {'Model': job.model_type, 'Version': job.model_info['version'], **job.metrics,
+             'Train time (s)': round(job.elapsed_seconds, 1)}
+            for job in finished
+        ]), use_container_width=True, hide_index=True)
+        choices = {f"{job.model_info['version']} · {job.model_type}": job for job in finished}
+        pick_col, use_col = st.columns([4, 1])
+        with pick_col:
+            picked = st.selectbox("Model to predict with", list(choices), label_visibility="collapsed")
+        with use_col:
+            if st.button("Use this model", use_container_width=True):
+                use_trained_model(choices[picked], df)
+                st.rerun()
+
+
+def show_training_jobs(df):
+    """ Shows the jobs panel; while jobs are running it refreshes itself every second. """
+    manager = get_job_manager()
+    running = any(job is not None and job.finished == False
+                  for job in map(manager.get, st.session_state.get('training_jobs', [])))
+    if running:
+        st.fragment(run_every=1.0)(training_jobs_panel)(df, refreshing=True)
+    else:
+        training_jobs_panel(df)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # LANDING PAGE
 # ══════════════════════════════════════════════════════════════════════════════
@@ -377,6 +532,16 @@ def show_landing():
 def show_dashboard(df):
     numerical_features, categorical_features = get_feature_lists()
 
+    # ── Registered model ──────────────────────────────────────────────────────
+    # Sessions start with the promoted (or latest) registered model, so nobody
+    # has to retrain before predicting. Loaded models are shared across sessions.
+    if 'pipeline' not in st.session_state:
+        registered_pipeline, registered_info = load_model('default')
+        if registered_pipeline is not None \
+                and registered_info['features'] == {"numerical": numerical_features, "categorical": categorical_features}:
+            st.session_state['pipeline'] = registered_pipeline
+            st.session_state['model_info'] = registered_info
+
     # ── Top bar ───────────────────────────────────────────────────────────────
     col_title, col_btn = st.columns([5, 1])
     with col_title:
@@ -387,10 +552,19 @@ def show_dashboard(df):
         if st.button("🔄  New Dataset", use_container_width=True):
             st.session_state['df'] = None
             st.session_state.pop('pipeline', None)
+            st.session_state.pop('model_info', None)
+            st.session_state.pop('trained_job', None)
+            st.session_state.pop('awaited_job', None)
             st.rerun()
 
     st.markdown("<hr style='border-color:#2D2D4E; margin:0.5rem 0 1.5rem 0;'>", unsafe_allow_html=True)
 
+    # Category values the fixed vocabulary doesn't know are kept; the models learn those columns from the data
+    for column, extra_values in unknown_categories(df).items():
+        st.warning(f"⚠️ **{column}** has values outside the expected categories "
+                   f"({', '.join(map(str, extra_values[:5]))}{', …' if len(extra_values) > 5 else ''}). "
+                   f"They are kept, and models learn this column's categories from the data.")
+
     # ── Tabs ──────────────────────────────────────────────────────────────────
     tab1, tab2, tab3 = st.tabs(["📊   Dataset Overview", "🧠   Model Training", "🔮   Predict Churn"])
 
@@ -398,20 +572,22 @@ def show_dashboard(df):
     # TAB 1 — DATASET OVERVIEW
     # ════════════════════════════════════════════════════
     with tab1:
-        churn_count  = int(df['Churn'].sum())
-        retain_count = int((df['Churn'] == 0).sum())
-        churn_pct    = churn_count / len(df) * 100
+        # Every number and chart below comes from one cached pass over the data
+        overview     = get_overview(df)
+        churn_count  = overview['churn_count']
+        retain_count = overview['retain_count']
+        churn_pct    = overview['churn_rate'] * 100
 
         # Stat grid
         st.markdown('<div class="sec-hdr">🔍 At a Glance</div>', unsafe_allow_html=True)
         st.markdown(f"""
         <div class="stat-grid">
             <div class="stat-card">
-                <div class="stat-num">{df.shape[0]:,}</div>
+                <div class="stat-num">{overview['rows']:,}</div>
                 <div class="stat-lbl">Total Players</div>
             </div>
             <div class="stat-card">
-                <div class="stat-num">{df.shape[1]}</div>
+                <div class="stat-num">{overview['columns']}</div>
                 <div class="stat-lbl">Features</div>
             </div>
             <div class="stat-card">
@@ -431,102 +607,44 @@ def show_dashboard(df):
         # Data preview
         st.markdown('<div class="sec-hdr">📄 Data Preview <span style="font-weight:400;color:#6B7280;font-size:0.85rem;">(first 10 rows)</span></div>',
                     unsafe_allow_html=True)
-        st.dataframe(df.head(10), use_container_width=True, hide_index=True)
+        st.dataframe(overview['preview'], use_container_width=True, hide_index=True)
 
         # Charts
         st.markdown('<div class="sec-hdr">📈 Distributions</div>', unsafe_allow_html=True)
         c1, c2 = st.columns(2, gap="medium")
 
-        def chart_style(ax):
-            ax.set_facecolor('#0F0F1A')
-            ax.tick_params(colors='#9CA3AF', labelsize=11)
-            for spine in ax.spines.values():
-                spine.set_edgecolor('#2D2D4E')
+        # Charts come from the figure cache; only charts never drawn before are rendered
+        fingerprint = df.attrs.get('fingerprint')
+        chart_key = (lambda *parts: (fingerprint, *parts)) if fingerprint else (lambda *parts: None)
+        charts = render_all({
+            'donut':      (chart_key('churn-donut'), draw_churn_donut, (overview,)),
+            'play_time':  (chart_key('histogram', 'PlayTimeHours'), draw_histogram,
+                           (overview, 'PlayTimeHours', '#6C63FF', "PlayTime Distribution", "Hours Played", 4.5)),
+            'sessions':   (chart_key('histogram', 'SessionsPerWeek'), draw_histogram,
+                           (overview, 'SessionsPerWeek', '#60A5FA', "Sessions Per Week", "Sessions", 4)),
+            'level':      (chart_key('histogram', 'PlayerLevel'), draw_histogram,
+                           (overview, 'PlayerLevel', '#F59E0B', "Player Level Distribution", "Player Level", 4)),
+            'correlation': (chart_key('correlation'), draw_correlation, (overview,)),
+        })
 
-        # Donut chart
         with c1:
-            fig, ax = plt.subplots(figsize=(5, 4.5), facecolor='#0F0F1A')
-            ax.set_facecolor('#0F0F1A')
-            wedges, _ = ax.pie(
-                [retain_count, churn_count],
-                colors=['#10B981', '#EF4444'],
-                startangle=90,
-                wedgeprops=dict(width=0.52, edgecolor='#0F0F1A', linewidth=2.5)
-            )
-            ax.text(0, 0.05, f"{churn_pct:.1f}%", ha='center', va='center',
-                    fontsize=20, fontweight='bold', color='#E2E8F0')
-            ax.text(0, -0.22, "Churn", ha='center', va='center',
-                    fontsize=12, color='#9CA3AF')
-            patches = [mpatches.Patch(color='#10B981', label=f'Retained  ({retain_count:,})'),
-                       mpatches.Patch(color='#EF4444', label=f'Churn  ({churn_count:,})')]
-            ax.legend(handles=patches, loc='lower center', ncol=2, frameon=False,
-                      labelcolor='#9CA3AF', fontsize=12, bbox_to_anchor=(0.5, -0.08))
-            ax.set_title("Churn Distribution", color='#E2E8F0', fontsize=15, fontweight='600', pad=14)
-            fig.tight_layout()
-            st.pyplot(fig, use_container_width=True)
-            plt.close(fig)
-
-        # Play time
+            st.image(charts['donut'], use_container_width=True)
         with c2:
-            fig2, ax2 = plt.subplots(figsize=(5, 4.5), facecolor='#0F0F1A')
-            chart_style(ax2)
-            ax2.hist(df['PlayTimeHours'], bins=30, color='#6C63FF', edgecolor='#0F0F1A', alpha=0.9)
-            ax2.set_title("PlayTime Distribution", color='#E2E8F0', fontsize=15, fontweight='600')
-            ax2.set_xlabel("Hours Played", color='#9CA3AF', fontsize=12)
-            ax2.set_ylabel("Number of Players", color='#9CA3AF', fontsize=12)
-            fig2.tight_layout()
-            st.pyplot(fig2, use_container_width=True)
-            plt.close(fig2)
+            st.image(charts['play_time'], use_container_width=True)
 
         c3, c4 = st.columns(2, gap="medium")
         with c3:
-            fig3, ax3 = plt.subplots(figsize=(5, 4), facecolor='#0F0F1A')
-            chart_style(ax3)
-            ax3.hist(df['SessionsPerWeek'], bins=20, color='#60A5FA', edgecolor='#0F0F1A', alpha=0.9)
-            ax3.set_title("Sessions Per Week", color='#E2E8F0', fontsize=15, fontweight='600')
-            ax3.set_xlabel("Sessions", color='#9CA3AF', fontsize=12)
-            ax3.set_ylabel("Number of Players", color='#9CA3AF', fontsize=12)
-            fig3.tight_layout()
-            st.pyplot(fig3, use_container_width=True)
-            plt.close(fig3)
-
+            st.image(charts['sessions'], use_container_width=True)
         with c4:
-            fig5, ax5 = plt.subplots(figsize=(5, 4), facecolor='#0F0F1A')
-            chart_style(ax5)
-            ax5.hist(df['PlayerLevel'], bins=25, color='#F59E0B', edgecolor='#0F0F1A', alpha=0.9)
-            ax5.set_title("Player Level Distribution", color='#E2E8F0', fontsize=15, fontweight='600')
-            ax5.set_xlabel("Player Level", color='#9CA3AF', fontsize=12)
-            ax5.set_ylabel("Number of Players", color='#9CA3AF', fontsize=12)
-            fig5.tight_layout()
-            st.pyplot(fig5, use_container_width=True)
-            plt.close(fig5)
+            st.image(charts['level'], use_container_width=True)
 
         # Correlation heatmap
         st.markdown('<div class="sec-hdr">🔗 Feature Correlation Matrix</div>', unsafe_allow_html=True)
-        num_df = df[numerical_features + ['Churn']].corr()
-        fig4, ax4 = plt.subplots(figsize=(12, 5), facecolor='#0F0F1A')
-        ax4.set_facecolor('#0F0F1A')
-        sns.heatmap(num_df, annot=True, fmt='.2f', cmap='coolwarm',
-                    linewidths=0.6, linecolor='#1E293B',
-                    annot_kws={"size": 11, "color": "#E2E8F0", "weight": "500"},
-                    ax=ax4, cbar_kws={"shrink": 0.8})
-        ax4.tick_params(colors='#9CA3AF', labelsize=11)
-        ax4.set_title("Pearson Correlation between Features and Churn",
-                      color='#E2E8F0', fontsize=13, fontweight='600', pad=14)
-        fig4.tight_layout()
-        st.pyplot(fig4, use_container_width=True)
-        plt.close(fig4)
+        st.image(charts['correlation'], use_container_width=True)
 
         # Column info
         st.markdown('<div class="sec-hdr">🗂 Column Summary</div>', unsafe_allow_html=True)
-        info_df = pd.DataFrame({
-            'Column':        df.columns,
-            'Data Type':     df.dtypes.astype(str).values,
-            'Non-Null Count': df.notnull().sum().values,
-            'Null Count':    df.isnull().sum().values,
-            'Unique Values': df.nunique().values
-        })
-        st.dataframe(info_df, use_container_width=True, hide_index=True)
+        st.dataframe(overview['column_summary'], use_container_width=True, hide_index=True)
 
     # ════════════════════════════════════════════════════
     # TAB 2 — MODEL TRAINING
@@ -538,8 +656,8 @@ def show_dashboard(df):
         with cfg1:
             model_type = st.selectbox(
                 "🤖 Algorithm",
-                ["LogisticRegression", "DecisionTree", "RandomForest"],
-                help="LogisticRegression: fast linear model · DecisionTree: interpretable rule-based model · RandomForest: powerful ensemble model"
+                ALGORITHMS,
+                help="LogisticRegression: fast linear model · DecisionTree: interpretable rule-based model · RandomForest: powerful ensemble model · HistGradientBoosting: fast boosted trees for large datasets"
             )
         with cfg2:
             test_size = st.slider("🔀 Test Split Size", 0.10, 0.40, 0.20, 0.05,
@@ -548,11 +666,32 @@ def show_dashboard(df):
             st.markdown("<br>", unsafe_allow_html=True)
             train_btn = st.button("🚀 Train", use_container_width=True)
 
+        opt1, opt2, opt3 = st.columns(3)
+        with opt1:
+            use_all_cores = st.checkbox("⚡ Use all CPU cores", value=True,
+                                        help="Build RandomForest trees in parallel on every core")
+        with opt2:
+            compact_features = st.checkbox("🗜️ Compact features", value=False,
+                                           help="float32 numbers; sparse one-hot columns for LogisticRegression, "
+                                                "category codes instead of one-hot columns for tree models")
+        with opt3:
+            use_sample = st.checkbox("🌊 Stream & sample", value=False,
+                                     help="Train out of core: stream the data in chunks, split by PlayerID hash "
+                                          "and fit on a stratified random sample (for datasets bigger than memory)")
+        sample_size = None
+        if use_sample:
+            sample_size = int(st.number_input("Training sample size (rows)", 1_000, 10_000_000, 100_000, 10_000))
+
+        compare_types = st.multiselect("📊 Also train for comparison", [t for t in ALGORITHMS if t != model_type],
+                                       help="These train in the background at the same time, "
+                                            "so you can compare them side by side")
+
         # Algorithm info
         algo_desc = {
             "LogisticRegression": "Finds a linear decision boundary separating churners from retained players. Fast, explainable, and works well on linearly separable data.",
             "DecisionTree": "Builds a tree of yes/no rules (max depth = 5) to classify players. Highly interpretable — great for explaining predictions.",
-            "RandomForest": "Builds an ensemble of multiple decision trees to improve accuracy and prevent overfitting. Powerful and robust, standard for ML."
+            "RandomForest": "Builds an ensemble of multiple decision trees to improve accuracy and prevent overfitting. Powerful and robust, standard for ML.",
+            "HistGradientBoosting": "Adds small trees one at a time, each correcting the previous ones. Bins numbers and splits on categories directly (no one-hot encoding), so it trains fast and stays compact on large datasets."
         }
         st.markdown(f'<div class="info-box">💡 <strong>{model_type}</strong> — {algo_desc[model_type]}</div>',
                     unsafe_allow_html=True)
@@ -560,18 +699,37 @@ def show_dashboard(df):
         st.markdown("<br>", unsafe_allow_html=True)
 
         if train_btn:
-            with st.spinner(f"⏳ Training {model_type}…"):
-                X = df.drop(['PlayerID', 'Churn', 'EngagementLevel'], axis=1, errors='ignore')
-                y = df['Churn']
-                X_train, X_test, y_train, y_test = train_test_split(
-                    X, y, test_size=test_size, random_state=42, stratify=y
-                )
-                pipeline = create_pipeline(numerical_features, categorical_features, model_type=model_type)
-                pipeline.fit(X_train, y_train)
-                metrics, y_pred = evaluate_model(pipeline, X_test, y_test)
-                st.session_state['pipeline'] = pipeline
-
-            st.success(f"✅ {model_type} trained on **{len(X_train):,}** samples · tested on **{len(X_test):,}** samples")
+            # Training runs in background worker processes (see src/jobs.py); the page stays usable
+            manager = get_job_manager()
+            session_jobs = st.session_state.setdefault('training_jobs', [])
+            for job_model_type in [model_type] + [t for t in compare_types if t != model_type]:
+                job_id = manager.submit(df, job_model_type, test_size, n_jobs=-1 if use_all_cores else None,
+                                        compact=compact_features, sample_size=sample_size)
+                session_jobs.append(job_id)
+                if job_model_type == model_type:
+                    # This one becomes the session's model when it finishes
+                    st.session_state['awaited_job'] = job_id
+
+        show_training_jobs(df)
+
+        trained_job = get_job_manager().get(st.session_state['trained_job']) if 'trained_job' in st.session_state else None
+        if trained_job is not None and trained_job.status == 'done' \
+                and trained_job.data_fingerprint == df.attrs.get('fingerprint'):
+            model_info = trained_job.model_info
+            _, X_test, _, y_test = cached_split(df, trained_job.test_size, method=trained_job.split)
+            # Probabilities are cached per model + test set, for the threshold analysis below
+            metrics, y_pred = evaluate_model(trained_job.pipeline, X_test, y_test,
+                                             data_key=(df.attrs.get('fingerprint'), trained_job.test_size,
+                                                       trained_job.split))
+
+            trained_rows = model_info.get('sample_rows', model_info['train_rows'])
+            st.success(f"✅ {trained_job.model_type} trained on **{trained_rows:,}** samples · "
+                       f"tested on **{len(X_test):,}** samples in {trained_job.elapsed_seconds:.1f}s "
+                       f"· saved as model **{model_info['version']}**")
+            if model_info.get('peak_memory_mb') is not None:
+                st.caption(f"🌊 Streamed out of core: sample of {trained_rows:,} / {model_info['train_rows']:,} "
+                           f"training rows · wall time {model_info['wall_seconds']:.1f}s · "
+                           f"worker peak memory {model_info['peak_memory_mb']:.0f} MB")
 
             # Metrics
             st.markdown('<div class="sec-hdr">📊 Evaluation Results</div>', unsafe_allow_html=True)
@@ -600,9 +758,8 @@ def show_dashboard(df):
             st.markdown('<div class="sec-hdr">🟪 Confusion Matrix</div>', unsafe_allow_html=True)
             cm_col, guide_col = st.columns([1, 1], gap="large")
             with cm_col:
-                fig_cm = plot_confusion_matrix(y_test, y_pred)
-                st.pyplot(fig_cm, use_container_width=True)
-                plt.close(fig_cm)
+                st.image(cached_png((model_info['version'], model_info['created_at'], 'confusion-matrix'),
+                                    plot_confusion_matrix, y_test, y_pred), use_container_width=True)
             with guide_col:
                 st.markdown("""
                 <div class="info-box" style="margin-top:1rem; line-height:2;">
@@ -614,6 +771,113 @@ def show_dashboard(df):
                     A high <strong>Recall</strong> means fewer missed churners.
                 </div>""", unsafe_allow_html=True)
 
+        # Threshold analysis for the current model, on the test set it was evaluated on
+        current_info = st.session_state.get('model_info')
+        if ('pipeline' in st.session_state and current_info
+                and current_info.get('data_fingerprint') == df.attrs.get('fingerprint')
+                and current_info.get('test_size') is not None):
+            with st.expander("🎯 Threshold Analysis (precision / recall / cost at every threshold)"):
+                tc1, tc2 = st.columns(2)
+                with tc1:
+                    fp_cost = st.number_input("💸 Cost of a false alarm (wasted retention offer)", 0.0, 1000.0, 1.0, 0.5)
+                with tc2:
+                    fn_cost = st.number_input("🚪 Cost of a missed churner (lost player)", 0.0, 1000.0, 5.0, 0.5)
+
+                eval_test_size = current_info['test_size']
+                eval_split = current_info.get('split', STRATIFIED_SPLIT)
+                _, X_eval, _, y_eval = cached_split(df, eval_test_size, method=eval_split)
+                analysis = threshold_analysis(st.session_state['pipeline'], X_eval, y_eval, fp_cost, fn_cost,
+                                              data_key=(df.attrs.get('fingerprint'), eval_test_size, eval_split))
+                best = analysis['best_cost_threshold']
+                st.markdown(f"""
+                <div class="metric-row">
+                    <div class="metric-pill">
+                        <div class="metric-val">{best['Threshold']:.2f}</div>
+                        <div class="metric-lbl">Lowest-cost threshold</div>
+                    </div>
+                    <div class="metric-pill">
+                        <div class="metric-val">{best['Precision']:.1%}</div>
+                        <div class="metric-lbl">Precision there</div>
+                    </div>
+                    <div class="metric-pill">
+                        <div class="metric-val">{best['Recall']:.1%}</div>
+                        <div class="metric-lbl">Recall there</div>
+                    </div>
+                    <div class="metric-pill">
+                        <div class="metric-val">{analysis['Average Precision']:.1%}</div>
+                        <div class="metric-lbl">Average Precision</div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+
+                curve = analysis['curve']
+                ch1, ch2 = st.columns(2)
+                with ch1:
+                    st.caption("Precision / Recall / F1 by threshold")
+                    st.line_chart(curve.set_index('Threshold')[['Precision', 'Recall', 'F1']])
+                with ch2:
+                    st.caption(f"ROC curve (AUC {analysis['AUC']:.3f})")
+                    st.line_chart(curve.rename(columns={'Recall': 'True Positive Rate'})
+                                  .set_index('FPR')[['True Positive Rate']])
+
+        # Hyperparameter search
+        with st.expander("🔬 Hyperparameter Search (successive halving, all CPU cores)"):
+            hp1, hp2, hp3 = st.columns([2, 2, 1], gap="medium")
+            with hp1:
+                tune_types = st.multiselect("Algorithms to tune", list(SEARCH_SPACES), default=list(SEARCH_SPACES))
+            with hp2:
+                tune_budget = st.slider("⏱ Time budget (seconds)", 30, 1800, 300, 30,
+                                        help="No new algorithm is started once the budget is used up")
+            with hp3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                tune_btn = st.button("🔬 Search", use_container_width=True)
+
+            if tune_btn and tune_types:
+                # The search runs as a background job (see src/jobs.py): progress and
+                # cancel are in the Training Jobs panel, and the winner becomes the
+                # session's model when it finishes
+                job_id = get_job_manager().submit_tuning(df, tune_types, test_size, tune_budget)
+                st.session_state.setdefault('training_jobs', []).append(job_id)
+                st.session_state['awaited_job'] = job_id
+                st.rerun()
+
+            tuned_jobs = [job for job in map(get_job_manager().get, st.session_state.get('training_jobs', []))
+                          if job is not None and job.tuning_results is not None
+                          and job.data_fingerprint == df.attrs.get('fingerprint')]
+            if tuned_jobs:
+                tuned = tuned_jobs[-1]
+                tuning_results = tuned.tuning_results
+                st.dataframe(tuning_results.astype({'Best Settings': str}) if 'Best Settings' in tuning_results
+                             else tuning_results, use_container_width=True, hide_index=True)
+                st.success(f"🏆 Best: **{tuned.model_type}** · test AUC {tuned.metrics['AUC']:.1%} "
+                           f"· saved as model **{tuned.model_info['version']}**")
+
+        # Registry
+        registered_models = list_models()
+        if registered_models:
+            with st.expander(f"📦 Model Registry ({len(registered_models)} saved models)"):
+                registry_df = pd.DataFrame([{
+                    'Version':   m['version'],
+                    'Promoted':  '⭐' if m['promoted'] else '',
+                    'Algorithm': m['model_type'],
+                    'AUC':       m['metrics'].get('AUC'),
+                    'Recall':    m['metrics'].get('Recall'),
+                    'Created':   m['created_at'],
+                } for m in reversed(registered_models)])
+                st.dataframe(registry_df, use_container_width=True, hide_index=True)
+
+                reg1, reg2, reg3 = st.columns([2, 1, 1], gap="medium")
+                with reg1:
+                    chosen_version = st.selectbox("Version", registry_df['Version'], label_visibility="collapsed")
+                with reg2:
+                    if st.button("📥 Use Model", use_container_width=True):
+                        st.session_state['pipeline'], st.session_state['model_info'] = load_model(chosen_version)
+                        st.success(f"Using model {chosen_version} for predictions.")
+                with reg3:
+                    if st.button("⭐ Promote", use_container_width=True):
+                        promote_model(chosen_version)
+                        st.rerun()
+
     # ════════════════════════════════════════════════════
     # TAB 3 — PREDICTION
     # ════════════════════════════════════════════════════
@@ -624,6 +888,11 @@ def show_dashboard(df):
                 ⚠️ &nbsp; Train a model first in the <strong>Model Training</strong> tab before predicting.
             </div>""", unsafe_allow_html=True)
         else:
+            model_info = st.session_state.get('model_info')
+            if model_info:
+                st.markdown(f'<div class="info-box">📦 Using model <strong>{model_info["version"]}</strong> '
+                            f'({model_info["model_type"]}, trained {model_info["created_at"]})</div>',
+                            unsafe_allow_html=True)
             st.markdown('<div class="sec-hdr">🎯 Player Profile Input</div>', unsafe_allow_html=True)
             st.markdown("<div style='color:#9CA3AF; font-size:14px; margin-bottom:1rem;'>Fill in the player's details below to get a real-time churn probability prediction.</div>",
                         unsafe_allow_html=True)
@@ -632,10 +901,10 @@ def show_dashboard(df):
                 r1c1, r1c2, r1c3, r1c4 = st.columns(4, gap="medium")
                 with r1c1:
                     age       = st.number_input("🎂 Age", 10, 100, 25)
-                    gender    = st.selectbox("👤 Gender", df['Gender'].unique())
+                    gender    = st.selectbox("👤 Gender", list(df['Gender'].unique()))
                 with r1c2:
-                    location  = st.selectbox("🌍 Location", df['Location'].unique())
-                    genre     = st.selectbox("🎮 Game Genre", df['GameGenre'].unique())
+                    location  = st.selectbox("🌍 Location", list(df['Location'].unique()))
+                    genre     = st.selectbox("🎮 Game Genre", list(df['GameGenre'].unique()))
                 with r1c3:
                     playtime  = st.number_input("⏱ PlayTime (Hours)", 0.0, 50.0, 10.0, step=0.5)
                     sessions  = st.number_input("📅 Sessions/Week", 0, 30, 5)
@@ -645,7 +914,7 @@ def show_dashboard(df):
 
                 r2c1, r2c2, r2c3, _ = st.columns(4, gap="medium")
                 with r2c1:
-                    difficulty  = st.selectbox("🎯 Difficulty", df['GameDifficulty'].unique())
+                    difficulty  = st.selectbox("🎯 Difficulty", list(df['GameDifficulty'].unique()))
                 with r2c2:
                     achievements = st.number_input("🏆 Achievements", 0, 200, 5)
                 with r2c3:
@@ -665,8 +934,8 @@ def show_dashboard(df):
                 })
                 pipe = st.session_state['pipeline']
                 
-                # Setup Agent
-                agent = build_agent_graph(pipe)
+                # Setup Agent (compiled once per process; the pipeline travels in the run config)
+                agent = get_agent_graph()
                 
                 initial_state = {
                     "player_data": input_df.iloc[0].to_dict(),
@@ -686,28 +955,32 @@ def show_dashboard(df):
                     st.info("🧠 Initializing agent risk prediction...")
                     
                 final_state = initial_state
-                for event in agent.stream(initial_state):
+                for event in agent.stream(initial_state, config=agent_config(pipe)):
                     for key, value in event.items():
                         if key == "predict_risk":
                             with progress_container.container():
                                 proba = value.get("churn_proba", 0)
-                                is_churn = value.get("is_churn", False)
-                                risk_str = "HIGH" if is_churn else "LOW"
-                                stat_color = "red" if is_churn else "green"
+                                band = value.get("risk_band", "low")
+                                risk_str = band.upper()
+                                stat_color = {"high": "red", "medium": "orange"}.get(band, "green")
                                 st.warning(f"🔍 **Risk Predicted:** :{stat_color}[{risk_str} ({proba:.1%})]")
-                                if is_churn:
+                                if band != "low":
                                     st.info("📚 Consulting FAISS knowledge base for strategies...")
                         elif key == "retrieve_knowledge":
                             with progress_container.container():
                                 strats = value.get("retrieved_strategies", [])
                                 st.success(f"✅ Extracted {len(strats)} relevant strategies.")
-                                st.info("✍️ Synthesizing retention plan using LLM...")
+                                if value.get("risk_band") == "high":
+                                    st.info("✍️ Synthesizing retention plan using LLM...")
                         elif key == "generate_plan":
                             with progress_container.container():
                                 if value.get("error"):
                                     st.error(f"❌ {value['error']}")
                                 else:
                                     st.success("✨ Retention blueprint finalized!")
+                        elif key == "summarize_strategies":
+                            with progress_container.container():
+                                st.success("✨ Medium risk — strategy-only plan prepared (no LLM call).")
                         final_state = value
                 
                 st.markdown("<br>", unsafe_allow_html=True)
@@ -734,7 +1007,7 @@ def show_dashboard(df):
                     <div class="result-high">
                         <div style="font-size:3rem; margin-bottom:0.5rem;">⚠️</div>
                         <div style="font-size:1.5rem; font-weight:800; color:#FCA5A5; margin-bottom:0.5rem;">
-                            High Churn Risk
+                            {"Medium" if final_state.get("risk_band") == "medium" else "High"} Churn Risk
                         </div>
                         <div style="font-size:3rem; font-weight:800; color:#EF4444; line-height:1;">
                             {final_state.get('churn_proba'):.1%}
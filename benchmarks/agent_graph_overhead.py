@@ -0,0 +1,84 @@
+"""
+agent_graph_overhead.py
+-----------------------
+Microbenchmark: how much per-request overhead does the LangGraph agent add?
+
+- "compile per request" : what app.py used to do — build and compile a new
+                          StateGraph on every form submission
+- "compiled once"       : reuse the shared compiled graph and pass the
+                          pipeline in the run config
+
+A tiny fake pipeline that always answers "safe" is used, so we measure the
+graph itself and not the model, the RAG search or the LLM.
+
+Run it from the project root:
+    python benchmarks/agent_graph_overhead.py --requests 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agent import compile_agent_graph, get_agent_graph, agent_config
+
+
+class SafePlayerPipeline:
+    """ Stands in for a trained pipeline: every player gets a 10% churn probability. """
+
+    def predict_proba(self, data_frame):
+        return np.tile([0.9, 0.1], (len(data_frame), 1))
+
+
+PLAYER = {
+    'Age': 25, 'Gender': 'Male', 'Location': 'USA', 'GameGenre': 'RPG',
+    'PlayTimeHours': 10.0, 'InGamePurchases': 0, 'GameDifficulty': 'Easy',
+    'SessionsPerWeek': 5, 'AvgSessionDurationMinutes': 30,
+    'PlayerLevel': 10, 'AchievementsUnlocked': 5
+}
+
+
+def initial_state():
+    return {
+        "player_data": dict(PLAYER), "churn_proba": 0.0, "is_churn": False,
+        "retrieved_strategies": [], "structured_evaluation": {}, "error": ""
+    }
+
+
+def time_requests(run_one_request, number_of_requests):
+    """ Returns the average milliseconds per request. """
+    run_one_request()   # warm-up
+    start = time.perf_counter()
+    for _ in range(number_of_requests):
+        run_one_request()
+    return (time.perf_counter() - start) / number_of_requests * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-request agent graph overhead.")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    pipeline = SafePlayerPipeline()
+    config = agent_config(pipeline)
+
+    def compile_per_request():
+        compile_agent_graph().invoke(initial_state(), config=config)
+
+    def compiled_once():
+        get_agent_graph().invoke(initial_state(), config=config)
+
+    before = time_requests(compile_per_request, args.requests)
+    after = time_requests(compiled_once, args.requests)
+
+    print(f"compile per request : {before:8.3f} ms / request")
+    print(f"compiled once       : {after:8.3f} ms / request")
+    print(f"speed-up            : {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+coalescer_throughput.py
+-----------------------
+Throughput of single-player predictions at different concurrency levels,
+with and without the request coalescer (src/coalescer.py):
+- direct    : every thread scores its own players one at a time
+- coalesced : threads submit to the shared coalescer, which scores
+              concurrent requests as one batch
+
+Run it from the project root:
+    python benchmarks/coalescer_throughput.py data/online_gaming_behavior_dataset.csv --model-type HistGradientBoosting
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.coalescer import RequestCoalescer
+from src.data_loader import load_data
+from src.fast_inference import churn_probability
+from src.training import train_model
+
+
+def run_threads(score_one, players, concurrency, predictions_per_thread):
+    """ Runs 'concurrency' threads that each make predictions. Returns (predictions/s, p50 ms, p99 ms). """
+    latencies = [[] for _ in range(concurrency)]
+
+    def worker(index):
+        for i in range(predictions_per_thread):
+            player = players[(index * predictions_per_thread + i) % len(players)]
+            start = time.perf_counter()
+            score_one(player)
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    all_latencies = np.concatenate(latencies) * 1000
+    p50, p99 = np.percentile(all_latencies, [50, 99])
+    return len(all_latencies) / seconds, p50, p99
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction throughput with and without the coalescer.")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--model-type", default="LogisticRegression")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16, 64])
+    parser.add_argument("--predictions", type=int, default=2000, help="Predictions per concurrency level")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    df = load_data(args.dataset)
+    if df is None:
+        raise SystemExit(f"Could not load {args.dataset}")
+    pipeline, X_train, X_test, y_train, y_test = train_model(df, args.model_type)
+    players = X_test.head(2000).to_dict('records')
+
+    results = []
+    for concurrency in args.concurrency:
+        per_thread = max(1, args.predictions // concurrency)
+        direct = run_threads(lambda player: churn_probability(pipeline, player), players, concurrency, per_thread)
+
+        coalescer = RequestCoalescer(pipeline, max_wait_seconds=args.max_wait_ms / 1000)
+        coalesced = run_threads(coalescer.score, players, concurrency, per_thread)
+
+        for name, (throughput, p50, p99) in [("direct", direct), ("coalesced", coalesced)]:
+            results.append({"Concurrency": concurrency, "Mode": name, "Predictions/s": round(throughput),
+                            "p50 (ms)": round(p50, 3), "p99 (ms)": round(p99, 3),
+                            "Avg batch": coalescer.stats()["average_batch_size"] if name == "coalesced" else 1})
+
+    print(f"{args.model_type}:")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
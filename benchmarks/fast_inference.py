@@ -0,0 +1,78 @@
+"""
+fast_inference.py
+-----------------
+Checks and measures the compiled single-player scoring path
+(src/fast_inference.py) for every supported model type:
+- parity  : the largest difference from pipeline.predict_proba on the test set
+- latency : microseconds per single-player prediction, pandas path vs fast path
+
+The script exits with an error if any model fails the parity check, so it
+doubles as a test.
+
+Run it from the project root:
+    python benchmarks/fast_inference.py data/online_gaming_behavior_dataset.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_data
+from src.fast_inference import compile_pipeline, verify_parity
+from src.training import train_model
+
+# (model type, compact preprocessing)
+CONFIGURATIONS = [
+    ("LogisticRegression", False), ("LogisticRegression", True), ("SGDLogistic", False),
+    ("DecisionTree", False), ("DecisionTree", True), ("RandomForest", False), ("RandomForest", True),
+]
+
+
+def microseconds_per_call(function, arguments):
+    function(arguments[0])   # warm-up
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parity and latency of the fast inference path.")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--players", type=int, default=300, help="Single-player predictions to time")
+    args = parser.parse_args(argv)
+
+    df = load_data(args.dataset)
+    if df is None:
+        raise SystemExit(f"Could not load {args.dataset}")
+
+    results = []
+    for model_type, compact in CONFIGURATIONS:
+        pipeline, X_train, X_test, y_train, y_test = train_model(df, model_type, compact=compact)
+        scorer = compile_pipeline(pipeline)
+        ok, difference = verify_parity(pipeline, X_test, scorer)
+
+        records = X_test.head(args.players).to_dict('records')
+        pandas_us = microseconds_per_call(lambda record: pipeline.predict_proba(pd.DataFrame([record])), records)
+        fast_us = microseconds_per_call(scorer.churn_probability, records)
+
+        results.append({
+            'Model': model_type, 'Compact': compact, 'Parity': 'ok' if ok else 'FAILED',
+            'Max difference': f"{difference:.1e}",
+            'pandas path (µs)': round(pandas_us, 1), 'fast path (µs)': round(fast_us, 1),
+            'Speed-up': f"{pandas_us / fast_us:.0f}x",
+        })
+
+    table = pd.DataFrame(results)
+    print(table.to_string(index=False))
+    if (table['Parity'] != 'ok').any():
+        raise SystemExit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+import_time.py
+--------------
+Measures how long app.py takes to import its modules, and checks that the
+heavy embedding stack is NOT loaded just by opening the app.
+
+We can't simply "import app" (that would run the whole Streamlit page), so
+this script reads the import lines at the top of app.py and runs only those
+in a fresh Python process.
+
+Run it from the project root:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 2.5
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE_PATH = os.path.join(PROJECT_FOLDER, 'app.py')
+
+# app.py's imports must finish within this many seconds
+IMPORT_BUDGET_SECONDS = 5.0
+
+# These must only be loaded when a player actually needs strategies
+LAZY_MODULES = ['sentence_transformers', 'torch', 'langchain_huggingface', 'src.rag']
+
+
+def app_import_lines():
+    """ Returns the top-level import statements of app.py as source code. """
+    with open(APP_FILE_PATH) as file:
+        tree = ast.parse(file.read())
+    return [
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def measure_import_time():
+    """ Runs app.py's imports in a fresh interpreter and reports time + loaded modules. """
+    measuring_code = "\n".join([
+        "import json, sys, time",
+        "start = time.perf_counter()",
+        *app_import_lines(),
+        "elapsed = time.perf_counter() - start",
+        f"lazy = [name for name in {LAZY_MODULES!r} if name in sys.modules]",
+        "print(json.dumps({'seconds': elapsed, 'loaded_lazy_modules': lazy}))",
+    ])
+    completed = subprocess.run(
+        [sys.executable, "-c", measuring_code],
+        cwd=PROJECT_FOLDER, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check app.py's import-time budget.")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS,
+                        help="Maximum allowed import time in seconds")
+    args = parser.parse_args(argv)
+
+    result = measure_import_time()
+    print(f"app.py imports: {result['seconds']:.2f}s (budget {args.budget:.2f}s)")
+
+    failed = False
+    if result['seconds'] > args.budget:
+        print("❌ Over the import-time budget")
+        failed = True
+    if result['loaded_lazy_modules']:
+        print(f"❌ Loaded at import time but should be lazy: {', '.join(result['loaded_lazy_modules'])}")
+        failed = True
+    if not failed:
+        print("✅ Within budget, embeddings stack not loaded")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+model_benchmark.py
+------------------
+Compares every model type that create_pipeline can build:
+- fit time          : seconds to train on the training split
+- batch predict     : milliseconds to score the whole test split
+- single predict    : milliseconds to score ONE player (what the dashboard does)
+- model size        : bytes of the saved (joblib) pipeline
+- AUC               : so speed is never bought with a worse model
+
+The dataset can be replicated with --replicate to see how each model
+behaves at larger row counts.
+
+Run it from the project root:
+    python benchmarks/model_benchmark.py data/online_gaming_behavior_dataset.csv --replicate 3
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import joblib
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_data
+from src.training import split_features, train_pipeline
+
+MODEL_TYPES = ["LogisticRegression", "DecisionTree", "RandomForest", "HistGradientBoosting"]
+
+
+def saved_size_bytes(pipeline):
+    """ Size of the pipeline when saved with joblib, the same way the model registry saves it. """
+    buffer = io.BytesIO()
+    joblib.dump(pipeline, buffer)
+    return buffer.tell()
+
+
+def time_single_predictions(pipeline, X_test, repeats):
+    """ Average milliseconds to score one player at a time. """
+    rows = [X_test.iloc[[i % len(X_test)]] for i in range(repeats)]
+    pipeline.predict_proba(rows[0])   # warm-up
+    start = time.perf_counter()
+    for row in rows:
+        pipeline.predict_proba(row)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark_model(model_type, X_train, X_test, y_train, y_test, single_repeats, n_jobs):
+    start = time.perf_counter()
+    pipeline = train_pipeline(X_train, y_train, model_type, n_jobs=n_jobs)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = pipeline.predict_proba(X_test)[:, 1]
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'Model': model_type,
+        'Fit (s)': round(fit_seconds, 2),
+        'Batch predict (ms)': round(batch_ms, 1),
+        'Single predict (ms)': round(time_single_predictions(pipeline, X_test, single_repeats), 3),
+        'Size (KB)': round(saved_size_bytes(pipeline) / 1024, 1),
+        'AUC': round(roc_auc_score(y_test, probabilities), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fit time, predict latency and size per model type.")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--replicate", type=int, default=1, help="Repeat the dataset N times")
+    parser.add_argument("--single-repeats", type=int, default=200)
+    parser.add_argument("--models", nargs="*", default=MODEL_TYPES)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores for RandomForest training")
+    args = parser.parse_args(argv)
+
+    df = load_data(args.dataset)
+    if df is None:
+        raise SystemExit(f"Could not load {args.dataset}")
+    if args.replicate > 1:
+        df = pd.concat([df] * args.replicate, ignore_index=True)
+
+    X_train, X_test, y_train, y_test = split_features(df)
+    print(f"{len(X_train):,} training rows · {len(X_test):,} test rows\n")
+
+    results = [
+        benchmark_model(model_type, X_train, X_test, y_train, y_test, args.single_repeats, args.n_jobs)
+        for model_type in args.models
+    ]
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
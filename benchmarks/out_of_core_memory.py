@@ -0,0 +1,75 @@
+"""
+out_of_core_memory.py
+---------------------
+Compares peak memory and wall time of the two training paths:
+- in-memory   : load_data + train_model (the whole table, plus the split copies)
+- out-of-core : training.train_out_of_core, streamed in chunks, with and
+                without a stratified sample
+
+The dataset is repeated --copies times into a temporary CSV (each copy gets
+new PlayerIDs) to get something big enough to show the difference. Every
+run happens in a fresh process, so each peak memory figure is its own.
+
+Run it from the project root:
+    python benchmarks/out_of_core_memory.py data/online_gaming_behavior_dataset.csv --copies 25
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_data
+from src.evaluation import evaluate_model
+from src.training import peak_memory_mb, train_model, train_out_of_core
+
+
+def in_memory(path, model_type, sample_size, results):
+    start = time.perf_counter()
+    df = load_data(path, use_cache=False)
+    pipeline, X_train, X_test, y_train, y_test = train_model(df, model_type)
+    metrics, _ = evaluate_model(pipeline, X_test, y_test)
+    results.put(("in-memory", len(X_train), metrics['AUC'], time.perf_counter() - start, peak_memory_mb()))
+
+
+def out_of_core(path, model_type, sample_size, results):
+    pipeline, report = train_out_of_core(path, model_type, sample_size=sample_size)
+    label = f"out-of-core (sample {sample_size:,})" if sample_size else "out-of-core (all rows)"
+    results.put((label, report['fitted_rows'], report['metrics']['AUC'], report['wall_seconds'],
+                 report['peak_memory_mb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak memory of in-memory vs out-of-core training.")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--copies", type=int, default=25, help="How many times to repeat the dataset")
+    parser.add_argument("--model-type", default="LogisticRegression")
+    parser.add_argument("--sample-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    original = pd.read_csv(args.dataset)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "big.csv")
+        for copy in range(args.copies):
+            chunk = original.assign(PlayerID=original['PlayerID'] + copy * len(original))
+            chunk.to_csv(path, mode='w' if copy == 0 else 'a', header=copy == 0, index=False)
+        print(f"{len(original) * args.copies:,} rows, {os.path.getsize(path) / 1e6:.0f} MB CSV\n")
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        for run, sample_size in ((in_memory, None), (out_of_core, None), (out_of_core, args.sample_size)):
+            process = context.Process(target=run, args=(path, args.model_type, sample_size, results))
+            process.start()
+            process.join()
+            label, rows, auc, seconds, peak = results.get()
+            print(f"{label:<32} fitted on {rows:>10,} rows  AUC {auc:.3f}  {seconds:6.1f}s  peak {peak:6.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+service_load.py
+---------------
+Load test for the HTTP scoring service (src/service.py).
+
+It trains a model on the dataset (or uses a registered one with --model),
+starts the service in-process with the stub LLM on a free port, and then
+fires concurrent requests at it:
+- /score   : many concurrent single-player requests (exercises micro-batching)
+- /plan    : a smaller number of plan requests (exercises the async LLM path)
+
+Client-side p50/p99 latency is printed, followed by the service's own /metrics.
+
+Run it from the project root:
+    python benchmarks/service_load.py data/online_gaming_behavior_dataset.csv --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import get_feature_lists, load_data
+from src.llm import set_llm_backend
+from src.model_registry import load_model
+from src.service import ScoringService
+from src.stub_llm import StubBackend
+from src.training import train_model
+
+
+async def fire(session, url, payloads, concurrency):
+    """ Sends every payload with at most 'concurrency' requests in flight. Returns latencies in ms. """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"{url} answered {response.status}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def describe(name, latencies, seconds):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{name:<8} {len(latencies):>6} requests  {len(latencies) / seconds:>8.0f} req/s  "
+          f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms")
+
+
+async def run(service, players, args):
+    runner = web.AppRunner(service.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    try:
+        async with ClientSession() as session:
+            score_payloads = [{"player": players[i % len(players)]} for i in range(args.requests)]
+            describe("/score", *await fire(session, f"{base_url}/score", score_payloads, args.concurrency))
+
+            if args.plans:
+                plan_payloads = [{"player": players[i % len(players)]} for i in range(args.plans)]
+                describe("/plan", *await fire(session, f"{base_url}/plan", plan_payloads, args.concurrency))
+
+            async with session.get(f"{base_url}/metrics") as response:
+                print("\nService /metrics:")
+                print(json.dumps(await response.json(), indent=2))
+    finally:
+        await runner.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the scoring service with the stub LLM.")
+    parser.add_argument("dataset", help="Labelled CSV (players are taken from it)")
+    parser.add_argument("--model", default=None, help="Registered model to serve (default: train one now)")
+    parser.add_argument("--model-type", default="LogisticRegression")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--plans", type=int, default=0,
+                        help="Plan requests to send (needs the strategy index / embeddings model)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="Stub LLM seconds per reply")
+    args = parser.parse_args(argv)
+
+    df = load_data(args.dataset)
+    if df is None:
+        raise SystemExit(f"Could not load {args.dataset}")
+
+    if args.model:
+        pipeline, model_info = load_model(args.model)
+        if pipeline is None:
+            raise SystemExit(f"No registered model matches {args.model!r}")
+    else:
+        pipeline = train_model(df, args.model_type)[0]
+        numerical_features, categorical_features = get_feature_lists()
+        model_info = {"version": "unregistered", "model_type": args.model_type,
+                      "features": {"numerical": numerical_features, "categorical": categorical_features}}
+
+    set_llm_backend(StubBackend(delay_seconds=args.llm_delay))
+    features = model_info["features"]["numerical"] + model_info["features"]["categorical"]
+    players = df[features].head(1000).astype(object).to_dict('records')
+
+    service = ScoringService(pipeline, model_info, warm_up_index=args.plans > 0)
+    asyncio.run(run(service, players, args))
+
+
+if __name__ == "__main__":
+    main()
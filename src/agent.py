@@ -1,9 +1,15 @@
-import os
+import asyncio
 import json
+import threading
+import weakref
 from typing import TypedDict, Dict, Any, List
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
-from langchain_groq import ChatGroq
-from src.rag import StrategyRAG
+from src.llm import invoke_llm, ainvoke_llm, current_model_name, MissingAPIKeyError, DEFAULT_MAX_CONCURRENCY
+from src.plan_cache import get_plan_cache, plan_cache_key
+from src.thresholds import churn_labels, CHURN_THRESHOLD
+from src.fast_inference import churn_probability
+from src.coalescer import get_coalescer, worth_coalescing
 
 # State Definition
 # This dictionary stores data as our agent moves from step to step
@@ -13,26 +19,83 @@ class PlayerAgentState(TypedDict):
     is_churn: bool                          # True if risk is high, False if low
     retrieved_strategies: list              # List of strategies found from our RAG
     structured_evaluation: dict             # Final plan generated by the LLM
+    risk_band: str                          # "low", "medium" or "high" (decides which steps run)
     error: str                              # Stores any errors that happen
 
-# Load our local Strategy Database (FAISS)
-rag_database = StrategyRAG()
+# Risk bands decide how much work the agent does for a player:
+#   low    (not churning)                      → stop right after the prediction
+#   medium (churning, below the plan threshold) → look up strategies, no LLM call
+#   high   (at or above the plan threshold)     → strategies + LLM retention plan
+# By default every churning player is "high". Raise the threshold with
+# agent_config(pipeline, plan_threshold=0.7) to save LLM calls under load.
+DEFAULT_PLAN_THRESHOLD = CHURN_THRESHOLD
+
+def risk_band(churn_proba, is_churn, plan_threshold=DEFAULT_PLAN_THRESHOLD):
+    """ Puts a player into the "low", "medium" or "high" risk band. """
+    if is_churn == False:
+        return "low"
+    if churn_proba >= plan_threshold:
+        return "high"
+    return "medium"
+
+# Our local Strategy Database (FAISS) is loaded lazily: building it imports
+# sentence-transformers/torch and loads the embeddings model, which we only
+# want to pay for when a player actually needs strategies.
+_rag_database = None
+_rag_database_lock = threading.Lock()
+
+def get_rag_database():
+    """ Returns the shared StrategyRAG, creating it on first use (thread-safe). """
+    global _rag_database
+    if _rag_database is None:
+        with _rag_database_lock:
+            # Check again inside the lock: another thread may have built it meanwhile
+            if _rag_database is None:
+                from src.rag import StrategyRAG
+                _rag_database = StrategyRAG()
+    return _rag_database
+
+def warm_up():
+    """
+    Loads the strategy database and embeddings model right now.
+    For deployments that prefer to pay this cost at boot instead of
+    on the first at-risk player.
+    """
+    get_rag_database()
 
 # Node 1: AI Machine Learning Prediction
+# When True, single players are scored with the compiled fast path (src/fast_inference.py)
+USE_FAST_INFERENCE = True
+
+# When True, concurrent predictions are collected for a few milliseconds and
+# scored as one batch (uses the fast path too when the pipeline supports it).
+# Linear models on the fast path take microseconds, so they skip the batching.
+COALESCE_PREDICTIONS = True
+
 def predict_risk(state: PlayerAgentState, pipeline) -> PlayerAgentState:
     """ 
     Step 1: Uses our Scikit-Learn Machine Learning model to guess 
     if the player will churn (quit the game).
     """
     try:
-        import pandas as pd
-        
-        data_frame = pd.DataFrame([state["player_data"]])
-        
-        prediction_result = pipeline.predict(data_frame)[0]
-        probability = pipeline.predict_proba(data_frame)[0][1]
+        if COALESCE_PREDICTIONS and worth_coalescing(pipeline):
+            # Concurrent predictions (other sessions / threads) are scored
+            # together in one vectorised call (src/coalescer.py)
+            probability = get_coalescer(pipeline).score(state["player_data"])
+        elif USE_FAST_INFERENCE:
+            # Compiled scorer: no one-row DataFrame, no ColumnTransformer
+            # (falls back to predict_proba for unsupported models)
+            probability = churn_probability(pipeline, state["player_data"])
+        else:
+            import pandas as pd
+
+            data_frame = pd.DataFrame([state["player_data"]])
+
+            # One predict_proba call gives us both answers: the label is just
+            # "is the churn probability above the threshold?"
+            probability = pipeline.predict_proba(data_frame)[0][1]
         
-        state["is_churn"] = (prediction_result == 1)
+        state["is_churn"] = bool(churn_labels(probability))
         state["churn_proba"] = float(probability)
         
     except Exception as e:
@@ -40,6 +103,34 @@ def predict_risk(state: PlayerAgentState, pipeline) -> PlayerAgentState:
     
     return state
 
+# How many strategies we fetch for each at-risk player
+NUMBER_OF_STRATEGIES = 2
+
+# When True, similar players share one search query (e.g. ages 20-24 all become
+# "Age 20"), so the query cache in StrategyRAG gets far more hits
+BUCKET_SEARCH_QUERIES = False
+
+def build_search_query(player_info, bucketed=BUCKET_SEARCH_QUERIES):
+    """
+    Creates a nice sentence describing the player, used to search strategies.
+
+    With bucketed=True the numbers are rounded into coarse groups
+    (age in 5s, level in 10s, whole hours of playtime).
+    """
+    age = player_info['Age']
+    level = player_info['PlayerLevel']
+    playtime = player_info['PlayTimeHours']
+    if bucketed:
+        age = int(age) // 5 * 5
+        level = int(level) // 10 * 10
+        playtime = int(round(float(playtime)))
+
+    return (
+        f"Age {age}, Level {level}, "
+        f"PlayTime {playtime} hours, "
+        f"Purchases: {player_info['InGamePurchases']}"
+    )
+
 # Node 2: Knowledge Retrieval (RAG)
 def retrieve_knowledge(state: PlayerAgentState) -> PlayerAgentState:
     """ 
@@ -51,18 +142,12 @@ def retrieve_knowledge(state: PlayerAgentState) -> PlayerAgentState:
         state["retrieved_strategies"] = []
         return state
         
-    player_info = state["player_data"]
-    
     # Create a nice sentence describing the player
-    search_query = (
-        f"Age {player_info['Age']}, Level {player_info['PlayerLevel']}, "
-        f"PlayTime {player_info['PlayTimeHours']} hours, "
-        f"Purchases: {player_info['InGamePurchases']}"
-    )
+    search_query = build_search_query(state["player_data"])
             
     try:
         # Search our FAISS database
-        strategies = rag_database.retrieve_strategies(search_query, number_of_results=2)
+        strategies = get_rag_database().retrieve_strategies(search_query, number_of_results=NUMBER_OF_STRATEGIES)
         state["retrieved_strategies"] = strategies
     except Exception as e:
         state["error"] = "Error searching strategies: " + str(e)
@@ -70,46 +155,59 @@ def retrieve_knowledge(state: PlayerAgentState) -> PlayerAgentState:
         
     return state
 
-# 
-# Node 3: LLM Plan Generation
-def generate_plan(state: PlayerAgentState) -> PlayerAgentState:
-    """ 
-    Step 3: Uses ChatGroq (LLM) to write a customized retention plan.
+def retrieve_knowledge_batch(states):
     """
-    # If the player is safe, return a standard positive message
-    if state["is_churn"] == False:
-        state["structured_evaluation"] = {
-            "Summary": "Player is happy and active.",
-            "Analysis": "Low risk of quitting.",
-            "Plan": "Keep doing what you are doing. No action needed.",
-            "Refs": "None",
-            "Disclaimer": "Auto-response for safe players."
-        }
-        return state
+    Same as retrieve_knowledge, but for many players at once: all search
+    queries are embedded in one model call and searched in one FAISS query.
+    """
+    at_risk_states = [state for state in states if state["is_churn"]]
+    for state in states:
+        if state["is_churn"] == False:
+            state["retrieved_strategies"] = []
+
+    if len(at_risk_states) == 0:
+        return states
 
+    search_queries = [build_search_query(state["player_data"]) for state in at_risk_states]
     try:
-        # Get the API Key from the computer
-        my_api_key = os.environ.get("GROQ_API_KEY")
-        if my_api_key == None:
-            state["error"] = "No GROQ_API_KEY found!"
-            return state
-            
-        # Connect to Groq AI
-        ai_chatbot = ChatGroq(
-            temperature=0.7, 
-            groq_api_key=my_api_key, 
-            model_name="llama-3.1-8b-instant"
+        all_strategies = get_rag_database().retrieve_strategies_batch(
+            search_queries, number_of_results=NUMBER_OF_STRATEGIES
         )
-        
-        # Write our instruction for the AI
-        ai_prompt = f"""
+        for state, strategies in zip(at_risk_states, all_strategies):
+            state["retrieved_strategies"] = strategies
+    except Exception as e:
+        for state in at_risk_states:
+            state["error"] = "Error searching strategies: " + str(e)
+            state["retrieved_strategies"] = []
+
+    return states
+
+# 
+# Node 3: LLM Plan Generation
+
+# The standard positive message for players who are not at risk
+SAFE_PLAYER_RESPONSE = {
+    "Summary": "Player is happy and active.",
+    "Analysis": "Low risk of quitting.",
+    "Plan": "Keep doing what you are doing. No action needed.",
+    "Refs": "None",
+    "Disclaimer": "Auto-response for safe players."
+}
+
+def _to_json_value(value):
+    """ Lets json.dumps handle NumPy numbers (e.g. values taken from a DataFrame row). """
+    return value.item() if hasattr(value, "item") else str(value)
+
+def build_plan_prompt(state: PlayerAgentState) -> str:
+    """ Writes our instruction for the AI. """
+    return f"""
         You are a Game Expert. Look at this player struggling:
-        {json.dumps(state['player_data'])}
+        {json.dumps(state['player_data'], default=_to_json_value)}
         
         Risk of quitting: {state['churn_proba'] * 100}%
         
         Good strategies to help them:
-        {json.dumps(state['retrieved_strategies'])}
+        {json.dumps(state['retrieved_strategies'], default=_to_json_value)}
         
         Write a plan using EXACTLY this JSON structure. Do not return anything except json:
         {{
@@ -120,47 +218,206 @@ def generate_plan(state: PlayerAgentState) -> PlayerAgentState:
             "Disclaimer": "Warning about using AI safely."
         }}
         """
+
+def parse_plan_reply(text_reply: str) -> dict:
+    """ Cleans the LLM reply down to the JSON part and turns it into a dictionary. """
+    # clean the text to just get the JSON part
+    if "```json" in text_reply:
+        text_reply = text_reply.split("```json")[1].split("```")[0].strip()
+    elif "```" in text_reply:
+        text_reply = text_reply.split("```")[1].strip()
         
-        # Send the message to Groq
-        groq_reply = ai_chatbot.invoke(ai_prompt)
-        text_reply = groq_reply.content
-        
-        # clean the text to just get the JSON part
-        if "```json" in text_reply:
-            text_reply = text_reply.split("```json")[1].split("```")[0].strip()
-        elif "```" in text_reply:
-            text_reply = text_reply.split("```")[1].strip()
-            
-        # Convert text into a real python dictionary
-        structured_plan = json.loads(text_reply)
-        state["structured_evaluation"] = structured_plan
-        
+    # Convert text into a real python dictionary
+    return json.loads(text_reply)
+
+# Reuse stored plans for equivalent players instead of asking the LLM again (see src/plan_cache.py)
+USE_PLAN_CACHE = True
+
+def _cached_plan(state: PlayerAgentState):
+    """ Returns (cache key, cached plan or None). The key is None when caching is off. """
+    if USE_PLAN_CACHE == False:
+        return None, None
+    key = plan_cache_key(state["player_data"], state["churn_proba"],
+                         state["retrieved_strategies"], current_model_name())
+    return key, get_plan_cache().get(key)
+
+def generate_plan(state: PlayerAgentState) -> PlayerAgentState:
+    """ 
+    Step 3: Uses ChatGroq (LLM) to write a customized retention plan.
+    """
+    # If the player is safe, return a standard positive message
+    if state["is_churn"] == False:
+        state["structured_evaluation"] = dict(SAFE_PLAYER_RESPONSE)
+        return state
+
+    try:
+        # An equivalent player already got a plan? Use it.
+        cache_key, plan = _cached_plan(state)
+        if plan is not None:
+            state["structured_evaluation"] = plan
+            return state
+
+        # The shared client (connection pool + retries) lives in src/llm.py
+        text_reply = invoke_llm(build_plan_prompt(state))
+        state["structured_evaluation"] = parse_plan_reply(text_reply)
+        if cache_key is not None:
+            get_plan_cache().put(cache_key, state["structured_evaluation"])
+
+    except MissingAPIKeyError as e:
+        state["error"] = str(e)
     except Exception as e:
         state["error"] = "AI Error: " + str(e)
         state["structured_evaluation"] = {}
 
     return state
 
+async def agenerate_plan(state: PlayerAgentState) -> PlayerAgentState:
+    """ Async version of generate_plan, so many plans can be written at the same time. """
+    if state["is_churn"] == False:
+        state["structured_evaluation"] = dict(SAFE_PLAYER_RESPONSE)
+        return state
+
+    try:
+        cache_key, plan = _cached_plan(state)
+        if plan is not None:
+            state["structured_evaluation"] = plan
+            return state
+
+        text_reply = await ainvoke_llm(build_plan_prompt(state))
+        state["structured_evaluation"] = parse_plan_reply(text_reply)
+        if cache_key is not None:
+            get_plan_cache().put(cache_key, state["structured_evaluation"])
+
+    except MissingAPIKeyError as e:
+        state["error"] = str(e)
+    except Exception as e:
+        state["error"] = "AI Error: " + str(e)
+        state["structured_evaluation"] = {}
+
+    return state
+
+async def agenerate_plans(states, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Writes plans for many players concurrently.
+    At most 'max_concurrency' LLM requests are in flight at any moment.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(state):
+        async with semaphore:
+            return await agenerate_plan(state)
+
+    return await asyncio.gather(*(limited(state) for state in states))
+
 # Build The LangGraph Workflow
-def build_agent_graph(pipeline):
+
+# Node 1 as the graph sees it: the pipeline comes from the run's config
+# (config["configurable"]["pipeline"]), not from a closure, so one compiled
+# graph can serve every trained pipeline.
+def predict_risk_node(state: PlayerAgentState, config: RunnableConfig) -> PlayerAgentState:
+    settings = config["configurable"]
+    state = predict_risk(state, settings["pipeline"])
+    state["risk_band"] = risk_band(state["churn_proba"], state["is_churn"],
+                                   settings.get("plan_threshold", DEFAULT_PLAN_THRESHOLD))
+
+    # Safe players end here, so they get the standard positive message now
+    if state["risk_band"] == "low":
+        state["retrieved_strategies"] = []
+        state["structured_evaluation"] = dict(SAFE_PLAYER_RESPONSE)
+    return state
+
+# Node 3b: Strategy-only plan for medium-risk players (no LLM call)
+def summarize_strategies(state: PlayerAgentState) -> PlayerAgentState:
+    """
+    Builds the plan straight from the retrieved strategies, without asking
+    the LLM. Used for medium-risk players.
+    """
+    strategies = [strategy for strategy in state["retrieved_strategies"] if "error" not in strategy]
+    state["structured_evaluation"] = {
+        "Summary": f"Player shows a moderate risk of quitting ({state['churn_proba']:.0%}).",
+        "Analysis": "Risk is above the churn threshold but below the threshold for a personalised AI plan.",
+        "Plan": " ".join(f"{strategy['action']}." for strategy in strategies) or "Monitor the player's engagement.",
+        "Refs": "; ".join(f"{strategy['audience']}: {strategy['scenario']}" for strategy in strategies) or "None",
+        "Disclaimer": "Strategy-only response for medium-risk players (no AI-generated text)."
+    }
+    return state
+
+# Routing: which step runs next?
+def route_after_prediction(state: PlayerAgentState) -> str:
+    """ Safe players (and failed predictions) end right after predict_risk. """
+    if state.get("error") or state["risk_band"] == "low":
+        return END
+    return "retrieve_knowledge"
+
+def route_after_retrieval(state: PlayerAgentState) -> str:
+    """ Only high-risk players get an LLM plan. """
+    if state["risk_band"] == "high":
+        return "generate_plan"
+    return "summarize_strategies"
+
+def agent_config(pipeline, plan_threshold=DEFAULT_PLAN_THRESHOLD) -> dict:
     """
-    Connects our 3 steps together into a workflow graph!
+    The config to pass with every run, e.g. graph.stream(state, config=agent_config(pipeline)).
+
+    - plan_threshold : churning players at or above this probability get an
+                       LLM plan; those below it get a strategy-only plan
+    """
+    return {"configurable": {"pipeline": pipeline, "plan_threshold": plan_threshold}}
+
+def compile_agent_graph():
+    """
+    Connects our steps together into a workflow graph!
+
+    predict_risk ──(low)──────────────────────────────────────→ END
+        └─(medium/high)→ retrieve_knowledge ─(high)→ generate_plan → END
+                                   └──────(medium)→ summarize_strategies → END
     """
     graph = StateGraph(PlayerAgentState)
-    
-    # We need a small helper to pass the pipeline into our first step
-    def starting_node(state: PlayerAgentState):
-        return predict_risk(state, pipeline)
         
     # 1. Add all our steps (nodes) to the graph
-    graph.add_node("predict_risk", starting_node)
+    graph.add_node("predict_risk", predict_risk_node)
     graph.add_node("retrieve_knowledge", retrieve_knowledge)
     graph.add_node("generate_plan", generate_plan)
+    graph.add_node("summarize_strategies", summarize_strategies)
     
-    # 2. Tell the graph what order to run them in (edges)
+    # 2. Tell the graph what order to run them in (edges).
+    #    Conditional edges skip the steps a player's risk band doesn't need.
     graph.add_edge(START, "predict_risk")
-    graph.add_edge("predict_risk", "retrieve_knowledge")
-    graph.add_edge("retrieve_knowledge", "generate_plan")
+    graph.add_conditional_edges("predict_risk", route_after_prediction, ["retrieve_knowledge", END])
+    graph.add_conditional_edges("retrieve_knowledge", route_after_retrieval,
+                                ["generate_plan", "summarize_strategies"])
     graph.add_edge("generate_plan", END)
+    graph.add_edge("summarize_strategies", END)
     
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
+
+# Compiling the graph is the expensive part, so it happens once per process
+_compiled_graph = None
+_graph_lock = threading.Lock()
+
+# Graphs already bound to a trained pipeline. Weak keys: when a pipeline is
+# thrown away (e.g. after retraining), its entry disappears too.
+_pipeline_graphs = weakref.WeakKeyDictionary()
+
+def get_agent_graph():
+    """ Returns the shared compiled graph (compiled on first use). Run it with agent_config(pipeline). """
+    global _compiled_graph
+    if _compiled_graph is None:
+        with _graph_lock:
+            if _compiled_graph is None:
+                _compiled_graph = compile_agent_graph()
+    return _compiled_graph
+
+def build_agent_graph(pipeline):
+    """
+    Returns the compiled graph with 'pipeline' already bound into its config,
+    so it can be run with just graph.stream(state). Cached per pipeline object:
+    repeated predictions with the same model reuse the same graph.
+    """
+    with _graph_lock:
+        bound_graph = _pipeline_graphs.get(pipeline)
+    if bound_graph is None:
+        bound_graph = get_agent_graph().with_config(agent_config(pipeline))
+        with _graph_lock:
+            _pipeline_graphs[pipeline] = bound_graph
+    return bound_graph
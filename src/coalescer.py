@@ -0,0 +1,184 @@
+"""
+coalescer.py
+------------
+Combines many concurrent single-player predictions into one batch.
+
+Scoring one player at a time has a fixed cost per call (building a
+DataFrame, running the ColumnTransformer, or walking every tree), so 50
+players scored in one vectorised call are much cheaper than 50 separate
+calls. When several users (Streamlit sessions, service requests, worker
+threads) ask for predictions at the same time, the coalescer:
+1. Collects their requests for at most 'max_wait_seconds' (a few ms)
+   or until 'max_batch_size' requests are waiting. A caller with no
+   concurrent company is scored straight away, without waiting
+2. Scores them all with ONE churn_probabilities() call
+3. Hands every caller its own result. If the batch call fails, every
+   player is scored again on its own, so one bad request only fails its
+   own caller
+
+Each pipeline gets its own coalescer (see get_coalescer), with one
+background thread that does the scoring.
+"""
+
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from src.fast_inference import churn_probabilities, get_fast_scorer
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_SECONDS = 0.002
+
+# The worker thread stops after this long without requests (it restarts on demand)
+IDLE_SECONDS = 30.0
+
+
+class RequestCoalescer:
+    """
+    Thread-safe: call score() (blocking) or submit() (returns a Future) from any thread.
+
+    The pipeline is only referenced weakly, so a coalescer never keeps a
+    thrown-away pipeline alive.
+    """
+
+    def __init__(self, pipeline, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS):
+        self.pipeline_ref = weakref.ref(pipeline)
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+        # Statistics
+        self.batches = 0
+        self.players = 0
+        self.largest_batch = 0
+        self.last_batch_size = 0
+
+    def submit(self, player_data):
+        """ Queues one player. Returns a Future whose result is the churn probability. """
+        future = Future()
+        self.requests.put((player_data, future))
+        self._ensure_worker()
+        return future
+
+    def score(self, player_data, timeout=None):
+        """ The churn probability of one player (waits for its batch to be scored). """
+        return self.submit(player_data).result(timeout)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "players": self.players,
+            "average_batch_size": round(self.players / max(self.batches, 1), 2),
+            "largest_batch": self.largest_batch,
+        }
+
+    # ── Background worker ──────────────────────────────────────────────
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or self.worker.is_alive() == False:
+                self.worker = threading.Thread(target=self._run, name="churn-coalescer", daemon=True)
+                self.worker.start()
+
+    def _collect_batch(self):
+        """ Waits for the first request, then gathers more until the batch is full or the wait is over. """
+        try:
+            batch = [self.requests.get(timeout=IDLE_SECONDS)]
+        except queue.Empty:
+            return []
+
+        # A lone caller shouldn't pay the wait: only hold the batch open when
+        # the previous batch showed that requests are arriving concurrently
+        wait_seconds = self.max_wait_seconds if self.last_batch_size > 1 else 0.0
+        deadline = time.perf_counter() + wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            # Stop waiting once as many callers as last time have arrived (with
+            # steady concurrency that is everyone); requests already queued are
+            # always taken, even after the deadline
+            done_waiting = remaining <= 0 or len(batch) >= self.last_batch_size
+            try:
+                batch.append(self.requests.get_nowait() if done_waiting else self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if len(batch) == 0:
+                with self.lock:
+                    # Idle: stop, unless a request slipped in just now
+                    if self.requests.empty():
+                        self.worker = None
+                        return
+                continue
+
+            pipeline = self.pipeline_ref()
+            try:
+                if pipeline is None:
+                    raise RuntimeError("The pipeline was discarded before its predictions were made")
+                self._score_batch(pipeline, batch)
+            except Exception as e:
+                for _, future in batch:
+                    if future.done() == False:
+                        future.set_exception(e)
+            finally:
+                del pipeline
+
+            self.batches += 1
+            self.players += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.last_batch_size = len(batch)
+
+
+    @staticmethod
+    def _score_batch(pipeline, batch):
+        """
+        Scores a batch in one call. If that call fails, one of the players is
+        bad (e.g. a text value in a number column), so every player is scored
+        again on its own: only the bad player's caller gets the error, the
+        others still get their probability.
+        """
+        try:
+            probabilities = churn_probabilities(pipeline, [player_data for player_data, _ in batch])
+        except Exception:
+            if len(batch) == 1:
+                raise
+            for player_data, future in batch:
+                try:
+                    future.set_result(float(churn_probabilities(pipeline, [player_data])[0]))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, future), probability in zip(batch, probabilities):
+            future.set_result(float(probability))
+
+
+def worth_coalescing(pipeline):
+    """
+    False for pipelines the fast path scores as a linear model: one player
+    takes a few microseconds there, less than handing the request to the
+    coalescer's thread. Everything else (trees, pandas fallback) gains from
+    batching under concurrency.
+    """
+    scorer = get_fast_scorer(pipeline)
+    return scorer is None or scorer.model_kind != 'linear'
+
+
+# One coalescer per pipeline object (forgotten when the pipeline is)
+_coalescers = weakref.WeakKeyDictionary()
+_coalescers_lock = threading.Lock()
+
+
+def get_coalescer(pipeline, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS):
+    """ The shared coalescer of a pipeline (created on first use; settings apply only then). """
+    with _coalescers_lock:
+        coalescer = _coalescers.get(pipeline)
+        if coalescer is None:
+            coalescer = RequestCoalescer(pipeline, max_batch_size, max_wait_seconds)
+            _coalescers[pipeline] = coalescer
+        return coalescer
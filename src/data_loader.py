@@ -2,25 +2,100 @@
 data_loader.py
 --------------
 This file is responsible for:
-1. Reading the CSV dataset file
+1. Reading the CSV dataset file (all at once, or streamed in chunks)
 2. Creating the 'Churn' column (our prediction target)
 3. Defining which columns are used as features for the ML model
+4. Caching parsed datasets on disk so the same file is never parsed twice
 """
 
+import hashlib
+import os
+import warnings
+
 # We import pandas, a library that helps us work with tables (like Excel in Python)
 
+import numpy as np
 import pandas as pd
 
+# ── Dataset cache ──────────────────────────────────────────────────────────
+# Parsed + labelled datasets are saved as Arrow (Feather) files named after a
+# hash of the CSV contents (and the cache format version). Uploading the exact
+# same file again skips parsing.
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FOLDER = os.path.join(PROJECT_FOLDER, '.cache', 'datasets')
+
+# Oldest-used files are deleted once the cache folder grows past this size
+CACHE_MAX_BYTES = 1024 * 1024 * 1024   # 1 GB
+
+# Bump this whenever load_data changes what it produces, so old cache files
+# are ignored instead of being loaded with the wrong columns or types. It is
+# part of the cache FILE NAME only, never of the dataset fingerprint: models in
+# the registry are matched to datasets by fingerprint, and must keep matching.
+CACHE_FORMAT_VERSION = 2
+
+# How many rows each streamed chunk holds (see iter_data)
+DEFAULT_CHUNK_SIZE = 100_000
+
+# The column types of every loaded table and streamed chunk (see
+# compact_dtypes). Small integer types keep the data compact (e.g. Age fits in
+# int16 instead of the default int64). A column that has missing values, or
+# numbers that don't fit, keeps the type pandas gave it (float64 / int64), so
+# parsing never fails.
+COLUMN_DTYPES = {
+    'PlayerID':                  'int64',
+    'Age':                       'int16',
+    'PlayTimeHours':             'float64',
+    'InGamePurchases':           'int8',
+    'SessionsPerWeek':           'int16',
+    'AvgSessionDurationMinutes': 'int16',
+    'PlayerLevel':               'int16',
+    'AchievementsUnlocked':      'int16',
+}
+
+# The known values of every text column (the "vocabulary"). At load time these
+# columns become pandas categoricals with exactly these categories, in this
+# order, so each value is stored once as an integer code (its position here)
+# and every dataset and chunk uses the same codes. The model's encoders read
+# those codes directly (see encoders.py). A column with values outside this
+# list keeps them (with a warning): they are added after the known values, and
+# the models learn that column's categories from the data instead.
+CATEGORY_VALUES = {
+    'Gender':          ['Male', 'Female'],
+    'Location':        ['USA', 'Europe', 'Asia', 'Other'],
+    'GameGenre':       ['Action', 'RPG', 'Simulation', 'Sports', 'Strategy'],
+    'GameDifficulty':  ['Easy', 'Medium', 'Hard'],
+    'EngagementLevel': ['Low', 'Medium', 'High'],
+}
 
-def load_data(source):
+
+def load_data(source, use_cache=True):
     """
     This function loads the dataset from a CSV file.
 
     - 'source' can be a file path (string) OR an uploaded file from Streamlit
     - It returns a pandas DataFrame (a table of data)
     - If something goes wrong, it returns None
+    - If 'use_cache' is True, the parsed table is saved to (and next time read
+      from) the local dataset cache, keyed by a hash of the file contents
+
+    The content hash is stored in df.attrs['fingerprint'] so other parts of the
+    app can cache their own results per dataset.
     """
 
+    fingerprint = None
+    if use_cache:
+        try:
+            fingerprint = fingerprint_source(source)
+        except Exception:
+            fingerprint = None
+
+    # Same file as before? Read the cached, already-labelled table instead
+    if fingerprint is not None:
+        cached_df = _read_cached_dataset(fingerprint)
+        if cached_df is not None:
+            cached_df.attrs['fingerprint'] = fingerprint
+            return cached_df
+
     try:
         # pd.read_csv() reads the CSV file and turns it into a table (DataFrame)
         df = pd.read_csv(source)
@@ -33,15 +108,310 @@ def load_data(source):
         # Create a new column called 'Churn'
         # Rule: If EngagementLevel is 'Low' → Churn = 1 (player is leaving)
         #       If EngagementLevel is 'Medium' or 'High' → Churn = 0 (player is staying)
-        df['Churn'] = df['EngagementLevel'].apply(lambda x: 1 if x == 'Low' else 0)
+        df['Churn'] = label_churn(df['EngagementLevel'])
     else:
         # If the column doesn't exist, we can't create Churn, so return None
         return None
 
+    # Shrink the column types (small ints, categoricals for text), then give
+    # the known text columns their vocabulary codes
+    df = encode_categories(compact_dtypes(df))
+
+    if fingerprint is not None:
+        _write_cached_dataset(df, fingerprint)
+
+    df.attrs['fingerprint'] = fingerprint
+
     # Return the processed table
     return df
 
 
+def compact_dtypes(df):
+    """
+    Returns a copy of 'df' that uses less memory without changing any value:
+    - COLUMN_DTYPES columns get their type from that table (when it fits), so
+      every table and every streamed chunk has the same types
+    - other whole-number columns get the smallest integer type that fits
+    - low-cardinality text columns become pandas categoricals
+    Decimal columns are left as float64 so no precision is lost.
+    """
+    compact = df.copy()
+    for column in compact.columns:
+        values = compact[column]
+        if column in COLUMN_DTYPES and pd.api.types.is_integer_dtype(values):
+            dtype = np.dtype(COLUMN_DTYPES[column])
+            if dtype.kind == 'i' and len(values) > 0 \
+                    and np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max:
+                compact[column] = values.astype(dtype)
+        elif pd.api.types.is_integer_dtype(values):
+            compact[column] = pd.to_numeric(values, downcast='integer')
+        elif (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)) \
+                and values.nunique() <= len(values) // 2:
+            compact[column] = values.astype('category')
+    return compact
+
+
+def encode_categories(df, vocabulary=None):
+    """
+    Stores every CATEGORY_VALUES column of 'df' as a categorical with the
+    vocabulary's categories, i.e. as integer codes in vocabulary order.
+    Changes 'df' in place and returns it.
+
+    - vocabulary : {column: categories} to use (see category_vocabulary).
+                   By default it is worked out from 'df' itself, with a
+                   warning for every column that has unknown values
+
+    Values outside CATEGORY_VALUES are never turned into NaN: their column's
+    vocabulary is widened with them (after the known values, so the known
+    codes don't move), and the encoders then learn that column's categories
+    from the data (see encoders.py).
+    """
+    if vocabulary is None:
+        unknown = unknown_categories(df)
+        warn_unknown_categories(unknown)
+        vocabulary = category_vocabulary(unknown)
+    for column, values in vocabulary.items():
+        if column in df.columns:
+            # (astype would keep an existing categorical's order: pandas sees
+            # unordered categoricals with the same values as the same type)
+            df[column] = pd.Categorical(df[column], categories=values)
+    return df
+
+
+def category_vocabulary(unknown=None):
+    """ CATEGORY_VALUES, with each column's unknown values (see unknown_categories) added at the end. """
+    unknown = unknown or {}
+    return {column: values + [value for value in unknown.get(column, []) if value not in values]
+            for column, values in CATEGORY_VALUES.items()}
+
+
+def warn_unknown_categories(unknown):
+    """ One warning per column that has values outside CATEGORY_VALUES. """
+    for column, extra_values in unknown.items():
+        warnings.warn(f"Column '{column}' has values outside CATEGORY_VALUES "
+                      f"({', '.join(map(str, extra_values[:5]))}{', ...' if len(extra_values) > 5 else ''}). "
+                      f"They are kept, and models learn this column's categories from the data.", stacklevel=3)
+
+
+def unknown_categories(df):
+    """
+    {column: [values outside its CATEGORY_VALUES vocabulary]} for the
+    category columns of 'df' that have any (missing values don't count).
+    A categorical column whose categories all belong to the vocabulary is
+    cleared from its categories alone, so the usual case is cheap even for
+    big tables.
+    """
+    unknown = {}
+    for column, values in CATEGORY_VALUES.items():
+        if column not in df.columns:
+            continue
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.categories
+            if categories.isin(values).all():
+                continue
+            # Only the categories that are actually used count
+            codes = df[column].cat.codes.to_numpy()
+            present = categories[np.unique(codes[codes >= 0])]
+        else:
+            present = df[column].dropna().unique()
+        extra = sorted((value for value in present if value not in values), key=str)
+        if extra:
+            unknown[column] = extra
+    return unknown
+
+
+def _scan_unknown_categories(source, chunksize):
+    """
+    Reads only the category columns of a CSV, start to end, and returns
+    unknown_categories for the whole file. Rewinds uploaded files afterwards.
+    """
+    unknown = {}
+    for chunk in pd.read_csv(source, usecols=lambda column: column in CATEGORY_VALUES,
+                             dtype='category', chunksize=chunksize):
+        for column, extra_values in unknown_categories(chunk).items():
+            known = unknown.setdefault(column, [])
+            known.extend(value for value in extra_values if value not in known)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return {column: sorted(values, key=str) for column, values in unknown.items()}
+
+
+def fingerprint_source(source):
+    """
+    Returns a SHA-256 hash of the file contents.
+
+    - Works for file paths and for uploaded/file-like objects
+    - Identical files always get the same fingerprint, whatever their name
+      (and whatever version of this code parsed them)
+    """
+    hasher = hashlib.sha256()
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                hasher.update(block)
+    else:
+        # Uploaded files: read from the start, then rewind for read_csv
+        source.seek(0)
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            hasher.update(block if isinstance(block, bytes) else block.encode())
+        source.seek(0)
+
+    return hasher.hexdigest()
+
+
+def cached_dataset_path(fingerprint):
+    """ Where the cached Arrow file for a dataset fingerprint lives (for the current cache format). """
+    return os.path.join(CACHE_FOLDER, f"{fingerprint}.v{CACHE_FORMAT_VERSION}.feather")
+
+
+def _read_cached_dataset(fingerprint):
+    """
+    Loads a cached dataset with memory-mapped reads, or returns None.
+
+    The number columns are NOT copied into memory: each one is a read-only
+    view of the memory-mapped file (split_blocks keeps pandas from gluing
+    them into one new block). Only the small category codes are copied.
+    The table must not be changed in place; adding or replacing whole
+    columns is fine.
+    """
+    path = cached_dataset_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        import pyarrow.feather as feather
+        df = feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+    except Exception:
+        return None
+
+    # Mark the file as recently used (the cache evicts least-recently-used files)
+    os.utime(path)
+    return df
+
+
+def _write_cached_dataset(df, fingerprint):
+    """ Saves a dataset to the cache, then trims the cache to CACHE_MAX_BYTES. """
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    path = cached_dataset_path(fingerprint)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # Uncompressed so the file can be memory-mapped when read back
+        feather.write_feather(df, temporary_path, compression='uncompressed')
+        os.replace(temporary_path, path)
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return
+
+    _trim_cache(keep=path)
+
+
+def _trim_cache(keep=None):
+    """ Deletes least-recently-used cache files until the folder fits CACHE_MAX_BYTES. """
+    files = []
+    for name in os.listdir(CACHE_FOLDER):
+        if name.endswith('.feather'):
+            full_path = os.path.join(CACHE_FOLDER, name)
+            stats = os.stat(full_path)
+            files.append((stats.st_mtime, stats.st_size, full_path))
+
+    total_bytes = sum(size for _, size, _ in files)
+    for _, size, full_path in sorted(files):
+        if total_bytes <= CACHE_MAX_BYTES:
+            break
+        if full_path == keep:
+            continue
+        try:
+            os.remove(full_path)
+            total_bytes -= size
+        except OSError:
+            pass
+
+
+def label_churn(engagement_level):
+    """
+    Turns an EngagementLevel column into 0/1 churn labels in one vectorized step.
+
+    'Low' → 1 (player is leaving), anything else → 0 (player is staying).
+    """
+    return (engagement_level == 'Low').astype('int8')
+
+
+def iter_data(source, chunksize=DEFAULT_CHUNK_SIZE, require_target=True):
+    """
+    Streams the dataset in chunks instead of loading it all at once.
+
+    - 'source' can be a file path (string) OR an uploaded file from Streamlit
+    - Each chunk is a DataFrame with the same column types as load_data gives
+      (compact_dtypes, see COLUMN_DTYPES) and categoricals for the text
+      columns (see CATEGORY_VALUES)
+    - If the file has EngagementLevel, each chunk also gets a 'Churn' column
+    - If 'require_target' is True and EngagementLevel is missing, a
+      ValueError is raised (we can't create Churn without it)
+
+    Memory use stays bounded by 'chunksize', no matter how big the file is.
+
+    The category columns are read once up front (only those columns), so
+    that values outside CATEGORY_VALUES are found before the first chunk:
+    every chunk then gets the same categories, and each unknown column is
+    warned about once.
+    """
+    unknown = _scan_unknown_categories(source, chunksize)
+    warn_unknown_categories(unknown)
+    vocabulary = category_vocabulary(unknown)
+
+    # Numbers are parsed as pandas sees fit (a blank cell must not break an
+    # integer column) and then typed by compact_dtypes, exactly like load_data
+    dtypes = {column: 'category' for column in CATEGORY_VALUES}
+
+    for chunk in pd.read_csv(source, dtype=dtypes, chunksize=chunksize):
+        if 'EngagementLevel' not in chunk.columns and require_target:
+            raise ValueError("The dataset has no 'EngagementLevel' column, so Churn can't be created.")
+
+        # Give every chunk the same categories (and codes), so chunks can be combined safely
+        chunk = encode_categories(compact_dtypes(chunk), vocabulary)
+
+        if 'EngagementLevel' in chunk.columns:
+            chunk['Churn'] = label_churn(chunk['EngagementLevel'])
+
+        yield chunk
+
+
+def iter_labelled_chunks(source, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a labelled dataset (with a 'Churn' column) in chunks, whatever it is stored in:
+    - a DataFrame            : slices of it (no copies)
+    - a cached .feather file : memory-mapped (see cached_dataset_path), cut into
+                               chunks of 'chunksize' rows whatever its record
+                               batches are
+    - a CSV path or upload   : iter_data
+
+    The chunks of a file are numbered on from the previous chunk (running index),
+    like the chunks of pd.read_csv.
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, (str, os.PathLike)) and str(source).endswith('.feather'):
+        import pyarrow as pa
+        with pa.memory_map(str(source)) as file:
+            # read_all on a memory map only maps the file, nothing is copied yet;
+            # each slice is converted when its chunk is needed
+            table = pa.ipc.open_file(file).read_all()
+            for start in range(0, table.num_rows, chunksize):
+                chunk = table.slice(start, chunksize).to_pandas()
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+                yield chunk
+    else:
+        yield from iter_data(source, chunksize)
+
+
 def get_feature_lists():
     """
     This function returns two lists:
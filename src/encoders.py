@@ -0,0 +1,159 @@
+"""
+encoders.py
+-----------
+Category encoders that work on INTEGER CODES of a fixed vocabulary instead
+of matching strings.
+
+The category columns (Gender, Location, GameGenre, GameDifficulty) only ever
+take a handful of known values, listed once in data_loader.CATEGORY_VALUES.
+The data loader stores these columns as pandas categoricals with exactly
+those categories, which means every value is already kept as a small integer
+code (e.g. GameDifficulty: Easy → 0, Medium → 1, Hard → 2). The encoders
+here read those codes directly, so no string is compared while training or
+predicting.
+
+Input that doesn't carry the codes (plain strings, e.g. one player typed
+into the app, or a categorical with other categories) is mapped to codes
+first, in one vectorized step. Values outside the vocabulary get code -1:
+- CodeOneHotEncoder turns them into all-zero columns (like OneHotEncoder's
+  handle_unknown='ignore')
+- CodeOrdinalEncoder turns them into NaN ("missing", which trees handle)
+
+If the TRAINING data of a column has values outside its vocabulary, fit()
+warns and learns that column's categories from the data instead (every
+distinct value, sorted, like OneHotEncoder), so no value is thrown away.
+That column is then mapped from its strings, the others still use codes.
+
+Both are normal scikit-learn transformers (fit / transform /
+get_feature_names_out), so they work inside a ColumnTransformer and are
+saved with the pipeline.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+def category_codes(values, categories):
+    """
+    The integer code of every value in one column (-1 = not in 'categories').
+
+    - values     : a pandas Series (categorical or not) or any 1D array
+    - categories : the vocabulary, in code order
+    """
+    categories = pd.Index(categories)
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        if values.cat.categories.equals(categories):
+            # Already encoded with this vocabulary: the codes are stored, nothing to look up
+            return codes
+        # Other categories: look up each category once, not every row
+        lookup = categories.get_indexer(values.cat.categories)
+        return np.where(codes >= 0, lookup[codes], -1)
+    return categories.get_indexer(np.asarray(values, dtype=object))
+
+
+class _CodeEncoder(TransformerMixin, BaseEstimator):
+    """ Shared part of the code encoders: the vocabulary and the column bookkeeping. """
+
+    def __init__(self, categories, dtype=np.float64):
+        # One list of known values per input column, in code order
+        self.categories = categories
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        """
+        Uses the fixed vocabulary of every column, except columns whose data
+        has values outside it: their categories are learned from the data.
+        """
+        n_columns = X.shape[1]
+        if n_columns != len(self.categories):
+            raise ValueError(f"{type(self).__name__} has {len(self.categories)} vocabularies "
+                             f"but got {n_columns} columns")
+        self.n_features_in_ = n_columns
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.array(X.columns, dtype=object)
+
+        self.categories_ = []
+        for name, column, values in zip(self._input_names(None), self._columns(X), self.categories):
+            codes = category_codes(column, values)
+            if (codes < 0).any():
+                column = np.asarray(column, dtype=object)
+                present = pd.notna(column)
+                if (present & (codes < 0)).any():
+                    warnings.warn(f"{type(self).__name__}: column '{name}' has values outside its vocabulary, "
+                                  f"so its categories are learned from the data instead", stacklevel=2)
+                    values = sorted(pd.unique(column[present]), key=str)
+            self.categories_.append(np.array(values, dtype=object))
+        return self
+
+    @staticmethod
+    def _columns(X):
+        """ The input columns one by one (pandas Series or NumPy arrays). """
+        if isinstance(X, pd.DataFrame):
+            return [X.iloc[:, i] for i in range(X.shape[1])]
+        X = np.asarray(X, dtype=object).reshape(len(X), -1)
+        return [X[:, i] for i in range(X.shape[1])]
+
+    def _codes(self, X):
+        """ (rows × columns) matrix of integer codes, -1 for unknown values. """
+        return np.column_stack([category_codes(column, categories)
+                                for column, categories in zip(self._columns(X), self.categories_)])
+
+    def _input_names(self, input_features):
+        if input_features is not None:
+            return list(input_features)
+        if hasattr(self, 'feature_names_in_'):
+            return list(self.feature_names_in_)
+        return [f"x{i}" for i in range(self.n_features_in_)]
+
+
+class CodeOneHotEncoder(_CodeEncoder):
+    """
+    One-hot columns straight from category codes: one 0/1 column per
+    vocabulary value, in vocabulary order.
+
+    - sparse_output : return a CSR sparse matrix instead of a dense array
+    """
+
+    def __init__(self, categories, dtype=np.float64, sparse_output=False):
+        super().__init__(categories, dtype)
+        self.sparse_output = sparse_output
+
+    def transform(self, X):
+        codes = self._codes(X)
+        sizes = [len(values) for values in self.categories_]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        # The position of the "1" of every (row, column), or nothing if the value is unknown
+        known = codes >= 0
+        rows = np.nonzero(known)[0]
+        positions = (codes + offsets)[known]
+
+        if self.sparse_output:
+            # np.nonzero walks row by row, so the entries are already in CSR order
+            return sparse.csr_matrix((np.ones(len(rows), dtype=self.dtype), (rows, positions)),
+                                     shape=(len(codes), sum(sizes)))
+        encoded = np.zeros((len(codes), sum(sizes)), dtype=self.dtype)
+        encoded[rows, positions] = 1
+        return encoded
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"{column}_{value}"
+                         for column, values in zip(self._input_names(input_features), self.categories_)
+                         for value in values], dtype=object)
+
+
+class CodeOrdinalEncoder(_CodeEncoder):
+    """ One column per category column holding its code (unknown values → NaN). """
+
+    def transform(self, X):
+        codes = self._codes(X).astype(self.dtype)
+        codes[codes < 0] = np.nan
+        return codes
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self._input_names(input_features), dtype=object)
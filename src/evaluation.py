@@ -8,14 +8,22 @@ Key metrics explained:
 - Precision : Of all players we called "Churn", how many actually churned?
 - Recall    : Of all players who actually churned, how many did we catch?
 - AUC-ROC   : Overall ability to separate churners from non-churners (1.0 = perfect)
+
+The model is run once per test set: labels are derived from the churn
+probabilities, and a threshold sweep shows the precision / recall / cost
+trade-off at every possible threshold instead of only at 0.5.
 """
 
+import threading
+import weakref
+
 # pandas and numpy for data manipulation
 import pandas as pd
 import numpy as np
 
-# matplotlib and seaborn for creating charts/plots
-import matplotlib.pyplot as plt
+# matplotlib and seaborn for creating charts/plots.
+# Figure is used instead of pyplot, so charts can be drawn in background threads
+from matplotlib.figure import Figure
 import seaborn as sns
 
 # sklearn metrics: functions that calculate how good our model is
@@ -27,33 +35,80 @@ from sklearn.metrics import (
     confusion_matrix   # table showing correct vs incorrect predictions
 )
 
+from src.thresholds import churn_labels, CHURN_THRESHOLD
+
+
+# Probabilities already computed for a model on a dataset, so re-opening the
+# evaluation (or changing the costs) never runs the model again. Weak keys:
+# a model's entries disappear with it. Registered models are loaded once per
+# version (see model_registry.load_model), so this is a per-version cache.
+_probability_cache = weakref.WeakKeyDictionary()
+_probability_cache_lock = threading.Lock()
+
+# Datasets remembered per model
+PROBABILITIES_PER_MODEL = 4
 
-def evaluate_model(model, X_test, y_test):
+
+def churn_probabilities_for(model, X_test, data_key=None):
+    """
+    The churn probability of every row: ONE predict_proba call.
+
+    - data_key : identifies X_test, e.g. (dataset fingerprint, test_size).
+                 When given, the result is cached for this model.
+    """
+    if data_key is not None:
+        with _probability_cache_lock:
+            cached = _probability_cache.get(model, {}).get(data_key)
+        if cached is not None:
+            return cached
+
+    # predict_proba gives the probability of each class
+    # [:, 1] means "give me the probability of class 1 (Churn)"
+    y_prob = np.asarray(model.predict_proba(X_test)[:, 1])
+
+    if data_key is not None:
+        with _probability_cache_lock:
+            per_model = _probability_cache.setdefault(model, {})
+            per_model[data_key] = y_prob
+            while len(per_model) > PROBABILITIES_PER_MODEL:
+                per_model.pop(next(iter(per_model)))
+    return y_prob
+
+
+def evaluate_model(model, X_test, y_test, threshold=CHURN_THRESHOLD, data_key=None):
     """
     Evaluates how well the trained model performs on unseen test data.
 
     Parameters:
-    - model  : the trained Scikit-Learn pipeline
-    - X_test : the test features (input data the model hasn't seen)
-    - y_test : the actual true labels (0 = retained, 1 = churned)
+    - model     : the trained Scikit-Learn pipeline
+    - X_test    : the test features (input data the model hasn't seen)
+    - y_test    : the actual true labels (0 = retained, 1 = churned)
+    - threshold : players above this churn probability count as "Churn"
+    - data_key  : optional cache key for X_test (see churn_probabilities_for)
 
     Returns:
     - metrics : a dictionary with Accuracy, Precision, Recall, AUC scores
     - y_pred  : the model's predicted labels (used for confusion matrix)
     """
 
-    # Ask the model to make predictions on the test set
-    # y_pred contains 0s and 1s (predicted class labels)
-    y_pred = model.predict(X_test)
+    # The model runs only ONCE: the labels are just "probability above the threshold?"
+    y_prob = churn_probabilities_for(model, X_test, data_key)
+    return metrics_from_probabilities(y_test, y_prob, threshold)
 
-    # predict_proba gives the probability of each class
-    # [:, 1] means "give me the probability of class 1 (Churn)"
-    y_prob = model.predict_proba(X_test)[:, 1]
+
+def metrics_from_probabilities(y_test, y_prob, threshold=CHURN_THRESHOLD):
+    """
+    The evaluate_model metrics for churn probabilities that were already
+    computed (e.g. collected chunk by chunk while streaming a big file).
+
+    Returns (metrics, y_pred), like evaluate_model.
+    """
+    y_pred = churn_labels(y_prob, threshold).astype(int)
 
     # Calculate all 4 evaluation metrics and store them in a dictionary
     metrics = {
         'Accuracy':  accuracy_score(y_test, y_pred),   # Overall correctness
-        'Precision': precision_score(y_test, y_pred),  # Quality of churn predictions
+        'Precision': precision_score(y_test, y_pred, zero_division=0),  # Quality of churn predictions
         'Recall':    recall_score(y_test, y_pred),     # How many churners we caught
         'AUC':       roc_auc_score(y_test, y_prob)     # Overall discrimination ability
     }
@@ -61,6 +116,93 @@ def evaluate_model(model, X_test, y_test):
     return metrics, y_pred
 
 
+def threshold_sweep(y_test, y_prob, false_positive_cost=1.0, false_negative_cost=1.0):
+    """
+    Precision, recall, F1 and cost at EVERY possible threshold, in one pass.
+
+    How it works: sort the players from most to least likely to churn. Moving
+    the threshold down one step turns the next player(s) into "Churn", so
+    running totals (cumulative sums) give the true/false positives at every
+    threshold at once, without re-scoring anything.
+
+    Parameters:
+    - y_test              : the actual labels (0/1)
+    - y_prob              : the churn probabilities
+    - false_positive_cost : cost of treating a happy player as a churner
+                            (e.g. a wasted retention offer)
+    - false_negative_cost : cost of missing a real churner (a lost player)
+
+    Returns a dictionary:
+    - 'curve'  : DataFrame with one row per threshold (players with a
+                 probability ABOVE the threshold are predicted "Churn"):
+                 Threshold, TP, FP, FN, TN, Precision, Recall, F1, FPR, Cost
+    - 'best_cost_threshold' / 'best_f1_threshold' : the row with the lowest cost / highest F1
+    - 'AUC', 'Average Precision' : areas under the ROC / precision-recall curves
+    """
+    y_test = np.asarray(y_test).astype(int)
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+
+    # Most likely churners first
+    order = np.argsort(-y_prob, kind='mergesort')
+    sorted_prob = y_prob[order]
+    sorted_true = y_test[order]
+
+    # Players with the same probability move together: keep the last index of each group
+    group_ends = np.r_[np.flatnonzero(np.diff(sorted_prob)), len(sorted_prob) - 1]
+    true_positives = np.cumsum(sorted_true)[group_ends]
+    false_positives = (group_ends + 1) - true_positives
+
+    # Row 0 = "nobody is a churner", then one row per group
+    positives = int(y_test.sum())
+    negatives = len(y_test) - positives
+    true_positives = np.r_[0, true_positives]
+    false_positives = np.r_[0, false_positives]
+    false_negatives = positives - true_positives
+    true_negatives = negatives - false_positives
+
+    # "p > threshold" selects exactly the groups down to this one when the
+    # threshold is the next lower probability. The last row must select
+    # everyone, also players at exactly 0: its threshold is 0.0, or the
+    # closest number below 0 when some probabilities are 0
+    lowest = sorted_prob[-1]
+    below_all = 0.0 if lowest > 0 else np.nextafter(min(lowest, 0.0), -np.inf)
+    next_lower = np.r_[sorted_prob[group_ends[1:]], below_all]
+    thresholds = np.r_[sorted_prob[0], next_lower]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        predicted_positive = true_positives + false_positives
+        precision = np.where(predicted_positive > 0, true_positives / predicted_positive, 1.0)
+        recall = true_positives / positives if positives else np.zeros_like(true_positives, dtype=float)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        false_positive_rate = false_positives / negatives if negatives else np.zeros_like(false_positives, dtype=float)
+    cost = false_positives * false_positive_cost + false_negatives * false_negative_cost
+
+    curve = pd.DataFrame({
+        'Threshold': thresholds, 'TP': true_positives, 'FP': false_positives,
+        'FN': false_negatives, 'TN': true_negatives, 'Precision': precision,
+        'Recall': recall, 'F1': f1, 'FPR': false_positive_rate, 'Cost': cost,
+    })
+
+    return {
+        'curve': curve,
+        'best_cost_threshold': curve.iloc[int(np.argmin(cost))].to_dict(),
+        'best_f1_threshold': curve.iloc[int(np.argmax(f1))].to_dict(),
+        # Trapezoids under the ROC curve (FPR → recall) = the usual ROC AUC
+        'AUC': float(np.sum(np.diff(false_positive_rate) * (recall[1:] + recall[:-1]) / 2)),
+        # Precision at each step, weighted by how much recall it added
+        'Average Precision': float(np.sum(np.diff(recall) * precision[1:])),
+    }
+
+
+def threshold_analysis(model, X_test, y_test, false_positive_cost=1.0, false_negative_cost=1.0, data_key=None):
+    """
+    threshold_sweep for a model; its probabilities come from the cache when
+    the model was already evaluated on the same data (same data_key).
+    """
+    y_prob = churn_probabilities_for(model, X_test, data_key)
+    return threshold_sweep(y_test, y_prob, false_positive_cost, false_negative_cost)
+
+
 def plot_confusion_matrix(y_test, y_pred):
     """
     Creates a heatmap showing the Confusion Matrix.
@@ -81,7 +223,8 @@ def plot_confusion_matrix(y_test, y_pred):
     - y_pred : the model's predicted labels
 
     Returns:
-    - fig : a matplotlib figure object (Streamlit can display this with st.pyplot)
+    - fig : a matplotlib figure object (turn it into an image with
+            figure_cache.figure_to_png, or display it with st.pyplot)
     """
 
     # Compute the confusion matrix values
@@ -89,7 +232,8 @@ def plot_confusion_matrix(y_test, y_pred):
 
     # Create a new figure and axes for the plot
     # figsize=(6, 4) means 6 inches wide, 4 inches tall
-    fig, ax = plt.subplots(figsize=(6, 4))
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
 
     # Draw the heatmap using seaborn
     # annot=True     → show the numbers inside each cell
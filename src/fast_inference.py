@@ -0,0 +1,413 @@
+"""
+fast_inference.py
+-----------------
+A fast way to score ONE player (or a small batch) with a trained pipeline.
+
+pipeline.predict_proba is built for big tables: for a single player it
+creates a one-row pandas DataFrame, checks the column types and runs it
+through the ColumnTransformer. That fixed overhead (milliseconds) is far
+bigger than the actual maths (microseconds).
+
+compile_pipeline() reads everything the maths needs out of a fitted pipeline
+ONCE:
+- the scaler's means and standard deviations
+- a lookup table from (column, category) to its one-hot column
+- the category → code tables of ordinal encoders (for the fixed-vocabulary
+  encoders of encoders.py this is just the vocabulary)
+- the model's coefficients (linear models) or its trees (decision trees,
+  random forests), flattened into plain NumPy arrays
+
+and returns a FastScorer that scores a dict (or NumPy record) directly.
+Pipelines it doesn't understand (e.g. HistGradientBoosting) give None, and
+churn_probability() then falls back to the normal pandas path.
+
+verify_parity() checks that both paths give the same probabilities.
+get_fast_scorer() runs that check on every pipeline it compiles, before the
+scorer is cached: on the players it is given, or else on PARITY_PROBE_ROWS
+made-up players built from the pipeline's own scaler statistics and
+category lists (so models loaded from the registry are checked too). A
+scorer that fails the check is never used; its pipeline keeps using
+predict_proba.
+"""
+
+import math
+import weakref
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder, StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from src.encoders import CodeOneHotEncoder, CodeOrdinalEncoder
+from src.pipeline import to_float32
+
+# Largest difference from pipeline.predict_proba we accept as "the same"
+PARITY_TOLERANCE = 1e-6
+
+# How many made-up players the parity check uses when no real players are given
+PARITY_PROBE_ROWS = 200
+
+
+class UnsupportedPipeline(Exception):
+    """ Raised while compiling a pipeline step we don't know how to speed up. """
+
+
+class FastScorer:
+    """
+    Scores players without pandas or the ColumnTransformer.
+
+    Built by compile_pipeline(); don't create it directly.
+    """
+
+    def __init__(self, n_features, numeric_columns, onehot_positions, ordinal_columns, model_kind, model_arrays):
+        self.n_features = n_features
+        # [(column name, position, mean, scale)]
+        self.numeric_columns = numeric_columns
+        # {column name: {category: position}}
+        self.onehot_positions = onehot_positions
+        # [(column name, position, {category: code}, code for unknown categories)]
+        self.ordinal_columns = ordinal_columns
+        # 'linear' or 'trees'
+        self.model_kind = model_kind
+        self.model_arrays = model_arrays
+
+    # ── Building the feature vector ────────────────────────────────────
+    def features(self, record):
+        """ The preprocessed feature vector of one player (same columns as the ColumnTransformer). """
+        vector = [0.0] * self.n_features
+        for column, position, mean, scale in self.numeric_columns:
+            vector[position] = (float(record[column]) - mean) / scale
+        for column, positions in self.onehot_positions.items():
+            position = positions.get(record[column])
+            if position is not None:       # unknown category → all zeros (handle_unknown='ignore')
+                vector[position] = 1.0
+        for column, position, codes, unknown_code in self.ordinal_columns:
+            vector[position] = codes.get(record[column], unknown_code)
+        return vector
+
+    def feature_matrix(self, records):
+        """ Feature vectors of many players, as one 2D array. """
+        return np.array([self.features(record) for record in records], dtype=np.float64).reshape(-1, self.n_features)
+
+    # ── Scoring ────────────────────────────────────────────────────────
+    def churn_probability(self, record):
+        """ The churn probability of one player (a dict or NumPy record). """
+        if self.model_kind == 'linear':
+            # For one row, plain Python is faster than building NumPy arrays
+            weights = self.model_arrays['weights']
+            score = self.model_arrays['intercept']
+            for column, position, mean, scale in self.numeric_columns:
+                score += weights[position] * (float(record[column]) - mean) / scale
+            for column, positions in self.onehot_positions.items():
+                position = positions.get(record[column])
+                if position is not None:
+                    score += weights[position]
+            for column, position, codes, unknown_code in self.ordinal_columns:
+                score += weights[position] * codes.get(record[column], unknown_code)
+            return self._sigmoid(score)
+
+        return float(self._tree_probabilities(np.array([self.features(record)]))[0])
+
+    def churn_probabilities(self, records):
+        """ Churn probabilities of many players (a list of dicts or a NumPy record array). """
+        matrix = self.feature_matrix(records)
+        if self.model_kind == 'linear':
+            scores = matrix @ self.model_arrays['weight_array'] + self.model_arrays['intercept']
+            return 1.0 / (1.0 + np.exp(-scores))
+        return self._tree_probabilities(matrix)
+
+    @staticmethod
+    def _sigmoid(score):
+        if score >= 0:
+            return 1.0 / (1.0 + math.exp(-score))
+        exp_score = math.exp(score)
+        return exp_score / (1.0 + exp_score)
+
+    def _tree_probabilities(self, matrix):
+        """
+        Walks every tree for every row at once.
+
+        All trees are stored in one set of flat arrays. Leaves point to
+        themselves, so after 'max_depth' steps every row has reached a leaf
+        in every tree.
+        """
+        arrays = self.model_arrays
+        # scikit-learn compares 32-bit features against the thresholds
+        matrix = matrix.astype(np.float32)
+        rows = np.arange(len(matrix))[:, None]
+        nodes = np.broadcast_to(arrays['roots'], (len(matrix), len(arrays['roots'])))
+        for _ in range(arrays['max_depth']):
+            values = matrix[rows, arrays['feature'][nodes]]
+            go_left = np.where(np.isnan(values), arrays['missing_left'][nodes], values <= arrays['threshold'][nodes])
+            nodes = np.where(go_left, arrays['left'][nodes], arrays['right'][nodes])
+        return arrays['leaf_churn_proba'][nodes].mean(axis=1)
+
+
+# ── Compiling a pipeline ───────────────────────────────────────────────────
+def _numeric_settings(transformer, columns):
+    """ (mean, scale) per column for passthrough / float32 / StandardScaler steps. """
+    means = np.zeros(len(columns))
+    scales = np.ones(len(columns))
+    steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+    for step in steps:
+        if step == 'passthrough' or (isinstance(step, FunctionTransformer) and step.func is to_float32):
+            continue
+        if isinstance(step, StandardScaler):
+            # A second scaler would apply on top of the first
+            if means.any() or (scales != 1).any():
+                raise UnsupportedPipeline("two scalers in a row")
+            if step.mean_ is not None:
+                means = np.asarray(step.mean_, dtype=np.float64)
+            if step.scale_ is not None:
+                scales = np.asarray(step.scale_, dtype=np.float64)
+            continue
+        raise UnsupportedPipeline(f"numeric step {type(step).__name__}")
+    return means, scales
+
+
+def _single_step(transformer):
+    """ Unwraps a one-step Pipeline (e.g. Pipeline([('onehot', OneHotEncoder())])). """
+    if isinstance(transformer, Pipeline) and len(transformer.steps) == 1:
+        return transformer.steps[0][1]
+    return transformer
+
+
+def _compile_preprocessor(preprocessor):
+    if isinstance(preprocessor, ColumnTransformer) == False:
+        raise UnsupportedPipeline(f"preprocessor {type(preprocessor).__name__}")
+
+    position = 0
+    numeric_columns, onehot_positions, ordinal_columns = [], {}, []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop' or len(columns) == 0:
+            continue
+        if name == 'remainder':
+            raise UnsupportedPipeline("remainder columns")
+        columns = list(columns)
+
+        step = _single_step(transformer)
+        if isinstance(step, (CodeOneHotEncoder, CodeOrdinalEncoder)):
+            # Fixed-vocabulary encoders: the vocabulary is the category → code table
+            for column, categories in zip(columns, step.categories_):
+                if isinstance(step, CodeOneHotEncoder):
+                    onehot_positions[column] = {category: position + i for i, category in enumerate(categories)}
+                    position += len(categories)
+                else:
+                    ordinal_columns.append((column, position,
+                                            {category: float(i) for i, category in enumerate(categories)}, np.nan))
+                    position += 1
+        elif isinstance(step, OneHotEncoder):
+            if step.drop_idx_ is not None or getattr(step, '_infrequent_enabled', False):
+                raise UnsupportedPipeline("one-hot encoder with drop/infrequent categories")
+            for column, categories in zip(columns, step.categories_):
+                onehot_positions[column] = {category: position + i for i, category in enumerate(categories)}
+                position += len(categories)
+        elif isinstance(step, OrdinalEncoder):
+            unknown_code = float(step.unknown_value) if step.handle_unknown == 'use_encoded_value' else np.nan
+            for column, categories in zip(columns, step.categories_):
+                ordinal_columns.append((column, position, {category: float(i) for i, category in enumerate(categories)},
+                                        unknown_code))
+                position += 1
+        else:
+            means, scales = _numeric_settings(transformer, columns)
+            for column, mean, scale in zip(columns, means, scales):
+                numeric_columns.append((column, position, float(mean), float(scale)))
+                position += 1
+
+    return position, numeric_columns, onehot_positions, ordinal_columns
+
+
+def _churn_index(model):
+    classes = list(model.classes_)
+    if len(classes) != 2 or 1 not in classes:
+        raise UnsupportedPipeline("model is not a binary churn classifier")
+    return classes.index(1)
+
+
+def _compile_linear(model):
+    if isinstance(model, SGDClassifier) and model.loss != 'log_loss':
+        raise UnsupportedPipeline("SGDClassifier without log_loss has no probabilities")
+    weights = np.asarray(model.coef_, dtype=np.float64).ravel()
+    intercept = float(np.ravel(model.intercept_)[0])
+    # coef_ describes class classes_[1]; flip the sign if that isn't "churn"
+    if _churn_index(model) == 0:
+        weights, intercept = -weights, -intercept
+    return {'weights': weights.tolist(), 'weight_array': weights, 'intercept': intercept}
+
+
+def _compile_trees(estimators, churn_index):
+    """ Joins every tree into one set of flat arrays (see FastScorer._tree_probabilities). """
+    roots, left, right, feature, threshold, missing_left, leaf_churn_proba = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves point to themselves, so extra steps keep them where they are
+        left.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        missing = getattr(tree, 'missing_go_to_left', None)
+        missing_left.append(np.ones(tree.node_count, dtype=bool) if missing is None else missing.astype(bool))
+
+        class_weights = tree.value[:, 0, :]
+        totals = class_weights.sum(axis=1)
+        totals[totals == 0] = 1.0
+        leaf_churn_proba.append(class_weights[:, churn_index] / totals)
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        'roots': np.array(roots),
+        'left': np.concatenate(left), 'right': np.concatenate(right),
+        'feature': np.concatenate(feature), 'threshold': np.concatenate(threshold),
+        'missing_left': np.concatenate(missing_left),
+        'leaf_churn_proba': np.concatenate(leaf_churn_proba),
+        'max_depth': max_depth,
+    }
+
+
+def compile_pipeline(pipeline, check_rows=None):
+    """
+    Turns a fitted pipeline into a FastScorer, or returns None if the
+    pipeline has a step this module doesn't support.
+
+    - check_rows : optional DataFrame of players; if given, the scorer is only
+                   returned when it matches pipeline.predict_proba on them
+    """
+    try:
+        preprocessor = pipeline.named_steps['preprocessor']
+        model = pipeline.named_steps['model']
+        n_features, numeric_columns, onehot_positions, ordinal_columns = _compile_preprocessor(preprocessor)
+
+        if isinstance(model, (LogisticRegression, SGDClassifier)):
+            model_kind, model_arrays = 'linear', _compile_linear(model)
+        elif isinstance(model, DecisionTreeClassifier):
+            model_kind, model_arrays = 'trees', _compile_trees([model], _churn_index(model))
+        elif isinstance(model, RandomForestClassifier):
+            model_kind, model_arrays = 'trees', _compile_trees(model.estimators_, _churn_index(model))
+        else:
+            raise UnsupportedPipeline(f"model {type(model).__name__}")
+    except (UnsupportedPipeline, AttributeError, KeyError):
+        return None
+
+    scorer = FastScorer(n_features, numeric_columns, onehot_positions, ordinal_columns, model_kind, model_arrays)
+    if check_rows is not None and verify_parity(pipeline, check_rows, scorer)[0] == False:
+        return None
+    return scorer
+
+
+def verify_parity(pipeline, X, scorer=None, tolerance=PARITY_TOLERANCE):
+    """
+    Compares the fast path with pipeline.predict_proba on the players in X.
+
+    Returns (ok, largest difference). ok is False if the pipeline can't be
+    compiled or any probability differs by more than 'tolerance'.
+    """
+    scorer = scorer or compile_pipeline(pipeline)
+    if scorer is None:
+        return False, float('inf')
+
+    expected = pipeline.predict_proba(X)[:, 1]
+    records = X.to_dict('records')
+    fast_batch = scorer.churn_probabilities(records)
+    fast_single = np.array([scorer.churn_probability(record) for record in records])
+
+    difference = float(max(np.max(np.abs(fast_batch - expected)), np.max(np.abs(fast_single - expected))))
+    return difference <= tolerance, difference
+
+
+# ── Cached scorers ─────────────────────────────────────────────────────────
+def probe_rows(pipeline, scorer, n_rows=PARITY_PROBE_ROWS, seed=0):
+    """
+    Made-up players to check a compiled scorer on, when no real ones are at hand.
+
+    Numbers are drawn around each column's training mean (mean ± a few
+    standard deviations, from the scaler), categories from the encoder's
+    known values. Returns a DataFrame with the pipeline's input columns.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column, _, mean, scale in scorer.numeric_columns:
+        columns[column] = mean + scale * rng.standard_normal(n_rows)
+    for column, positions in scorer.onehot_positions.items():
+        columns[column] = rng.choice(np.array(list(positions), dtype=object), n_rows)
+    for column, _, codes, _ in scorer.ordinal_columns:
+        columns[column] = rng.choice(np.array(list(codes), dtype=object), n_rows)
+
+    # Same column order as training (columns the pipeline drops are filled with 0)
+    names = getattr(pipeline.named_steps['preprocessor'], 'feature_names_in_', None)
+    names = list(names) if names is not None else list(columns)
+    return pd.DataFrame({name: columns.get(name, np.zeros(n_rows)) for name in names})
+
+
+def _checked_scorer(pipeline, check_rows=None):
+    """ Compiles a pipeline and returns the scorer only if it passes the parity check (else None). """
+    scorer = compile_pipeline(pipeline)
+    if scorer is None:
+        return None
+    try:
+        if check_rows is None:
+            check_rows = probe_rows(pipeline, scorer)
+        ok, _ = verify_parity(pipeline, check_rows, scorer)
+    except Exception:
+        # predict_proba can't score the check rows, so nothing proves the scorer right
+        ok = False
+    return scorer if ok else None
+
+
+# One compiled scorer per pipeline object (forgotten when the pipeline is)
+_scorers = weakref.WeakKeyDictionary()
+
+
+def get_fast_scorer(pipeline, check_rows=None):
+    """
+    The compiled scorer of a pipeline (compiled on first use), or None if it
+    is unsupported or doesn't match predict_proba.
+
+    - check_rows : players to verify parity on when compiling; without them
+                   the check uses made-up players (see probe_rows)
+    """
+    try:
+        if pipeline not in _scorers:
+            _scorers[pipeline] = _checked_scorer(pipeline, check_rows)
+        return _scorers[pipeline]
+    except TypeError:
+        # Objects that can't be weakly referenced are never cached
+        return _checked_scorer(pipeline, check_rows)
+
+
+def churn_probability(pipeline, player_data):
+    """
+    The churn probability of one player (a dict of feature values).
+    Uses the fast path when the pipeline supports it, otherwise predict_proba.
+    """
+    scorer = get_fast_scorer(pipeline)
+    if scorer is not None:
+        return scorer.churn_probability(player_data)
+
+    import pandas as pd
+    return float(pipeline.predict_proba(pd.DataFrame([player_data]))[0][1])
+
+
+def churn_probabilities(pipeline, records):
+    """
+    Churn probabilities for a list of player dicts, as a NumPy array.
+    Uses the fast path when the pipeline supports it, otherwise predict_proba.
+    """
+    scorer = get_fast_scorer(pipeline)
+    if scorer is not None:
+        return np.asarray(scorer.churn_probabilities(records))
+
+    import pandas as pd
+    return pipeline.predict_proba(pd.DataFrame.from_records(records))[:, 1]
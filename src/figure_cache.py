@@ -0,0 +1,176 @@
+"""
+figure_cache.py
+---------------
+Renders matplotlib charts to PNG bytes ONCE and serves the bytes afterwards.
+
+Drawing a chart with matplotlib is the slowest part of a Streamlit rerun,
+yet most charts never change between reruns: the overview charts depend only
+on the dataset, the confusion matrix only on the trained model. So every
+chart is stored as PNG bytes under a key made of:
+    (dataset or model fingerprint, chart name, chart parameters)
+
+- Cached charts come from memory (an LRU cache) or, after a restart, from
+  .cache/figures on disk, and are shown with st.image
+- Missing charts are drawn in background threads. render_all() starts every
+  missing chart at once and then waits for them, so the charts of a tab are
+  drawn side by side instead of one after another
+- Two sessions asking for the same missing chart share one rendering
+
+Draw functions must build a matplotlib Figure directly
+(matplotlib.figure.Figure), NOT use pyplot: pyplot keeps global state and is
+not safe to use from several threads.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.lru_cache import LRUCache, MISSING
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIGURE_FOLDER = os.path.join(PROJECT_FOLDER, '.cache', 'figures')
+
+# Bump this whenever a chart's look changes, so old images are not reused
+FIGURE_STYLE_VERSION = 1
+
+# Oldest-used images are deleted once the folder holds more than this many
+FIGURE_CACHE_MAX_FILES = 500
+
+# Resolution of the saved images
+FIGURE_DPI = 100
+
+# Threads that draw missing charts
+RENDER_THREADS = 4
+
+_figure_cache = LRUCache(max_size=128)
+_render_pool = ThreadPoolExecutor(max_workers=RENDER_THREADS, thread_name_prefix="figure-render")
+
+# Renders in progress: key → Future (so the same chart is never drawn twice at once)
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def figure_to_png(fig):
+    """ Saves a matplotlib Figure as PNG bytes. """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=FIGURE_DPI, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+
+def _file_for(key):
+    digest = hashlib.sha256(repr((FIGURE_STYLE_VERSION, key)).encode()).hexdigest()
+    return os.path.join(FIGURE_FOLDER, f"{digest}.png")
+
+
+def _read_from_disk(key):
+    path = _file_for(key)
+    try:
+        with open(path, 'rb') as file:
+            png = file.read()
+    except OSError:
+        return None
+    # Mark the file as recently used (old files are deleted first)
+    os.utime(path)
+    return png
+
+
+def _write_to_disk(key, png):
+    try:
+        os.makedirs(FIGURE_FOLDER, exist_ok=True)
+        path = _file_for(key)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(png)
+        os.replace(temporary_path, path)
+        _trim_folder()
+    except OSError:
+        pass
+
+
+def _trim_folder():
+    """ Deletes least-recently-used images until at most FIGURE_CACHE_MAX_FILES remain. """
+    files = []
+    for name in os.listdir(FIGURE_FOLDER):
+        if name.endswith('.png'):
+            full_path = os.path.join(FIGURE_FOLDER, name)
+            try:
+                files.append((os.stat(full_path).st_mtime, full_path))
+            except OSError:
+                pass
+    for _, full_path in sorted(files)[:max(0, len(files) - FIGURE_CACHE_MAX_FILES)]:
+        try:
+            os.remove(full_path)
+        except OSError:
+            pass
+
+
+def _render(key, draw, args, kwargs):
+    """ Runs in a render thread: draws the chart, stores the PNG, returns it. """
+    try:
+        png = figure_to_png(draw(*args, **kwargs))
+        if key is not None:
+            _figure_cache.put(key, png)
+            _write_to_disk(key, png)
+        return png
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def request_png(key, draw, *args, **kwargs):
+    """
+    Starts getting a chart and returns a Future whose result is the PNG bytes.
+
+    - key  : (fingerprint, chart name, parameters...). None = don't cache
+             (e.g. the dataset has no fingerprint)
+    - draw : function(*args, **kwargs) that returns a matplotlib Figure
+
+    Cached charts return an already-finished Future.
+    """
+    if key is not None:
+        png = _figure_cache.get(key)
+        if png is MISSING:
+            png = _read_from_disk(key)
+            if png is not None:
+                _figure_cache.put(key, png)
+        if png is not None and png is not MISSING:
+            return _finished(png)
+
+    with _pending_lock:
+        if key is not None and key in _pending:
+            return _pending[key]
+        future = _render_pool.submit(_render, key, draw, args, kwargs)
+        if key is not None:
+            _pending[key] = future
+        return future
+
+
+def _finished(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def cached_png(key, draw, *args, **kwargs):
+    """ The PNG bytes of one chart (drawn in a render thread on a cache miss). """
+    return request_png(key, draw, *args, **kwargs).result()
+
+
+def render_all(requests):
+    """
+    Gets several charts at once: every missing chart starts rendering before
+    we wait for any of them.
+
+    - requests : {name: (key, draw, args)}
+
+    Returns {name: PNG bytes}.
+    """
+    futures = {name: request_png(key, draw, *args) for name, (key, draw, args) in requests.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def figure_cache_stats():
+    """ Size and hit/miss counts of the in-memory figure cache. """
+    return _figure_cache.stats()
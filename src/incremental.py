@@ -0,0 +1,222 @@
+"""
+incremental.py
+--------------
+Incremental ("online") training: update a model with new labelled players
+instead of retraining on the whole dataset.
+
+New engagement labels arrive every day. With a normal model we would have to
+refit on the full CSV each time. The incremental model instead:
+1. Uses a FIXED list of categories (CATEGORY_VALUES in data_loader.py), so the
+   one-hot columns never change between updates
+2. Keeps running scaler statistics (StandardScaler.partial_fit), so the mean
+   and standard deviation include every row it has ever seen
+3. Trains an SGD logistic regression with partial_fit, one chunk at a time
+
+Each update is saved as a NEW version in the model registry (the old one is
+kept, so an update can be rolled back). If the updated model was promoted,
+the new version is promoted too.
+
+Command line:
+    python -m src.incremental init data/online_gaming_behavior_dataset.csv
+    python -m src.incremental update data/todays_labels.csv --model default
+"""
+
+import argparse
+import copy
+import time
+
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.data_loader import CATEGORY_VALUES, DEFAULT_CHUNK_SIZE, get_feature_lists, iter_data, load_data
+from src.encoders import CodeOneHotEncoder
+from src.evaluation import evaluate_model
+from src.model_registry import load_model, register_model, promote_model, resolve_version
+from src.pipeline import create_model
+from src.training import NON_FEATURE_COLUMNS
+
+INCREMENTAL_MODEL_TYPE = 'SGDLogistic'
+
+# The two classes the model can predict (every partial_fit call must know both,
+# because one chunk may contain only churners or only retained players)
+CHURN_CLASSES = [0, 1]
+
+# A new model makes several passes over its first dataset; daily updates make one
+INIT_EPOCHS = 5
+UPDATE_EPOCHS = 1
+
+
+def create_incremental_pipeline(numerical_features, categorical_features):
+    """
+    Builds an (untrained) pipeline that can be updated chunk by chunk.
+
+    The one-hot encoder gets its categories from CATEGORY_VALUES instead of
+    learning them from the data (and reads the chunks' category codes), so
+    every chunk produces the same columns.
+    """
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', CodeOneHotEncoder([CATEGORY_VALUES[column] for column in categorical_features]),
+             categorical_features)
+        ]
+    )
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('model', create_model(INCREMENTAL_MODEL_TYPE, numerical_features, categorical_features))
+    ])
+
+
+def partial_fit_pipeline(pipeline, X, y, update_scaler=True):
+    """
+    Updates the pipeline with one chunk of labelled players.
+
+    - The first chunk sets everything up (fits the scaler and the encoder)
+    - Later chunks update the scaler's running mean/std (unless
+      update_scaler is False, e.g. when the same rows are seen again),
+      then train the model a little more on the new rows
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    numerical_features = preprocessor.transformers[0][2]
+
+    if hasattr(preprocessor, 'transformers_'):
+        if update_scaler:
+            preprocessor.named_transformers_['num'].partial_fit(X[numerical_features])
+    else:
+        preprocessor.fit(X)
+
+    pipeline.named_steps['model'].partial_fit(preprocessor.transform(X), y, classes=CHURN_CLASSES)
+    return pipeline
+
+
+def train_incrementally(pipeline, source, chunk_size=DEFAULT_CHUNK_SIZE, epochs=1):
+    """
+    Streams a labelled CSV through partial_fit_pipeline, one chunk at a time,
+    so memory use stays bounded no matter how big the file is.
+
+    - epochs : how many times to go over the file (the scaler only counts
+               each row once, in the first pass)
+
+    Returns the number of rows in the file.
+    """
+    rows = 0
+    for epoch in range(epochs):
+        for chunk in iter_data(source, chunk_size):
+            chunk = chunk.dropna(subset=['Churn'])
+            if len(chunk) == 0:
+                continue
+            X = chunk.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
+            partial_fit_pipeline(pipeline, X, chunk['Churn'], update_scaler=(epoch == 0))
+            if epoch == 0:
+                rows += len(chunk)
+    return rows
+
+
+def _metrics_on(pipeline, evaluation_csv):
+    """ Evaluates on a labelled CSV (or returns {} when none is given). """
+    if evaluation_csv is None:
+        return {}
+    df = load_data(evaluation_csv)
+    if df is None:
+        return {}
+    metrics, _ = evaluate_model(pipeline, df.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore'), df['Churn'])
+    return metrics
+
+
+def init_model(source, chunk_size=DEFAULT_CHUNK_SIZE, evaluation_csv=None, promote=False, epochs=INIT_EPOCHS):
+    """
+    Trains a brand-new incremental model on a labelled CSV and registers it.
+    Returns the registered metadata.
+    """
+    numerical_features, categorical_features = get_feature_lists()
+    pipeline = create_incremental_pipeline(numerical_features, categorical_features)
+    rows = train_incrementally(pipeline, source, chunk_size, epochs)
+    if rows == 0:
+        raise ValueError(f"{source} has no labelled rows to train on")
+
+    metadata = register_model(
+        pipeline, INCREMENTAL_MODEL_TYPE, numerical_features, categorical_features,
+        metrics=_metrics_on(pipeline, evaluation_csv),
+        extra_metadata={"incremental": True, "rows_seen": rows, "updates": 0, "parent_version": None}
+    )
+    if promote:
+        promote_model(metadata["version"])
+    return metadata
+
+
+def update_model(source, which='default', chunk_size=DEFAULT_CHUNK_SIZE, evaluation_csv=None,
+                 epochs=UPDATE_EPOCHS):
+    """
+    Continues training a registered incremental model on new labelled rows
+    and registers the result as a new version (carrying over the promotion).
+
+    - which : the model to update ('default', 'promoted', 'latest' or a version)
+
+    Returns the new metadata. Raises ValueError if the model can't be updated.
+    """
+    pipeline, metadata = load_model(which)
+    if pipeline is None:
+        raise ValueError(f"No registered model matches {which!r}")
+    if metadata.get("model_type") != INCREMENTAL_MODEL_TYPE:
+        raise ValueError(f"Model {metadata['version']} is a {metadata.get('model_type')} model and can't be "
+                         "updated incrementally. Create an incremental model with 'init' first.")
+
+    # The registry's copy is shared and read-only (memory-mapped), so update a private copy
+    pipeline = copy.deepcopy(pipeline)
+    rows = train_incrementally(pipeline, source, chunk_size, epochs)
+    if rows == 0:
+        raise ValueError(f"{source} has no labelled rows to train on")
+
+    new_metadata = register_model(
+        pipeline, INCREMENTAL_MODEL_TYPE,
+        metadata["features"]["numerical"], metadata["features"]["categorical"],
+        metrics=_metrics_on(pipeline, evaluation_csv),
+        extra_metadata={
+            "incremental": True,
+            "rows_seen": metadata.get("rows_seen", 0) + rows,
+            "rows_added": rows,
+            "updates": metadata.get("updates", 0) + 1,
+            "parent_version": metadata["version"],
+        }
+    )
+    if resolve_version('promoted') == metadata["version"]:
+        promote_model(new_metadata["version"])
+    return new_metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or update an incremental churn model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = commands.add_parser("init", help="Train a new incremental model on a labelled CSV")
+    init_parser.add_argument("dataset")
+    init_parser.add_argument("--promote", action="store_true", help="Make it the default model")
+
+    update_parser = commands.add_parser("update", help="Continue training a registered model on new labels")
+    update_parser.add_argument("dataset")
+    update_parser.add_argument("--model", default="default",
+                               help="Model to update: default, promoted, latest or a version like 0003")
+
+    for command_parser in (init_parser, update_parser):
+        command_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        command_parser.add_argument("--eval", default=None, help="Labelled CSV to measure the new model on")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        if args.command == "init":
+            metadata = init_model(args.dataset, args.chunk_size, args.eval, args.promote)
+        else:
+            metadata = update_model(args.dataset, args.model, args.chunk_size, args.eval)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    auc = metadata["metrics"].get("AUC")
+    auc_text = f", AUC {auc:.3f}" if auc is not None else ""
+    print(f"Registered model {metadata['version']} ({metadata['rows_seen']:,} rows seen{auc_text}) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+jobs.py
+-------
+Background training jobs, so clicking "Train" never blocks the Streamlit page.
+
+Each job trains one model type in a separate worker process:
+1. The job is queued on one of several worker processes, so several model
+   types can train at the same time for comparison
+2. The worker reports its progress (stage, percentage and intermediate
+   metrics) through a shared queue. A listener thread in the app process
+   copies every report onto the job, where the UI can read it
+3. When the worker finishes, the app process registers the model in the
+   model registry, so the result is kept even if the user left the page
+4. A job can be cancelled. Queued jobs never start; running jobs stop at
+   the next checkpoint. RandomForest is trained in stages of trees
+   (warm_start), which gives it checkpoints and intermediate AUCs
+
+The hyperparameter search (tuning.py) runs as a job too: it reports which
+model type it is tuning, can be cancelled between model types, and its
+winner is registered like any trained model.
+
+Workers read the dataset from the Feather file in the dataset cache (see
+data_loader.py) instead of receiving a pickled copy of the DataFrame, and
+skip even that when they already have the dataset's split cached. Jobs
+with a sample_size train out of core (training.train_out_of_core): they
+stream that file chunk by chunk and never load the whole table.
+
+Each worker is a long-lived process with its own split and preprocessing
+caches (see training.py: switching algorithms only refits the model). Those
+caches live in the worker, not in the app, so a job is sent to a worker that
+has already prepared its dataset whenever one is free ("dataset affinity").
+Jobs that run at the same time on different workers each fit their own
+preprocessing, side by side. The pipeline a job returns is an unpickled
+copy, so it does not share its fitted preprocessor with other pipelines.
+
+The job manager is shared by every session in the app process:
+    manager = get_job_manager()
+    job_id = manager.submit(df, 'RandomForest', test_size=0.2)
+    manager.get(job_id).progress   → 0.0 … 1.0
+    search_id = manager.submit_tuning(df, ['RandomForest', 'HistGradientBoosting'])
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from src.data_loader import cached_dataset_path, get_feature_lists
+from src.evaluation import evaluate_model
+from src.model_registry import register_model
+from src.pipeline import create_model
+from src.training import (HASHED_SPLIT, STRATIFIED_SPLIT, cached_split, fitted_preprocessor, has_cached_split,
+                          train_model, train_out_of_core)
+from src.tuning import DEFAULT_TIME_BUDGET_SECONDS, tune_models
+
+# How many jobs may train at the same time (at least 2, so model types can be compared)
+DEFAULT_MAX_WORKERS = min(4, max(2, os.cpu_count() or 1))
+
+# How many recently trained datasets a worker is considered "warm" for
+# (the size of training._split_cache)
+WARM_DATASETS_PER_WORKER = 4
+
+# Model types trained in stages: model type → (parameter that grows, what it counts, number of stages)
+STAGED_MODELS = {
+    'RandomForest': ('n_estimators', 'Trees', 5),
+}
+
+# The model_type a hyperparameter search job shows until it has a winner
+TUNING_JOB = 'Hyperparameter search'
+
+# Finished jobs that are remembered (the oldest are forgotten first)
+MAX_FINISHED_JOBS = 20
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """ Raised inside a worker when its job was cancelled. """
+
+
+class TrainingJob:
+    """ Everything the UI shows about one job. Updated by the job manager. """
+
+    def __init__(self, job_id, model_type, test_size, compact, data_fingerprint, sample_size=None):
+        self.job_id = job_id
+        self.model_type = model_type
+        self.test_size = test_size
+        self.compact = compact
+        self.data_fingerprint = data_fingerprint
+        self.sample_size = sample_size
+        # Sampled jobs train out of core, which splits by hashed PlayerID
+        self.split = HASHED_SPLIT if sample_size else STRATIFIED_SPLIT
+
+        self.status = QUEUED
+        self.stage = "Waiting for a free worker"
+        self.progress = 0.0
+        self.history = []          # intermediate metrics, e.g. [{"Trees": 20, "AUC": 0.93}, ...]
+        self.metrics = {}
+        self.model_info = None
+        self.pipeline = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.finishing = False     # set when the job manager starts finishing the job
+        self.tuning_results = None # hyperparameter search jobs: one row per model type tuned
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+# ── Worker side (runs in the worker processes) ───────────────────────────
+def _load_dataset(dataset, fingerprint):
+    """ 'dataset' is a Feather path from the dataset cache, or a DataFrame. """
+    if isinstance(dataset, str):
+        import pyarrow.feather as feather
+        df = feather.read_table(dataset, memory_map=True).to_pandas()
+    else:
+        df = dataset
+    df.attrs['fingerprint'] = fingerprint
+    return df
+
+
+def _dataset_stand_in(fingerprint):
+    """
+    An empty DataFrame carrying only the dataset's fingerprint. Enough for
+    cached_split / fitted_preprocessor when this worker has the split cached.
+    """
+    df = pd.DataFrame()
+    df.attrs['fingerprint'] = fingerprint
+    return df
+
+
+def _job_dataset(dataset, fingerprint, test_size, checkpoint):
+    """ The dataset a job trains on; a stand-in when this worker has its split cached. """
+    if fingerprint is not None and has_cached_split(fingerprint, test_size):
+        # This worker split the dataset before: the split and preprocessing
+        # come from its caches, so the file is not read again
+        checkpoint("Reusing the cached split", 0.02)
+        return _dataset_stand_in(fingerprint)
+    checkpoint("Loading data", 0.02)
+    return _load_dataset(dataset, fingerprint)
+
+
+def _train_in_stages(df, model_type, test_size, n_jobs, compact, checkpoint):
+    """
+    Trains a STAGED_MODELS model a few steps at a time with warm_start.
+    The result is the same as training it in one go (the trees are identical),
+    but the job can report the test AUC and be cancelled after each stage.
+    """
+    X_train, X_test, y_train, y_test = cached_split(df, test_size)
+    preprocessor, X_train_transformed = fitted_preprocessor(df, model_type, test_size, compact=compact)
+    X_test_transformed = preprocessor.transform(X_test)
+
+    numerical_features, categorical_features = get_feature_lists()
+    model = create_model(model_type, numerical_features, categorical_features, n_jobs=n_jobs)
+    parameter, unit, stages = STAGED_MODELS[model_type]
+    final_size = model.get_params()[parameter]
+    model.set_params(warm_start=True)
+
+    for stage in range(1, stages + 1):
+        size = max(1, final_size * stage // stages)
+        model.set_params(**{parameter: size})
+        model.fit(X_train_transformed, y_train)
+        auc = roc_auc_score(y_test, model.predict_proba(X_test_transformed)[:, 1])
+        checkpoint(f"Trained {size} of {final_size} {unit.lower()}", 0.1 + 0.8 * stage / stages,
+                   {unit: size, "AUC": float(auc)})
+
+    model.set_params(warm_start=False)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+    pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('model', model)])
+    return pipeline, X_train, X_test, y_train, y_test
+
+
+def _run_job(job_id, dataset, fingerprint, model_type, test_size, n_jobs, compact, sample_size,
+             progress_queue, cancelled):
+    """ The work of one job, inside a worker process. Returns the trained pipeline and its results. """
+
+    def checkpoint(stage, progress, metrics=None):
+        if cancelled.get(job_id):
+            raise JobCancelled()
+        progress_queue.put((job_id, stage, progress, metrics))
+
+    if sample_size:
+        # Streams the cached Feather file chunk by chunk: the full table is never loaded
+        pipeline, report = train_out_of_core(dataset, model_type, test_size, sample_size, n_jobs=n_jobs,
+                                             compact=compact, progress=checkpoint)
+        return {"pipeline": pipeline, "metrics": report["metrics"], "train_rows": report["train_rows"],
+                "test_rows": report["test_rows"], "fit_seconds": report["fit_seconds"],
+                "extra_metadata": {"split": HASHED_SPLIT, "sample_rows": report["fitted_rows"],
+                                   "wall_seconds": report["wall_seconds"],
+                                   "peak_memory_mb": report["peak_memory_mb"]}}
+
+    df = _job_dataset(dataset, fingerprint, test_size, checkpoint)
+
+    checkpoint("Splitting and preprocessing", 0.05)
+    start = time.perf_counter()
+    if model_type in STAGED_MODELS:
+        pipeline, X_train, X_test, y_train, y_test = _train_in_stages(df, model_type, test_size, n_jobs, compact,
+                                                                      checkpoint)
+    else:
+        pipeline, X_train, X_test, y_train, y_test = train_model(df, model_type, test_size, n_jobs=n_jobs,
+                                                                 compact=compact)
+    fit_seconds = time.perf_counter() - start
+
+    checkpoint("Evaluating on the test set", 0.95)
+    metrics, _ = evaluate_model(pipeline, X_test, y_test)
+    return {"pipeline": pipeline, "metrics": metrics, "train_rows": len(X_train), "test_rows": len(X_test),
+            "fit_seconds": fit_seconds}
+
+
+def _run_tuning_job(job_id, dataset, fingerprint, model_types, test_size, time_budget_seconds,
+                    progress_queue, cancelled):
+    """ A hyperparameter search job, inside a worker process. Returns the winner like _run_job does. """
+
+    def checkpoint(stage, progress, metrics=None):
+        if cancelled.get(job_id):
+            raise JobCancelled()
+        progress_queue.put((job_id, stage, progress, metrics))
+
+    df = _job_dataset(dataset, fingerprint, test_size, checkpoint)
+    X_train, X_test, y_train, y_test = cached_split(df, test_size)
+
+    start = time.perf_counter()
+    results, best_pipelines = tune_models(
+        X_train, y_train, model_types, time_budget_seconds,
+        progress=lambda stage, fraction: checkpoint(stage, 0.05 + 0.85 * fraction))
+    fit_seconds = time.perf_counter() - start
+    if len(best_pipelines) == 0:
+        raise ValueError("No model type was tuned within the time budget")
+
+    # Keep the overall winner: evaluate it on the test set
+    checkpoint("Evaluating the best model on the test set", 0.95)
+    best = results.iloc[0]
+    pipeline = best_pipelines[best['Model']]
+    if 'n_jobs' in pipeline.named_steps['model'].get_params():
+        pipeline.set_params(model__n_jobs=None)
+    metrics, _ = evaluate_model(pipeline, X_test, y_test)
+    return {"pipeline": pipeline, "metrics": metrics, "train_rows": len(X_train), "test_rows": len(X_test),
+            "fit_seconds": fit_seconds, "model_type": best['Model'], "tuning_results": results,
+            "extra_metadata": {"tuned": True,
+                               "settings": {name: str(value) for name, value in best['Best Settings'].items()}}}
+
+
+# ── App side ─────────────────────────────────────────────────────────────
+class _Worker:
+    """ One long-lived worker process, with the jobs waiting for it and the datasets it has cached. """
+
+    def __init__(self, context):
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        self.pending = 0           # jobs submitted and not finished yet
+        self.datasets = []         # fingerprints of the datasets it trained on last, newest last
+
+    def remember(self, fingerprint):
+        if fingerprint in self.datasets:
+            self.datasets.remove(fingerprint)
+        self.datasets.append(fingerprint)
+        del self.datasets[:-WARM_DATASETS_PER_WORKER]
+
+
+class TrainingJobManager:
+    """
+    Runs training jobs on a few worker processes.
+
+    Worker processes are started with 'spawn' (a fresh Python), because the
+    app process runs threads (render pool, coalescer, ...) that must not be
+    copied into a forked child.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        context = multiprocessing.get_context('spawn')
+        self.workers = [_Worker(context) for _ in range(max_workers)]
+
+        # Shared with the workers: progress reports, and the ids of cancelled jobs
+        self.sync_manager = context.Manager()
+        self.progress_queue = self.sync_manager.Queue()
+        self.cancelled = self.sync_manager.dict()
+
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        self.listener = threading.Thread(target=self._listen, name="training-progress", daemon=True)
+        self.listener.start()
+
+    def submit(self, df, model_type, test_size=0.2, n_jobs=None, compact=False, sample_size=None):
+        """
+        Queues a training job for 'df' and returns its job id.
+
+        - sample_size : train out of core on a stratified sample of this many
+                        training rows (see training.train_out_of_core)
+        """
+        # Out-of-core jobs stream the data and never use the caches
+        return self._submit(df, _run_job, (model_type, test_size, n_jobs, compact, sample_size),
+                            model_type, test_size, compact, sample_size, uses_caches=sample_size is None)
+
+    def submit_tuning(self, df, model_types=None, test_size=0.2, time_budget_seconds=DEFAULT_TIME_BUDGET_SECONDS):
+        """
+        Queues a hyperparameter search (see tuning.tune_models) on the
+        training split of 'df' and returns its job id. The best model found
+        is evaluated and registered like a trained model.
+        """
+        return self._submit(df, _run_tuning_job, (model_types, test_size, time_budget_seconds), TUNING_JOB, test_size)
+
+    def _submit(self, df, function, arguments, model_type, test_size, compact=False, sample_size=None,
+                uses_caches=True):
+        """
+        Creates the job and queues function(job_id, dataset, fingerprint, *arguments,
+        progress_queue, cancelled) on a worker. Returns the job id.
+        """
+        fingerprint = df.attrs.get('fingerprint')
+        dataset = cached_dataset_path(fingerprint) if fingerprint is not None else None
+        if dataset is None or os.path.exists(dataset) == False:
+            # Not in the dataset cache: the worker gets a pickled copy instead
+            dataset = df
+
+        with self.lock:
+            job_id = next(self.job_ids)
+            job = TrainingJob(job_id, model_type, test_size, compact, fingerprint, sample_size)
+            self.jobs[job_id] = job
+            self._forget_old_jobs()
+            cached_by_worker = fingerprint if uses_caches and fingerprint is not None else None
+            worker = self._pick_worker(cached_by_worker)
+            worker.pending += 1
+            if cached_by_worker is not None:
+                worker.remember(cached_by_worker)
+
+        job.future = worker.executor.submit(function, job_id, dataset, fingerprint, *arguments,
+                                            self.progress_queue, self.cancelled)
+        job.future.add_done_callback(lambda future: self._done(job, future, worker))
+        return job_id
+
+    def _pick_worker(self, fingerprint):
+        """
+        The worker for a new job: a free worker that has the dataset cached,
+        else any free worker, else the least busy one (preferring one that
+        has the dataset cached).
+        """
+        def score(worker):
+            is_warm = fingerprint is not None and fingerprint in worker.datasets
+            return (worker.pending, is_warm == False)
+        return min(self.workers, key=score)
+
+    def get(self, job_id):
+        """ The TrainingJob with this id, or None (unknown or forgotten). """
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """ Cancels a job. Returns False if it had already finished. """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        self.cancelled[job_id] = True
+        # A job that never started is finished by its done callback (_done),
+        # which cancel() runs straight away
+        job.future.cancel()
+        return True
+
+    def _listen(self):
+        """ Copies the workers' progress reports onto their jobs (runs in a thread). """
+        while True:
+            try:
+                job_id, stage, progress, metrics = self.progress_queue.get()
+            except (EOFError, OSError, queue.Empty):
+                return
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.finished:
+                    continue
+                if job.status == QUEUED:
+                    job.status, job.started_at = RUNNING, time.time()
+                job.stage, job.progress = stage, progress
+                if metrics:
+                    job.history.append(metrics)
+
+    def _done(self, job, future, worker):
+        """ Runs exactly once per job, when its future is done (finished, failed or cancelled). """
+        with self.lock:
+            worker.pending -= 1
+        self._finish(job, future)
+
+    def _finish(self, job, future):
+        """ Called once a job's worker is done: registers the model or records what went wrong. """
+        # Checked and marked under the lock, so a job is only ever finished once
+        with self.lock:
+            if job.finished or job.finishing:
+                return
+            job.finishing = True
+        result, error = None, None
+        if future.cancelled():
+            error = JobCancelled()
+        else:
+            error = future.exception()
+            if error is None:
+                result = future.result()
+
+        if result is not None:
+            numerical_features, categorical_features = get_feature_lists()
+            try:
+                model_info = register_model(
+                    result["pipeline"], result.get("model_type", job.model_type), numerical_features,
+                    categorical_features,
+                    metrics=result["metrics"], data_fingerprint=job.data_fingerprint,
+                    extra_metadata={"test_size": job.test_size, "train_rows": result["train_rows"],
+                                    "compact_features": job.compact, "fit_seconds": result["fit_seconds"],
+                                    **result.get("extra_metadata", {})}
+                )
+            except Exception as e:
+                result, error = None, e
+
+        with self.lock:
+            job.finished_at = time.time()
+            job.started_at = job.started_at or job.finished_at
+            if result is not None:
+                job.status, job.stage, job.progress = DONE, "Done", 1.0
+                job.pipeline, job.metrics, job.model_info = result["pipeline"], result["metrics"], model_info
+                # A search job becomes the job of the model type it picked
+                job.model_type = result.get("model_type", job.model_type)
+                job.tuning_results = result.get("tuning_results")
+            elif isinstance(error, JobCancelled):
+                job.status, job.stage = CANCELLED, "Cancelled"
+            else:
+                job.status, job.stage, job.error = FAILED, "Failed", f"{type(error).__name__}: {error}"
+        self.cancelled.pop(job.job_id, None)
+
+    def _forget_old_jobs(self):
+        finished = sorted((job.finished_at, job_id) for job_id, job in self.jobs.items() if job.finished)
+        for _, job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """ Cancels queued jobs, waits for running ones and stops the workers. """
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        for worker in self.workers:
+            worker.executor.shutdown(wait=True, cancel_futures=True)
+        self.sync_manager.shutdown()
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """ Returns the shared TrainingJobManager, starting it on first use. """
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = TrainingJobManager()
+    return _job_manager
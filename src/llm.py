@@ -0,0 +1,179 @@
+"""
+llm.py
+------
+This file is responsible for talking to the LLM (Groq by default):
+1. Keeping ONE reusable client per API key / model / server, so HTTP
+   connections are pooled instead of being opened for every player
+2. Retrying with exponential backoff when we are rate-limited (HTTP 429)
+   or the server has a temporary problem
+3. Letting us swap the backend (e.g. for a local stub server or a fake
+   object in tests), so nothing here needs the real network
+
+Point the Groq client at another server with the GROQ_API_BASE environment
+variable, e.g. the stub in src/stub_llm.py.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+# The model and settings used for retention plans
+LLM_MODEL_NAME = "llama-3.1-8b-instant"
+LLM_TEMPERATURE = 0.7
+
+# Retry settings: wait about 1s, 2s, 4s, 8s (plus a little randomness) between tries
+LLM_MAX_RETRIES = 4
+LLM_RETRY_BASE_DELAY = 1.0
+LLM_RETRY_MAX_DELAY = 30.0
+
+# How many LLM requests may be in flight at once on the async path
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class MissingAPIKeyError(Exception):
+    """ Raised when no GROQ_API_KEY is available for the Groq backend. """
+
+
+class GroqBackend:
+    """
+    The default backend: Groq's hosted LLaMA model through langchain-groq.
+
+    The ChatGroq object keeps an HTTP connection pool, so reusing one backend
+    for many prompts avoids paying connection setup every time.
+    """
+
+    def __init__(self, api_key, model_name=LLM_MODEL_NAME, base_url=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url
+        self.client = self.create_client()
+
+        # Async HTTP connections belong to one event loop, so each loop gets its own client
+        self.async_clients = weakref.WeakKeyDictionary()
+
+    def create_client(self):
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(
+            temperature=LLM_TEMPERATURE,
+            groq_api_key=self.api_key,
+            model_name=self.model_name,
+            base_url=self.base_url,
+            max_retries=0   # retries are handled by invoke_llm / ainvoke_llm below
+        )
+
+    def invoke(self, prompt):
+        """ Sends the prompt and returns the reply text. """
+        return self.client.invoke(prompt).content
+
+    async def ainvoke(self, prompt):
+        """ Async version of invoke. """
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_clients:
+            self.async_clients[loop] = self.create_client()
+        reply = await self.async_clients[loop].ainvoke(prompt)
+        return reply.content
+
+
+# ── Backend selection ──────────────────────────────────────────────────────
+_backend_override = None
+_groq_backends = {}
+_groq_backends_lock = threading.Lock()
+
+
+def set_llm_backend(backend):
+    """
+    Replaces the LLM backend used by the agent.
+
+    'backend' is any object with invoke(prompt) -> str and
+    async ainvoke(prompt) -> str. Pass None to go back to Groq.
+    """
+    global _backend_override
+    _backend_override = backend
+
+
+def get_llm_backend():
+    """
+    Returns the backend to use: the one set with set_llm_backend, otherwise a
+    shared GroqBackend for the current GROQ_API_KEY / GROQ_API_BASE.
+    """
+    if _backend_override is not None:
+        return _backend_override
+
+    api_key = os.environ.get("GROQ_API_KEY")
+    if api_key == None:
+        raise MissingAPIKeyError("No GROQ_API_KEY found!")
+
+    base_url = os.environ.get("GROQ_API_BASE")
+    key = (api_key, LLM_MODEL_NAME, base_url)
+    with _groq_backends_lock:
+        # The API key can be changed from the sidebar, so there is one backend per key
+        if key not in _groq_backends:
+            _groq_backends[key] = GroqBackend(api_key, LLM_MODEL_NAME, base_url)
+        return _groq_backends[key]
+
+
+def current_model_name():
+    """ The name of the model answering prompts right now (used in cache keys). """
+    if _backend_override is not None:
+        return getattr(_backend_override, "model_name", type(_backend_override).__name__)
+    return LLM_MODEL_NAME
+
+
+# ── Retry helpers ──────────────────────────────────────────────────────────
+def is_retryable_error(error):
+    """ True for rate limits (429), temporary server errors (5xx) and connection problems. """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and getattr(error, "response", None) is not None:
+        status_code = getattr(error.response, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+
+    error_name = type(error).__name__
+    return "RateLimit" in error_name or "Connection" in error_name or "Timeout" in error_name
+
+
+def retry_delay(error, attempt):
+    """
+    How long to wait before the next try.
+    Uses the server's Retry-After header when it sends one, otherwise
+    exponential backoff with jitter.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), LLM_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+
+    delay = LLM_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay, LLM_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+
+def invoke_llm(prompt, backend=None):
+    """ Sends a prompt to the LLM, retrying temporary failures. Returns the reply text. """
+    backend = backend or get_llm_backend()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return backend.invoke(prompt)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or is_retryable_error(e) == False:
+                raise
+            time.sleep(retry_delay(e, attempt))
+
+
+async def ainvoke_llm(prompt, backend=None):
+    """ Async version of invoke_llm (waits with asyncio.sleep, so other requests keep going). """
+    backend = backend or get_llm_backend()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await backend.ainvoke(prompt)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or is_retryable_error(e) == False:
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
@@ -0,0 +1,66 @@
+"""
+lru_cache.py
+------------
+A small, thread-safe "Least Recently Used" cache.
+
+It remembers up to 'max_size' results. When it is full, the entry that was
+used longest ago is thrown away to make room. It also counts hits and misses
+so we can see how well the cache is working.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Returned by get() when a key is not in the cache (None can be a real value)
+MISSING = object()
+
+
+class LRUCache:
+    """ A bounded key → value store that forgets the least recently used entries first. """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISSING):
+        """ Returns the cached value for 'key', or 'default' if it isn't cached. """
+        with self.lock:
+            if key in self.entries:
+                # Move to the end = "most recently used"
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """ Stores 'value' under 'key', evicting the oldest entry if the cache is full. """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """ Empties the cache and resets the hit/miss counters. """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ Returns a dictionary with size, hits and misses (for monitoring). """
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses}
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
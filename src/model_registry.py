@@ -0,0 +1,246 @@
+"""
+model_registry.py
+-----------------
+A local "model registry": a folder of saved, versioned, trained pipelines.
+
+Every trained pipeline can be registered. It is saved with joblib together
+with a metadata file describing it:
+- model_type, the feature lists, evaluation metrics
+- the fingerprint of the dataset it was trained on
+- when it was created and with which scikit-learn version
+
+Later sessions, restarts and other workers load the "promoted" model (or
+the latest one if none is promoted) instead of retraining from scratch.
+
+Folder layout:
+    models/
+        registry.json          ← which version is promoted
+        0001/pipeline.joblib   ← the fitted pipeline
+        0001/metadata.json     ← everything we know about it
+
+Command line:
+    python -m src.model_registry list
+    python -m src.model_registry promote 0003
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+
+from src.lru_cache import LRUCache, MISSING
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_FOLDER = os.path.join(PROJECT_FOLDER, 'models')
+
+REGISTRY_FILE_NAME = 'registry.json'
+PIPELINE_FILE_NAME = 'pipeline.joblib'
+METADATA_FILE_NAME = 'metadata.json'
+
+# Loaded pipelines are kept in memory and shared by every session in this process
+_loaded_models = LRUCache(max_size=4)
+_registry_lock = threading.Lock()
+
+
+def _version_folder(version, models_folder=MODELS_FOLDER):
+    return os.path.join(models_folder, version)
+
+
+def _read_registry(models_folder=MODELS_FOLDER):
+    path = os.path.join(models_folder, REGISTRY_FILE_NAME)
+    if os.path.exists(path) == False:
+        return {"promoted": None}
+    with open(path) as file:
+        return json.load(file)
+
+
+def _write_registry(registry, models_folder=MODELS_FOLDER):
+    path = os.path.join(models_folder, REGISTRY_FILE_NAME)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as file:
+        json.dump(registry, file, indent=2)
+    os.replace(temporary_path, path)
+
+
+def register_model(pipeline, model_type, numerical_features, categorical_features,
+                   metrics=None, data_fingerprint=None, extra_metadata=None,
+                   models_folder=MODELS_FOLDER):
+    """
+    Saves a fitted pipeline as a new version and returns its metadata.
+
+    - metrics          : the dictionary from evaluate_model (Accuracy, AUC, ...)
+    - data_fingerprint : df.attrs['fingerprint'] of the training data
+    - extra_metadata   : anything else worth remembering (e.g. test_size)
+    """
+    import sklearn
+
+    os.makedirs(models_folder, exist_ok=True)
+
+    # Save into a temporary folder first, so a half-written model is never visible
+    staging_folder = os.path.join(models_folder, f".staging-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(staging_folder)
+    pipeline_path = os.path.join(staging_folder, PIPELINE_FILE_NAME)
+
+    # Uncompressed, so the big arrays (e.g. RandomForest trees) can be memory-mapped on load
+    joblib.dump(pipeline, pipeline_path)
+
+    metadata = {
+        "model_type": model_type,
+        "features": {"numerical": list(numerical_features), "categorical": list(categorical_features)},
+        "metrics": {name: float(value) for name, value in (metrics or {}).items()},
+        "data_fingerprint": data_fingerprint,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sklearn_version": sklearn.__version__,
+        "size_bytes": os.path.getsize(pipeline_path),
+        **(extra_metadata or {}),
+    }
+
+    with _registry_lock:
+        # Pick the next free version number (another worker may be registering too)
+        taken = [name for name in os.listdir(models_folder) if name.isdigit()]
+        next_number = max(int(name) for name in taken) + 1 if taken else 1
+        while True:
+            version = f"{next_number:04d}"
+            try:
+                os.rename(staging_folder, _version_folder(version, models_folder))
+                break
+            except OSError:
+                next_number += 1
+
+    metadata["version"] = version
+    metadata_path = os.path.join(_version_folder(version, models_folder), METADATA_FILE_NAME)
+    with open(f"{metadata_path}.tmp", 'w') as file:
+        json.dump(metadata, file, indent=2)
+    os.replace(f"{metadata_path}.tmp", metadata_path)
+
+    return metadata
+
+
+def list_versions(models_folder=MODELS_FOLDER):
+    """ All registered version names, oldest first. """
+    if os.path.exists(models_folder) == False:
+        return []
+    return sorted(
+        name for name in os.listdir(models_folder)
+        # A version only counts once its metadata is written (that happens last)
+        if name.isdigit() and os.path.exists(os.path.join(models_folder, name, METADATA_FILE_NAME))
+    )
+
+
+def list_models(models_folder=MODELS_FOLDER):
+    """ Metadata of every registered model (oldest first), with a 'promoted' flag. """
+    promoted = _read_registry(models_folder).get("promoted")
+    models = []
+    for version in list_versions(models_folder):
+        metadata = get_metadata(version, models_folder)
+        if metadata is not None:
+            metadata["promoted"] = (version == promoted)
+            models.append(metadata)
+    return models
+
+
+def get_metadata(version, models_folder=MODELS_FOLDER):
+    """ The metadata of one version, or None if it has none yet. """
+    path = os.path.join(_version_folder(version, models_folder), METADATA_FILE_NAME)
+    if os.path.exists(path) == False:
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def resolve_version(which='default', models_folder=MODELS_FOLDER):
+    """
+    Turns 'which' into a real version name (or None if there is no such model):
+    - 'promoted' : the promoted version
+    - 'latest'   : the newest version
+    - 'default'  : promoted if there is one, otherwise latest
+    - '0003'     : that exact version
+    """
+    versions = list_versions(models_folder)
+    promoted = _read_registry(models_folder).get("promoted")
+    if promoted not in versions:
+        promoted = None
+
+    if which == 'promoted':
+        return promoted
+    if which == 'latest':
+        return versions[-1] if versions else None
+    if which == 'default':
+        return promoted or (versions[-1] if versions else None)
+    return which if which in versions else None
+
+
+def promote_model(version, models_folder=MODELS_FOLDER):
+    """ Marks a version as the one every session should load by default. """
+    if version not in list_versions(models_folder):
+        raise ValueError(f"No registered model with version {version!r}")
+    with _registry_lock:
+        registry = _read_registry(models_folder)
+        registry["promoted"] = version
+        _write_registry(registry, models_folder)
+
+
+def load_model(which='default', models_folder=MODELS_FOLDER):
+    """
+    Loads a registered pipeline. Returns (pipeline, metadata), or (None, None)
+    if the registry has no matching model.
+
+    NumPy arrays in the saved file are memory-mapped (read-only) instead of
+    being read into memory where the estimator allows it, and loaded models
+    are cached, so every session in the process shares one copy.
+    """
+    version = resolve_version(which, models_folder)
+    if version is None:
+        return None, None
+
+    cache_key = (models_folder, version)
+    cached = _loaded_models.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    pipeline_path = os.path.join(_version_folder(version, models_folder), PIPELINE_FILE_NAME)
+    pipeline = joblib.load(pipeline_path, mmap_mode='r')
+    loaded = (pipeline, get_metadata(version, models_folder))
+    _loaded_models.put(cache_key, loaded)
+    return loaded
+
+
+def delete_model(version, models_folder=MODELS_FOLDER):
+    """ Removes a version from the registry (un-promoting it if needed). """
+    with _registry_lock:
+        registry = _read_registry(models_folder)
+        if registry.get("promoted") == version:
+            registry["promoted"] = None
+            _write_registry(registry, models_folder)
+    shutil.rmtree(_version_folder(version, models_folder), ignore_errors=True)
+    _loaded_models.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local ChurnIQ model registry.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show every registered model")
+    promote_parser = commands.add_parser("promote", help="Make a version the default model")
+    promote_parser.add_argument("version")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        models = list_models()
+        if len(models) == 0:
+            print("No registered models yet. Train one in the app or with src.scoring.")
+        for metadata in models:
+            star = "⭐" if metadata["promoted"] else "  "
+            auc = metadata["metrics"].get("AUC")
+            auc_text = f"AUC {auc:.3f}" if auc is not None else "AUC n/a"
+            print(f"{star} {metadata['version']}  {metadata['model_type']:<20} {auc_text}  {metadata['created_at']}")
+    elif args.command == "promote":
+        promote_model(args.version)
+        print(f"Promoted model {args.version}")
+
+
+if __name__ == "__main__":
+    main()
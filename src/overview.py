@@ -0,0 +1,289 @@
+"""
+overview.py
+-----------
+Everything the "Dataset Overview" tab shows, computed ONCE per dataset:
+1. Player counts (total, churn, retained, churn rate)
+2. Histograms of the distribution charts, already binned
+3. The correlation matrix of the numerical features and Churn
+4. The column summary table (type, non-null, null and unique counts)
+
+All of it is built in a single pass over the data, one chunk at a time, so
+the same code handles an in-memory DataFrame and a CSV that is too big to
+load (profile_source streams it with iter_data). The finished profile is
+cached per dataset fingerprint, so Streamlit reruns (any widget change, in
+any tab) only read the cache and the tab takes the same time for 10 thousand
+or 10 million players.
+
+How each part is computed from chunks:
+- Histograms : every value is rounded to HISTOGRAM_DECIMALS ("quantized")
+               and counted. The counts of all chunks are added up, and at the
+               end they are put into the chart's bins. Whole-number columns
+               are exact; decimal columns move by at most 0.005.
+- Correlation: Pearson correlation only needs the row count, the sum of
+               every column and the sum of every pair of columns multiplied
+               together. Those sums are added up chunk by chunk. (Rows with a
+               missing number are left out of the correlation.)
+- Unique     : an in-memory dataset (get_overview) is counted exactly: the
+               distinct values of each chunk are collected and merged.
+               A streamed file (profile_source) may have too many distinct
+               values to keep, so only the DISTINCT_SAMPLE smallest hashes of
+               its values are kept (a "k minimum values" sketch). Columns
+               with fewer distinct values than that are still exact; for
+               the others (e.g. PlayerID) the count is estimated from how
+               small the kept hashes are (typically within 2%) and shown
+               with a "≈". Memory stays the same however many rows go by.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import DEFAULT_CHUNK_SIZE, fingerprint_source, get_feature_lists, iter_data
+from src.lru_cache import LRUCache, MISSING
+
+# The distribution charts of the Overview tab: column → number of bins
+HISTOGRAM_BINS = {
+    'PlayTimeHours':   30,
+    'SessionsPerWeek': 20,
+    'PlayerLevel':     25,
+}
+
+# Decimal columns are rounded to this many decimals before counting
+HISTOGRAM_DECIMALS = 2
+
+# How many rows the Data Preview shows
+PREVIEW_ROWS = 10
+
+# How many hashes each column keeps to count its unique values (see _DistinctCounter)
+DISTINCT_SAMPLE = 4096
+
+# Finished profiles, keyed by dataset fingerprint and shared by every session
+_overview_cache = LRUCache(max_size=8)
+
+
+def _same_type(values):
+    """ The same number must count once whatever its type (int16 in one chunk, int64 in another). """
+    values = np.asarray(values)
+    return values.astype('float64') if values.dtype.kind in 'biuf' else values.astype(object)
+
+
+class _ExactDistinctCounter:
+    """ Counts the distinct values of one column exactly, by keeping all of them. """
+
+    def __init__(self):
+        self.values = None
+
+    def add(self, values):
+        values = _same_type(values)
+        self.values = values if self.values is None else pd.unique(np.concatenate([self.values, values]))
+
+    def count(self):
+        return 0 if self.values is None else len(self.values)
+
+    def is_estimate(self):
+        return False
+
+
+class _DistinctCounter:
+    """
+    Counts the distinct values of one column in bounded memory: keeps the
+    'size' smallest 64-bit hashes of the values seen so far.
+    """
+
+    def __init__(self, size=DISTINCT_SAMPLE):
+        self.size = size
+        self.smallest = np.array([], dtype='uint64')
+
+    def add(self, values):
+        hashes = pd.util.hash_array(_same_type(values), categorize=False)
+        self.smallest = np.unique(np.concatenate([self.smallest, hashes]))[:self.size]
+
+    def count(self):
+        if self.is_estimate() == False:
+            # Fewer distinct values than we keep: every one of them is here
+            return len(self.smallest)
+        # The k-th smallest of n random hashes lies near k / n of the hash range
+        return int(round((self.size - 1) / (float(self.smallest[-1]) / 2.0 ** 64)))
+
+    def is_estimate(self):
+        return len(self.smallest) >= self.size
+
+
+class _ProfileBuilder:
+    """ Collects the running totals while the chunks go by. """
+
+    def __init__(self, numerical_features, histogram_bins, exact_unique):
+        self.correlation_columns = numerical_features + ['Churn']
+        self.histogram_bins = histogram_bins
+
+        self.rows = 0
+        self.churn_count = 0
+        self.preview = None
+        self.dtypes = None
+        self.non_null = None
+        self.distinct = {}
+        self.distinct_counter = _ExactDistinctCounter if exact_unique else _DistinctCounter
+
+        # column → (sorted quantized values, how many times each appears)
+        self.value_counts = {}
+
+        # Sufficient statistics for the correlation. Values are shifted by the
+        # first chunk's means, which keeps the sums small and accurate.
+        self.shift = None
+        self.complete_rows = 0
+        self.sums = None
+        self.products = None
+
+    def add(self, chunk):
+        if self.preview is None:
+            self.preview = chunk.head(PREVIEW_ROWS).copy()
+            self.dtypes = chunk.dtypes.astype(str)
+            self.non_null = pd.Series(0, index=chunk.columns, dtype='int64')
+
+        self.rows += len(chunk)
+        self.churn_count += int(chunk['Churn'].sum())
+        self.non_null += chunk.notnull().sum()
+        for column in chunk.columns:
+            self.distinct.setdefault(column, self.distinct_counter()).add(chunk[column].dropna().unique())
+
+        for column in self.histogram_bins:
+            if column in chunk.columns:
+                self._count_values(column, chunk[column])
+
+        self._add_products(chunk[self.correlation_columns].to_numpy(dtype='float64'))
+
+    def _count_values(self, column, values):
+        values = values.dropna().to_numpy(dtype='float64')
+        if len(values) == 0:
+            return
+        values = np.round(values, HISTOGRAM_DECIMALS)
+        distinct, counts = np.unique(values, return_counts=True)
+
+        if column in self.value_counts:
+            # Merge with the counts of the earlier chunks
+            old_distinct, old_counts = self.value_counts[column]
+            distinct, positions = np.unique(np.concatenate([old_distinct, distinct]), return_inverse=True)
+            counts = np.bincount(positions, weights=np.concatenate([old_counts, counts])).astype('int64')
+        self.value_counts[column] = (distinct, counts)
+
+    def _add_products(self, matrix):
+        matrix = matrix[np.isnan(matrix).any(axis=1) == False]
+        if len(matrix) == 0:
+            return
+        if self.shift is None:
+            self.shift = matrix.mean(axis=0)
+            self.sums = np.zeros(len(self.shift))
+            self.products = np.zeros((len(self.shift), len(self.shift)))
+        matrix = matrix - self.shift
+        self.complete_rows += len(matrix)
+        self.sums += matrix.sum(axis=0)
+        self.products += matrix.T @ matrix
+
+    def correlation(self):
+        if self.complete_rows < 2:
+            return pd.DataFrame(np.nan, index=self.correlation_columns, columns=self.correlation_columns)
+        means = self.sums / self.complete_rows
+        covariance = self.products / self.complete_rows - np.outer(means, means)
+        std = np.sqrt(np.diag(covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / np.outer(std, std)
+        # Like pandas: constant columns have no correlation, but a column is always 1 with itself
+        np.fill_diagonal(correlation, np.where(std > 0, 1.0, np.nan))
+        return pd.DataFrame(np.clip(correlation, -1, 1),
+                            index=self.correlation_columns, columns=self.correlation_columns)
+
+    def histograms(self):
+        histograms = {}
+        for column, bins in self.histogram_bins.items():
+            if column not in self.value_counts:
+                continue
+            distinct, counts = self.value_counts[column]
+            counts, edges = np.histogram(distinct, bins=bins, weights=counts)
+            histograms[column] = {'counts': counts.astype('int64'), 'edges': edges}
+        return histograms
+
+    def finish(self):
+        if self.rows == 0:
+            raise ValueError("The dataset has no rows")
+        column_summary = pd.DataFrame({
+            'Column':         self.non_null.index,
+            'Data Type':      self.dtypes.values,
+            'Non-Null Count': self.non_null.values,
+            'Null Count':     self.rows - self.non_null.values,
+            'Unique Values':  [self.distinct[column].count() for column in self.non_null.index],
+        })
+        counters = [self.distinct[column] for column in self.non_null.index]
+        if any(counter.is_estimate() for counter in counters):
+            # Mark the estimated counts
+            column_summary['Unique Values'] = [f"≈ {counter.count():,}" if counter.is_estimate()
+                                               else f"{counter.count():,}" for counter in counters]
+        return {
+            'rows': self.rows,
+            'columns': len(self.non_null),
+            'churn_count': self.churn_count,
+            'retain_count': self.rows - self.churn_count,
+            'churn_rate': self.churn_count / self.rows,
+            'preview': self.preview,
+            'histograms': self.histograms(),
+            'correlation': self.correlation(),
+            'column_summary': column_summary,
+        }
+
+
+def profile_chunks(chunks, histogram_bins=None, exact_unique=True):
+    """
+    Builds the overview profile from an iterable of DataFrame chunks (each
+    with a 'Churn' column) in a single pass.
+
+    Returns a dictionary with:
+    - rows, columns, churn_count, retain_count, churn_rate
+    - preview        : the first PREVIEW_ROWS rows
+    - histograms     : {column: {"counts": ..., "edges": ...}} (see HISTOGRAM_BINS)
+    - correlation    : DataFrame of Pearson correlations (numerical features + Churn)
+    - column_summary : DataFrame with the type, non-null, null and unique counts per column
+
+    - exact_unique : count the unique values exactly (keeps every distinct
+                     value). With False they are counted in bounded memory,
+                     and counts above DISTINCT_SAMPLE are estimates marked "≈"
+    """
+    numerical_features, _ = get_feature_lists()
+    builder = _ProfileBuilder(numerical_features, histogram_bins or HISTOGRAM_BINS, exact_unique)
+    for chunk in chunks:
+        builder.add(chunk)
+    return builder.finish()
+
+
+def get_overview(df):
+    """
+    The overview profile of a loaded dataset, computed on first use and then
+    served from the cache (keyed by df.attrs['fingerprint']).
+    Datasets without a fingerprint are profiled every time.
+    """
+    fingerprint = df.attrs.get('fingerprint')
+    if fingerprint is not None:
+        overview = _overview_cache.get(fingerprint)
+        if overview is not MISSING:
+            return overview
+
+    overview = profile_chunks([df])
+    if fingerprint is not None:
+        _overview_cache.put(fingerprint, overview)
+    return overview
+
+
+def profile_source(source, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    The overview profile of a CSV file (path or uploaded file) that is
+    streamed in chunks, so memory use stays bounded however big it is
+    (unique counts may be estimates, see profile_chunks).
+    Uses get_overview's cached profile when there is one (the fingerprints
+    are the same); its own profiles are cached separately, so get_overview
+    never serves estimated counts.
+    """
+    fingerprint = fingerprint_source(source)
+    overview = _overview_cache.get(fingerprint)
+    if overview is MISSING:
+        overview = _overview_cache.get((fingerprint, 'streamed'))
+    if overview is MISSING:
+        overview = profile_chunks(iter_data(source, chunksize), exact_unique=False)
+        _overview_cache.put((fingerprint, 'streamed'), overview)
+    return overview
@@ -7,6 +7,10 @@ This file builds a Scikit-Learn "Pipeline" — a chain of steps that:
 
 Why a Pipeline? So that preprocessing + model training happen in one clean step,
 avoiding errors like accidentally scaling test data with training stats.
+
+Category columns are encoded from their integer codes in the fixed vocabulary
+(data_loader.CATEGORY_VALUES, see encoders.py), so no strings are compared
+while training or predicting.
 """
 
 # Pipeline chains multiple steps together (like an assembly line)
@@ -16,6 +20,12 @@ from sklearn.pipeline import Pipeline
 # OneHotEncoder: converts text categories into numbers (e.g., 'Male' → [1, 0])
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 
+# OrdinalEncoder: converts each text category into one integer code (e.g., 'Easy' → 0)
+from sklearn.preprocessing import OrdinalEncoder
+
+# FunctionTransformer: wraps a plain function as a pipeline step
+from sklearn.preprocessing import FunctionTransformer
+
 # ColumnTransformer: applies different transformations to different columns
 from sklearn.compose import ColumnTransformer
 
@@ -23,6 +33,10 @@ from sklearn.compose import ColumnTransformer
 # (despite the name, it predicts categories, not continuous values)
 from sklearn.linear_model import LogisticRegression
 
+# SGD Logistic Regression: the same kind of model, but trained a little at a
+# time (partial_fit), so it can keep learning from new data without a full refit
+from sklearn.linear_model import SGDClassifier
+
 # Decision Tree: splits data into yes/no branches to make predictions
 # (very interpretable — you can visualise the actual decision rules)
 from sklearn.tree import DecisionTreeClassifier
@@ -30,19 +44,114 @@ from sklearn.tree import DecisionTreeClassifier
 # Random Forest: powerful ensemble model that builds multiple decision trees
 from sklearn.ensemble import RandomForestClassifier
 
+# Histogram Gradient Boosting: builds small trees one after another, each fixing
+# the previous ones' mistakes. Numbers are grouped into at most 255 bins first,
+# which makes training very fast on large datasets, and it understands
+# category columns natively (no one-hot encoding needed).
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+import numpy as np
+
+# The fixed category vocabulary, and encoders that read category codes directly
+from src.data_loader import CATEGORY_VALUES
+from src.encoders import CodeOneHotEncoder, CodeOrdinalEncoder
 
-def create_pipeline(numerical_features, categorical_features, model_type='LogisticRegression'):
+# Models that split on category codes directly instead of one-hot columns
+ORDINAL_MODEL_TYPES = ['HistGradientBoosting']
+
+# Models that learn one weight per column and work well on a sparse one-hot matrix
+LINEAR_MODEL_TYPES = ['LogisticRegression', 'SGDLogistic']
+
+
+def _onehot_encoder(categorical_features, dtype=np.float64, sparse_output=False):
     """
-    Builds and returns a full ML pipeline.
+    One-hot encoder for the category columns: built from the fixed vocabulary
+    when every column has one, otherwise learned from the data by OneHotEncoder.
+    """
+    if all(column in CATEGORY_VALUES for column in categorical_features):
+        return CodeOneHotEncoder([CATEGORY_VALUES[column] for column in categorical_features],
+                                 dtype=dtype, sparse_output=sparse_output)
+    return OneHotEncoder(handle_unknown='ignore', dtype=dtype, sparse_output=sparse_output)
 
-    Parameters:
-    - numerical_features  : list of column names that contain numbers
-    - categorical_features: list of column names that contain text/categories
-    - model_type          : which algorithm to use ('LogisticRegression' or 'DecisionTree')
 
-    Returns:
-    - A Scikit-Learn Pipeline object (ready to be trained with .fit())
+def _ordinal_encoder(categorical_features, dtype=np.float64):
+    """ Like _onehot_encoder, but one code column per category column (unknown → NaN). """
+    if all(column in CATEGORY_VALUES for column in categorical_features):
+        return CodeOrdinalEncoder([CATEGORY_VALUES[column] for column in categorical_features], dtype=dtype)
+    return OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan, dtype=dtype)
+
+
+def to_float32(X):
+    """ Stores numbers as 32-bit floats (half the memory of the default 64-bit). """
+    return np.asarray(X, dtype=np.float32)
+
+
+def preprocessor_kind(model_type, compact=False):
     """
+    Which preprocessing a model type needs:
+    - 'ordinal'         : numbers untouched + one integer code per category column
+    - 'onehot'          : scaled numbers + one-hot category columns (every other model)
+    - 'compact-sparse'  : (compact=True, linear models) scaled float32 numbers +
+                          one-hot columns, kept as a sparse matrix
+    - 'compact-ordinal' : (compact=True, tree models) float32 numbers + one code
+                          per category column, all in one float32 matrix
+
+    Models with the same kind can share one fitted preprocessor.
+    """
+    if compact:
+        return 'compact-sparse' if model_type in LINEAR_MODEL_TYPES else 'compact-ordinal'
+    return 'ordinal' if model_type in ORDINAL_MODEL_TYPES else 'onehot'
+
+
+def create_preprocessor(numerical_features, categorical_features, model_type='LogisticRegression', compact=False):
+    """
+    Builds the (unfitted) preprocessing step for a model type.
+
+    - compact : use the memory-saving representation (see preprocessor_kind).
+                The transformed matrix is about 4x smaller than the default,
+                which is dense float64 with one column per category value.
+    """
+    kind = preprocessor_kind(model_type, compact)
+
+    # Compact, linear models: the one-hot columns are mostly zeros, so only
+    # the non-zero values are stored (a "CSR" sparse matrix), all as float32.
+    # sparse_threshold=1.0 → always return the sparse matrix, never densify it.
+    if kind == 'compact-sparse':
+        return ColumnTransformer(
+            transformers=[
+                ('num', Pipeline(steps=[
+                    ('float32', FunctionTransformer(to_float32, feature_names_out='one-to-one')),
+                    ('scaler', StandardScaler())
+                ]), numerical_features),
+                ('cat', _onehot_encoder(categorical_features, dtype=np.float32, sparse_output=True),
+                 categorical_features)
+            ],
+            sparse_threshold=1.0
+        )
+
+    # Compact, tree models: trees don't need scaling or one-hot columns, so each
+    # category becomes one small integer code (0, 1, 2, …) next to the float32
+    # numbers. Unknown categories become NaN, which the trees treat as "missing".
+    if kind == 'compact-ordinal':
+        return ColumnTransformer(
+            transformers=[
+                ('num', FunctionTransformer(to_float32, feature_names_out='one-to-one'), numerical_features),
+                ('cat', _ordinal_encoder(categorical_features, dtype=np.float32), categorical_features)
+            ]
+        )
+
+    # Gradient boosting needs no scaling and no one-hot encoding:
+    # - number columns are passed through unchanged (trees don't care about scale)
+    # - each text column becomes ONE column of integer codes, and the model is
+    #   told which columns are categories, so it splits on them directly
+    if kind == 'ordinal':
+        return ColumnTransformer(
+            transformers=[
+                ('num', 'passthrough', numerical_features),
+                # A category never seen in training becomes NaN ("missing"), so it doesn't crash
+                ('cat', _ordinal_encoder(categorical_features), categorical_features)
+            ]
+        )
 
     # ── Step 1a: Preprocessing for NUMBER columns ──────────────────────
     # StandardScaler makes all numbers comparable.
@@ -53,38 +162,85 @@ def create_pipeline(numerical_features, categorical_features, model_type='Logist
     ])
 
     # ── Step 1b: Preprocessing for TEXT/CATEGORY columns ───────────────
-    # OneHotEncoder converts categories into binary (0/1) columns.
+    # The one-hot encoder converts categories into binary (0/1) columns.
     # Example: Gender ['Male', 'Female'] → Gender_Male: [1,0], Gender_Female: [0,1]
-    # handle_unknown='ignore' means: if the model sees a new category at prediction time,
-    # it won't crash — it will just treat it as all zeros.
+    # A category outside the vocabulary doesn't crash the model — it just
+    # becomes all zeros.
     categorical_transformer = Pipeline(steps=[
-        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+        ('onehot', _onehot_encoder(categorical_features))
     ])
 
     # ── Step 1c: Combine both transformers using ColumnTransformer ──────
     # This applies numeric_transformer to number columns
     # and categorical_transformer to text columns — simultaneously.
-    preprocessor = ColumnTransformer(
+    return ColumnTransformer(
         transformers=[
             ('num', numeric_transformer, numerical_features),   # Apply scaler to numbers
             ('cat', categorical_transformer, categorical_features)  # Apply OHE to text
         ]
     )
 
-    # ── Step 2: Choose the ML Model ────────────────────────────────────
+
+def create_model(model_type, numerical_features, categorical_features, n_jobs=None):
+    """
+    Builds the (untrained) model for a model type.
+    The feature lists are needed to tell gradient boosting which columns are categories.
+    """
     if model_type == 'DecisionTree':
         # Decision Tree with max_depth=5 to prevent overfitting
         # (overfitting = model memorises training data but fails on new data)
-        model = DecisionTreeClassifier(max_depth=5, random_state=42)
-    elif model_type == 'RandomForest':
+        return DecisionTreeClassifier(max_depth=5, random_state=42)
+    if model_type == 'RandomForest':
         # Random Forest aggregates multiple trees for robustness
-        model = RandomForestClassifier(random_state=42, n_estimators=100, max_depth=10)
-    else:
-        # Default: Logistic Regression
-        # max_iter=1000 → allow up to 1000 iterations to find the best fit
-        # C=1.0 → regularisation strength (higher C = less penalty on complexity)
-        # random_state=42 → ensures reproducibility (same result every run)
-        model = LogisticRegression(random_state=42, max_iter=1000, C=1.0)
+        # n_jobs → how many trees are built at the same time
+        return RandomForestClassifier(random_state=42, n_estimators=100, max_depth=10, n_jobs=n_jobs)
+    if model_type == 'HistGradientBoosting':
+        # The category columns come right after the number columns
+        categorical_positions = list(range(len(numerical_features), len(numerical_features) + len(categorical_features)))
+        return HistGradientBoostingClassifier(
+            categorical_features=categorical_positions,
+            max_iter=200,            # at most 200 trees
+            learning_rate=0.1,
+            early_stopping=True,     # stop adding trees once a held-out 10% stops improving
+            random_state=42
+        )
+
+    if model_type == 'SGDLogistic':
+        # Logistic regression trained with stochastic gradient descent.
+        # loss='log_loss' → it predicts probabilities, like LogisticRegression
+        # alpha → regularisation strength (higher = simpler model)
+        return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+
+    # Default: Logistic Regression
+    # max_iter=1000 → allow up to 1000 iterations to find the best fit
+    # C=1.0 → regularisation strength (higher C = less penalty on complexity)
+    # random_state=42 → ensures reproducibility (same result every run)
+    return LogisticRegression(random_state=42, max_iter=1000, C=1.0)
+
+
+def create_pipeline(numerical_features, categorical_features, model_type='LogisticRegression', n_jobs=None,
+                    compact=False):
+    """
+    Builds and returns a full ML pipeline.
+
+    Parameters:
+    - numerical_features  : list of column names that contain numbers
+    - categorical_features: list of column names that contain text/categories
+    - model_type          : which algorithm to use ('LogisticRegression', 'DecisionTree',
+                            'RandomForest', 'HistGradientBoosting' or 'SGDLogistic')
+    - n_jobs              : CPU cores to use for models that can train in parallel
+                            (RandomForest builds its trees in parallel). -1 = all cores.
+    - compact             : use the memory-saving float32 / sparse preprocessing
+
+    Returns:
+    - A Scikit-Learn Pipeline object (ready to be trained with .fit())
+    """
+
+    # ── Step 1: Preprocessing (scaling + encoding) ─────────────────────
+    preprocessor = create_preprocessor(numerical_features, categorical_features, model_type, compact=compact)
+
+    # ── Step 2: Choose the ML Model ────────────────────────────────────
+    model = create_model(model_type, numerical_features, categorical_features, n_jobs=n_jobs)
 
     # ── Step 3: Combine preprocessor + model into one Pipeline ─────────
     # When we call pipeline.fit(X_train, y_train):
@@ -0,0 +1,176 @@
+"""
+plan_cache.py
+-------------
+A persistent cache for LLM-generated retention plans (stored in SQLite).
+
+Many at-risk players look almost the same and get the same strategies, so
+asking the LLM again would give an equivalent plan. We build a "content
+address" for each request out of:
+- the player's features, rounded into coarse buckets
+- the churn probability band (e.g. 80–90%)
+- the IDs of the retrieved strategies
+- the LLM model name
+and reuse the stored plan whenever the same address comes up again.
+
+Entries expire after PLAN_CACHE_TTL_SECONDS, and the least recently used
+entries are removed once there are more than PLAN_CACHE_MAX_ENTRIES.
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAN_CACHE_PATH = os.path.join(PROJECT_FOLDER, '.cache', 'plan_cache.sqlite3')
+
+PLAN_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60   # one week
+PLAN_CACHE_MAX_ENTRIES = 50_000
+
+# Churn probabilities are grouped into bands of this width (0.1 = 10% bands)
+PROBABILITY_BAND_WIDTH = 0.1
+
+# Bucket size for each numeric player feature. Players whose values fall in
+# the same buckets (and match on every text feature) share a cached plan.
+FEATURE_BUCKETS = {
+    'Age':                       5,
+    'PlayTimeHours':             2,
+    'InGamePurchases':           1,
+    'SessionsPerWeek':           2,
+    'AvgSessionDurationMinutes': 15,
+    'PlayerLevel':               10,
+    'AchievementsUnlocked':      5,
+}
+
+
+def bucket_player_features(player_data):
+    """ Rounds every numeric feature down to its bucket; text features stay as they are. """
+    bucketed = {}
+    for name, value in player_data.items():
+        if name in FEATURE_BUCKETS:
+            bucketed[name] = int(math.floor(float(value) / FEATURE_BUCKETS[name]))
+        else:
+            bucketed[name] = str(value)
+    return bucketed
+
+
+def strategy_key(strategy):
+    """ The strategy's ID if it has one, otherwise a hash of its contents. """
+    if strategy.get("id") is not None:
+        return str(strategy["id"])
+    return hashlib.sha256(json.dumps(strategy, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def plan_cache_key(player_data, churn_proba, strategies, model_name):
+    """ Builds the normalized content hash that identifies an equivalent plan request. """
+    normalized = {
+        "player": bucket_player_features(player_data),
+        "probability_band": int(math.floor(churn_proba / PROBABILITY_BAND_WIDTH)),
+        "strategies": sorted(strategy_key(strategy) for strategy in strategies),
+        "model": model_name,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class PlanCache:
+    """ SQLite-backed key → plan store with TTL, LRU size limit and hit/miss counters. """
+
+    def __init__(self, path=PLAN_CACHE_PATH, ttl_seconds=PLAN_CACHE_TTL_SECONDS,
+                 max_entries=PLAN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            if path != ':memory:':
+                # WAL lets several app workers read while one writes
+                self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " key TEXT PRIMARY KEY, plan TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans(last_used)")
+
+    def get(self, key):
+        """ Returns the cached plan for 'key', or None if it is missing or expired. """
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT plan, created_at FROM plans WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self.connection.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.connection.execute("UPDATE plans SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, plan):
+        """ Stores a plan, then removes the least recently used entries above max_entries. """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO plans (key, plan, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(plan), now, now)
+            )
+            extra = self.connection.execute("SELECT COUNT(*) FROM plans").fetchone()[0] - self.max_entries
+            if extra > 0:
+                self.connection.execute(
+                    "DELETE FROM plans WHERE key IN (SELECT key FROM plans ORDER BY last_used LIMIT ?)",
+                    (extra,)
+                )
+                self.evictions += extra
+
+    def clear(self):
+        """ Deletes every cached plan and resets the counters. """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM plans")
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """ Returns hits, misses, evictions, hit rate and current size (for monitoring). """
+        with self.lock:
+            size = self.connection.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": size,
+                "max_entries": self.max_entries,
+            }
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache():
+    """ Returns the shared PlanCache, opening it on first use. """
+    global _plan_cache
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache()
+    return _plan_cache
@@ -1,27 +1,106 @@
+import numpy as np
 import pandas as pd
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+import hashlib
+import json
 import os
+from src.lru_cache import LRUCache, MISSING
 
 # Find where our engagement_strategies.csv file is located
 CURRENT_FOLDER = os.path.dirname(__file__)
 PARENT_FOLDER = os.path.dirname(CURRENT_FOLDER)
 DATA_FILE_PATH = os.path.join(PARENT_FOLDER, 'data', 'engagement_strategies.csv')
 
+# Where the ready-made FAISS index is saved between runs
+INDEX_FOLDER = os.path.join(PARENT_FOLDER, '.cache', 'strategy_index')
+MANIFEST_FILE_NAME = 'manifest.json'
+
+# The sentence embedding model used for strategies AND player queries
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# How many query embeddings / search results we remember
+QUERY_CACHE_SIZE = 4096
+
+# Bump this whenever the document text or metadata layout changes,
+# so saved indexes built the old way are rebuilt
+INDEX_FORMAT_VERSION = 1
+
 class StrategyRAG:
     """
     RAG means Retrieval-Augmented Generation. 
     This class loads our strategies and helps us search for the best one.
+
+    The FAISS index is saved to disk (INDEX_FOLDER) together with a manifest
+    holding a hash of engagement_strategies.csv and the embedding model name.
+    On the next start the saved index is loaded directly, and it is only
+    rebuilt when the CSV or the model changes.
     """
-    def __init__(self):
+    def __init__(self, index_folder=INDEX_FOLDER):
         # Step 1: Load a free, local AI model that understand meanings of sentences (embeddings)
         print("Loading AI embeddings model...")
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
         self.vector_database = None
+        self.index_folder = index_folder
+
+        # Repeated player profiles skip the embeddings model and the search
+        self.embedding_cache = LRUCache(QUERY_CACHE_SIZE)
+        self.results_cache = LRUCache(QUERY_CACHE_SIZE)
         
-        # Step 2: Read our strategies from the CSV file and save them in our database
-        self.load_data_into_database()
+        # Step 2: Use the saved index if it is still up to date,
+        # otherwise read our strategies from the CSV file and save them in our database
+        if self.load_saved_index() == False:
+            self.load_data_into_database()
+            self.save_index()
+
+    def current_manifest(self):
+        """ Describes what the index is built from. Any change means a rebuild. """
+        with open(DATA_FILE_PATH, 'rb') as file:
+            source_hash = hashlib.sha256(file.read()).hexdigest()
+        return {
+            "source_hash": source_hash,
+            "embedding_model": EMBEDDING_MODEL_NAME,
+            "format_version": INDEX_FORMAT_VERSION
+        }
+
+    def load_saved_index(self):
+        """ Loads the saved FAISS index if it matches the current CSV and model. Returns True on success. """
+        manifest_path = os.path.join(self.index_folder, MANIFEST_FILE_NAME)
+        if os.path.exists(manifest_path) == False or os.path.exists(DATA_FILE_PATH) == False:
+            return False
+
+        try:
+            with open(manifest_path) as file:
+                saved_manifest = json.load(file)
+            if saved_manifest != self.current_manifest():
+                print("Strategy file or embedding model changed, rebuilding FAISS index...")
+                return False
+
+            # The index files were written by save_index below, so we trust them
+            self.vector_database = FAISS.load_local(
+                self.index_folder, self.embeddings, allow_dangerous_deserialization=True
+            )
+        except Exception as e:
+            print(f"Could not load saved FAISS index ({e}), rebuilding...")
+            self.vector_database = None
+            return False
+
+        print("Loaded saved FAISS strategy index.")
+        return True
+
+    def save_index(self):
+        """ Saves the FAISS index and its manifest so the next start can skip re-embedding. """
+        if self.vector_database == None:
+            return
+
+        try:
+            self.vector_database.save_local(self.index_folder)
+            # Manifest is written last: a half-written index is never trusted
+            with open(os.path.join(self.index_folder, MANIFEST_FILE_NAME), 'w') as file:
+                json.dump(self.current_manifest(), file, indent=2)
+        except Exception as e:
+            print(f"Could not save FAISS index: {e}")
 
     def load_data_into_database(self):
         """ This reads the CSV file and creates a searchable AI database. """
@@ -35,7 +114,7 @@ class StrategyRAG:
         list_of_documents = []
         
         # Go through each row one by one
-        for index, row in dataframe.iterrows():
+        for row in dataframe.to_dict(orient='records'):
             # Combine all the text so the AI can understand it
             text_for_ai = f"Player Match: {row['target_audience']}. Problem: {row['scenario']}. Solution: {row['recommended_action']}. Expected Result: {row['expected_outcome']}."
             
@@ -43,6 +122,7 @@ class StrategyRAG:
             new_doc = Document(
                 page_content=text_for_ai,
                 metadata={
+                    "strategy_id": row["strategy_id"],
                     "target_audience": row["target_audience"],
                     "scenario": row["scenario"],
                     "action": row["recommended_action"],
@@ -58,21 +138,81 @@ class StrategyRAG:
 
     def retrieve_strategies(self, player_profile_text, number_of_results=2):
         """ This searches the database for the best strategy for a specific player. """
+        return self.retrieve_strategies_batch([player_profile_text], number_of_results)[0]
+
+    def retrieve_strategies_batch(self, player_profile_texts, number_of_results=2):
+        """
+        Searches the database for MANY players at once.
+
+        - All query texts we haven't seen before are embedded in ONE model call
+        - FAISS is searched once with the whole matrix of query vectors
+        - Results are cached per (query text, number_of_results), so repeated
+          profiles skip both the embedding model and the search
+
+        Returns one list of strategies per query, in the same order.
+        """
         if self.vector_database == None:
-            return [{"error": "Database is empty."}]
-            
-        # AI magically finds the most similar strategies to the player profile
-        matching_documents = self.vector_database.similarity_search(player_profile_text, k=number_of_results)
-        
-        # Make a simple list of dictionaries to return
-        found_strategies = []
-        for doc in matching_documents:
-            strategy_info = {
-                "audience": doc.metadata["target_audience"],
-                "scenario": doc.metadata["scenario"],
-                "action": doc.metadata["action"],
-                "outcome": doc.metadata["expected_outcome"]
-            }
-            found_strategies.append(strategy_info)
-            
-        return found_strategies
\ No newline at end of file
+            return [[{"error": "Database is empty."}] for _ in player_profile_texts]
+
+        results = {}
+        texts_to_search = []
+        for text in player_profile_texts:
+            cached = self.results_cache.get((text, number_of_results))
+            if cached is not MISSING:
+                results[text] = cached
+            elif text not in texts_to_search:
+                texts_to_search.append(text)
+
+        if texts_to_search:
+            query_vectors = self.embed_queries(texts_to_search)
+            # AI magically finds the most similar strategies to each player profile
+            _, positions = self.vector_database.index.search(query_vectors, number_of_results)
+
+            for text, row_positions in zip(texts_to_search, positions):
+                found_strategies = []
+                for position in row_positions:
+                    if position == -1:
+                        continue   # FAISS pads with -1 when there are fewer results than asked for
+                    document_id = self.vector_database.index_to_docstore_id[position]
+                    doc = self.vector_database.docstore.search(document_id)
+                    found_strategies.append(self.strategy_from_document(doc))
+                self.results_cache.put((text, number_of_results), found_strategies)
+                results[text] = found_strategies
+
+        # Hand out copies so callers can't change what's stored in the cache
+        return [[dict(strategy) for strategy in results[text]] for text in player_profile_texts]
+
+    def embed_queries(self, player_profile_texts):
+        """
+        Turns query texts into a float32 matrix of embeddings (one row per text).
+        Texts that were embedded before come from the cache; the rest are
+        embedded together in a single model call.
+        """
+        vectors = {}
+        texts_to_embed = []
+        for text in player_profile_texts:
+            cached = self.embedding_cache.get(text)
+            if cached is not MISSING:
+                vectors[text] = cached
+            elif text not in texts_to_embed:
+                texts_to_embed.append(text)
+
+        if texts_to_embed:
+            new_vectors = self.embeddings.embed_documents(texts_to_embed)
+            for text, vector in zip(texts_to_embed, new_vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                self.embedding_cache.put(text, vector)
+                vectors[text] = vector
+
+        return np.vstack([vectors[text] for text in player_profile_texts])
+
+    @staticmethod
+    def strategy_from_document(doc):
+        """ Makes a simple dictionary out of a FAISS document. """
+        return {
+            "id": doc.metadata.get("strategy_id"),
+            "audience": doc.metadata["target_audience"],
+            "scenario": doc.metadata["scenario"],
+            "action": doc.metadata["action"],
+            "outcome": doc.metadata["expected_outcome"]
+        }
@@ -0,0 +1,209 @@
+"""
+scoring.py
+----------
+This file scores whole populations of players in one go (batch scoring).
+
+Instead of sending players through the agent one at a time, we:
+1. Read the players in chunks (a DataFrame or a CSV file)
+2. Run preprocessing + predict_proba ONCE per chunk
+3. Turn the probabilities into churn labels (no second predict() pass)
+4. Send ONLY the at-risk players on to retrieval and plan generation
+
+Run it from the command line (uses the promoted / latest registered model):
+    python -m src.scoring players.csv
+or train a fresh model first:
+    python -m src.scoring players.csv --train data/online_gaming_behavior_dataset.csv
+"""
+
+import argparse
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import load_data, iter_data, get_feature_lists
+from src.pipeline import create_pipeline
+from src.llm import DEFAULT_MAX_CONCURRENCY
+from src.model_registry import load_model
+from src.thresholds import churn_labels, CHURN_THRESHOLD
+
+# How many players we push through the pipeline at once
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def iter_player_chunks(players, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the players in chunks of at most 'chunk_size' rows.
+
+    - 'players' can be a pandas DataFrame OR a CSV file path / uploaded file
+    - CSV files are streamed with the typed chunk reader from data_loader,
+      so memory stays bounded and EngagementLevel is optional
+    """
+    if isinstance(players, pd.DataFrame):
+        for start in range(0, len(players), chunk_size):
+            yield players.iloc[start:start + chunk_size]
+    else:
+        yield from iter_data(players, chunksize=chunk_size, require_target=False)
+
+
+def score_chunk(pipeline, chunk, threshold=CHURN_THRESHOLD):
+    """
+    Scores one chunk of players with a single predict_proba call.
+
+    Returns a DataFrame (same index as 'chunk') with:
+    - PlayerID    : copied over if the chunk has it
+    - churn_proba : probability of churn (0.0 to 1.0)
+    - is_churn    : True if the probability is above the threshold
+    """
+    probabilities = pipeline.predict_proba(chunk)[:, 1]
+
+    scored = pd.DataFrame({
+        'churn_proba': probabilities,
+        'is_churn': churn_labels(probabilities, threshold)
+    }, index=chunk.index)
+
+    if 'PlayerID' in chunk.columns:
+        scored.insert(0, 'PlayerID', chunk['PlayerID'].values)
+
+    return scored
+
+
+def score_players(pipeline, players, chunk_size=DEFAULT_CHUNK_SIZE, threshold=CHURN_THRESHOLD):
+    """
+    Scores every player in 'players' (DataFrame or CSV) chunk by chunk.
+
+    Returns one DataFrame with PlayerID (if present), churn_proba and is_churn.
+    """
+    scored_chunks = [
+        score_chunk(pipeline, chunk, threshold)
+        for chunk in iter_player_chunks(players, chunk_size)
+    ]
+
+    if len(scored_chunks) == 0:
+        return pd.DataFrame(columns=['churn_proba', 'is_churn'])
+
+    return pd.concat(scored_chunks)
+
+
+def generate_plans(players, scored, max_concurrency=DEFAULT_MAX_CONCURRENCY, plan_threshold=CHURN_THRESHOLD):
+    """
+    Runs retrieval + plan generation for the AT-RISK players only.
+
+    - players : the player rows that were scored (a DataFrame)
+    - scored  : the output of score_players for those same rows
+    - max_concurrency : how many LLM requests may run at the same time
+    - plan_threshold  : only players at or above this probability get an LLM
+                        plan; other at-risk players get a strategy-only plan
+
+    Returns a list of final agent states, one per at-risk player.
+    """
+    # Imported here so that scoring on its own never loads the RAG / LLM stack
+    from src.agent import retrieve_knowledge_batch, agenerate_plans, summarize_strategies, risk_band
+
+    at_risk = scored[scored['is_churn']]
+    if len(at_risk) == 0:
+        return []
+
+    numerical_features, categorical_features = get_feature_lists()
+    player_rows = players.loc[at_risk.index, numerical_features + categorical_features]
+
+    states = [
+        {
+            "player_data": player_data,
+            "churn_proba": float(churn_proba),
+            "is_churn": True,
+            "retrieved_strategies": [],
+            "structured_evaluation": {},
+            "risk_band": risk_band(float(churn_proba), True, plan_threshold),
+            "error": ""
+        }
+        for player_data, churn_proba in zip(player_rows.to_dict(orient='records'), at_risk['churn_proba'])
+    ]
+
+    # One embedding call + one FAISS search for the whole chunk
+    states = retrieve_knowledge_batch(states)
+
+    # Medium risk: strategy-only plan. High risk: LLM plans, written
+    # concurrently (bounded by max_concurrency)
+    high_risk_states = [state for state in states if state["risk_band"] == "high"]
+    for state in states:
+        if state["risk_band"] == "medium":
+            summarize_strategies(state)
+    if high_risk_states:
+        asyncio.run(agenerate_plans(high_risk_states, max_concurrency))
+
+    return states
+
+
+def _train_pipeline(training_csv, model_type):
+    """ Trains a pipeline on a labelled CSV so the CLI can score straight away. """
+    df = load_data(training_csv)
+    if df is None:
+        raise SystemExit(f"Could not load training data from {training_csv}")
+
+    numerical_features, categorical_features = get_feature_lists()
+    pipeline = create_pipeline(numerical_features, categorical_features, model_type=model_type)
+    pipeline.fit(df.drop(['PlayerID', 'Churn', 'EngagementLevel'], axis=1, errors='ignore'), df['Churn'])
+    return pipeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score a CSV of players for churn risk.")
+    parser.add_argument("players", help="CSV file with one player per row")
+    parser.add_argument("--model", default="default",
+                        help="Registered model to use: default, promoted, latest or a version like 0003")
+    parser.add_argument("--train", default=None,
+                        help="Labelled CSV (with EngagementLevel): train a fresh model instead of using the registry")
+    parser.add_argument("--model-type", default="LogisticRegression",
+                        help="LogisticRegression, DecisionTree, RandomForest, HistGradientBoosting or SGDLogistic")
+    parser.add_argument("--output", default="scored_players.csv", help="Where to write the scores")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--threshold", type=float, default=CHURN_THRESHOLD)
+    parser.add_argument("--plans", default=None,
+                        help="Optional JSON file: generate retention plans for at-risk players")
+    parser.add_argument("--plan-threshold", type=float, default=CHURN_THRESHOLD,
+                        help="At-risk players below this probability get a strategy-only plan (no LLM call)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="How many LLM requests may run at the same time")
+    args = parser.parse_args(argv)
+
+    if args.train:
+        pipeline = _train_pipeline(args.train, args.model_type)
+    else:
+        pipeline, model_info = load_model(args.model)
+        if pipeline is None:
+            raise SystemExit(f"No registered model matches {args.model!r}. "
+                             "Train one in the app, or pass --train to train one now.")
+        print(f"Using registered model {model_info['version']} ({model_info['model_type']})")
+
+    total_players = 0
+    total_at_risk = 0
+    all_plans = []
+    first_chunk = True
+    for chunk in iter_player_chunks(args.players, args.chunk_size):
+        scored = score_chunk(pipeline, chunk, args.threshold)
+        scored.to_csv(args.output, mode='w' if first_chunk else 'a', header=first_chunk, index=False)
+        first_chunk = False
+
+        total_players += len(scored)
+        total_at_risk += int(scored['is_churn'].sum())
+
+        if args.plans:
+            all_plans.extend(generate_plans(chunk, scored, args.max_concurrency, args.plan_threshold))
+
+    print(f"Scored {total_players:,} players · {total_at_risk:,} at risk → {args.output}")
+
+    if args.plans:
+        with open(args.plans, 'w') as plan_file:
+            json.dump(all_plans, plan_file, indent=2, default=str)
+        print(f"Wrote {len(all_plans):,} retention plans → {args.plans}")
+
+        from src.plan_cache import get_plan_cache
+        cache_stats = get_plan_cache().stats()
+        print(f"Plan cache: {cache_stats['hits']:,} hits · {cache_stats['misses']:,} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+service.py
+----------
+A standalone async HTTP service for churn scoring and retention plans, for
+callers that don't go through the Streamlit dashboard.
+
+The registered pipeline (and, unless --no-warm-up, the strategy index) is
+loaded ONCE at start-up. Endpoints:
+    POST /score        {"player": {...}}         → churn probability + risk band
+    POST /score/batch  {"players": [{...}, ...]} → one result per player
+                       (at most MAX_PLAYERS_PER_REQUEST players, 10,000 by
+                       default, see --max-players-per-request; bigger
+                       batches get 413 and should be split, or scored
+                       offline with src/scoring.py)
+    POST /plan         {"player": {...}}         → risk band + retention plan
+    GET  /metrics      → p50 / p99 latency per endpoint, batching and cache stats
+    GET  /health
+
+Concurrent /score and /plan requests are "micro-batched" by the request
+coalescer (src/coalescer.py): requests arriving within a couple of
+milliseconds of each other are scored together in one call, which is much
+cheaper than scoring them one by one. LLM calls for /plan are async,
+so a slow LLM never blocks scoring.
+
+Run it locally with the in-process stub LLM (no API key needed):
+    python -m src.service --port 8080 --stub-llm
+    curl -X POST localhost:8080/score -d '{"player": {"Age": 25, ...}}'
+"""
+
+import argparse
+import asyncio
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+from aiohttp import web
+
+from src.agent import (SAFE_PLAYER_RESPONSE, DEFAULT_PLAN_THRESHOLD, agenerate_plan, retrieve_knowledge,
+                       risk_band, summarize_strategies, warm_up)
+from src.coalescer import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_SECONDS, RequestCoalescer, worth_coalescing
+from src.fast_inference import churn_probabilities, churn_probability, get_fast_scorer
+from src.llm import DEFAULT_MAX_CONCURRENCY
+from src.model_registry import load_model
+from src.plan_cache import get_plan_cache
+from src.thresholds import CHURN_THRESHOLD
+
+DEFAULT_PORT = 8080
+
+# Micro-batching: score at most this many players together, and never hold
+# a request back longer than this waiting for others to join its batch
+MAX_BATCH_SIZE = DEFAULT_MAX_BATCH_SIZE
+MAX_BATCH_WAIT_SECONDS = DEFAULT_MAX_WAIT_SECONDS
+
+# /score/batch: the most players one request may send (more → 413), and
+# the body size allowed per player (the whole body limit grows with it)
+MAX_PLAYERS_PER_REQUEST = 10_000
+MAX_BYTES_PER_PLAYER = 1024
+
+# How many recent requests the latency percentiles are computed over
+LATENCY_WINDOW = 10_000
+
+
+class LatencyTracker:
+    """ Remembers the last LATENCY_WINDOW request durations per endpoint. """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.durations = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            self.durations[endpoint].append(seconds)
+            self.counts[endpoint] += 1
+
+    def summary(self):
+        """ {endpoint: {"count", "p50_ms", "p99_ms"}} """
+        with self.lock:
+            snapshot = {endpoint: list(values) for endpoint, values in self.durations.items()}
+            counts = dict(self.counts)
+        summary = {}
+        for endpoint, values in snapshot.items():
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            summary[endpoint] = {"count": counts[endpoint], "p50_ms": round(float(p50), 3),
+                                 "p99_ms": round(float(p99), 3)}
+        return summary
+
+
+class ScoringService:
+    """ Holds everything the endpoints share: the model, the coalescer and the metrics. """
+
+    def __init__(self, pipeline, model_info=None, plan_threshold=DEFAULT_PLAN_THRESHOLD,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_seconds=MAX_BATCH_WAIT_SECONDS, warm_up_index=True,
+                 max_players_per_request=MAX_PLAYERS_PER_REQUEST):
+        self.pipeline = pipeline
+        self.max_players_per_request = max_players_per_request
+        self.model_info = model_info or {}
+        self.plan_threshold = plan_threshold
+        self.max_concurrency = max_concurrency
+        self.warm_up_index = warm_up_index
+        self.coalescer = RequestCoalescer(pipeline, max_batch_size, max_wait_seconds)
+        self.coalesce = True
+        self.latency = LatencyTracker()
+        self.llm_semaphore = None
+
+        features = self.model_info.get("features", {})
+        self.numerical_features = features.get("numerical", [])
+        self.categorical_features = features.get("categorical", [])
+        self.required_features = self.numerical_features + self.categorical_features
+
+    # ── Helpers ────────────────────────────────────────────────────────
+    def check_player(self, player):
+        """
+        Returns an error message, or None if the player has every feature the
+        model needs, with a usable value: a finite number for numerical
+        features, a string for categorical ones. Bad players are turned away
+        here (400), so they never reach the scorer or share a batch with others.
+        """
+        if isinstance(player, dict) == False:
+            return "'player' must be a JSON object"
+        missing = [feature for feature in self.required_features if feature not in player]
+        if missing:
+            return f"Missing features: {', '.join(missing)}"
+        for feature in self.numerical_features:
+            value = player[feature]
+            # (bool is a kind of int in Python, but true/false is not a number in JSON)
+            if isinstance(value, (int, float)) == False or isinstance(value, bool) or math.isfinite(value) == False:
+                return f"Feature '{feature}' must be a finite number, got {value!r}"
+        for feature in self.categorical_features:
+            value = player[feature]
+            if isinstance(value, str) == False:
+                return f"Feature '{feature}' must be a string, got {value!r}"
+        return None
+
+    def result_for(self, probability):
+        is_churn = bool(probability > CHURN_THRESHOLD)
+        return {"churn_proba": probability, "is_churn": is_churn,
+                "risk_band": risk_band(probability, is_churn, self.plan_threshold)}
+
+    async def read_players(self, request, key):
+        """
+        Reads the player(s) from the JSON body under 'key' ("player" or "players").
+        Returns (players, None), or (None, an error response): 400 for a
+        bad body or player, 413 for more than max_players_per_request players.
+        """
+        try:
+            body = await request.json()
+        except Exception:
+            return None, web.json_response({"error": "Body must be JSON"}, status=400)
+        players = body.get(key) if isinstance(body, dict) else None
+        if key == "player" and players is not None:
+            players = [players]
+        if isinstance(players, list) == False or len(players) == 0:
+            return None, web.json_response({"error": f"Body needs a '{key}' field"}, status=400)
+        if len(players) > self.max_players_per_request:
+            return None, web.json_response(
+                {"error": f"Too many players: {len(players):,} (at most {self.max_players_per_request:,} "
+                          f"per request, split the batch)"}, status=413)
+        for index, player in enumerate(players):
+            error = self.check_player(player)
+            if error:
+                where = f"players[{index}]: " if key == "players" else ""
+                return None, web.json_response({"error": where + error}, status=400)
+        return players, None
+
+    # ── Endpoints ──────────────────────────────────────────────────────
+    async def score_one(self, player):
+        """ One player's churn probability, batched with concurrent requests when that pays off. """
+        if self.coalesce:
+            return await asyncio.wrap_future(self.coalescer.submit(player))
+        # Fast linear scoring takes microseconds: cheaper than any hand-off
+        return churn_probability(self.pipeline, player)
+
+    async def score(self, request):
+        players, error_response = await self.read_players(request, "player")
+        if error_response is not None:
+            return error_response
+        probability = await self.score_one(players[0])
+        return web.json_response(self.result_for(probability))
+
+    async def score_batch(self, request):
+        players, error_response = await self.read_players(request, "players")
+        if error_response is not None:
+            return error_response
+        # A batch is already a batch: score it in one call, off the event loop
+        loop = asyncio.get_running_loop()
+        probabilities = await loop.run_in_executor(None, churn_probabilities, self.pipeline, players)
+        return web.json_response({"results": [self.result_for(float(p)) for p in probabilities]})
+
+    async def plan(self, request):
+        players, error_response = await self.read_players(request, "player")
+        if error_response is not None:
+            return error_response
+
+        result = self.result_for(await self.score_one(players[0]))
+        state = {"player_data": players[0], "retrieved_strategies": [], "structured_evaluation": {},
+                 "error": "", **result}
+
+        if state["risk_band"] == "low":
+            state["structured_evaluation"] = dict(SAFE_PLAYER_RESPONSE)
+        else:
+            # The strategy search embeds text on the CPU, so it runs in a worker thread
+            loop = asyncio.get_running_loop()
+            state = await loop.run_in_executor(None, retrieve_knowledge, state)
+            if state["risk_band"] == "medium":
+                summarize_strategies(state)
+            else:
+                async with self.llm_semaphore:
+                    state = await agenerate_plan(state)
+
+        response = {key: state[key] for key in ("churn_proba", "is_churn", "risk_band",
+                                                 "retrieved_strategies", "structured_evaluation")}
+        if state["error"]:
+            response["error"] = state["error"]
+        return web.json_response(response)
+
+    async def metrics(self, request):
+        return web.json_response({
+            "latency": self.latency.summary(),
+            "batching": self.coalescer.stats(),
+            "plan_cache": get_plan_cache().stats(),
+            "model": {"version": self.model_info.get("version"), "model_type": self.model_info.get("model_type"),
+                      "fast_path": get_fast_scorer(self.pipeline) is not None, "coalescing": self.coalesce},
+        })
+
+    async def health(self, request):
+        return web.json_response({"status": "ok"})
+
+    # ── App wiring ─────────────────────────────────────────────────────
+    @web.middleware
+    async def track_latency(self, request, handler):
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            self.latency.record(f"{request.method} {request.path}", time.perf_counter() - start)
+
+    async def on_startup(self, app):
+        self.llm_semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Compile the fast scorer and load the strategy index before the first request
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, get_fast_scorer, self.pipeline)
+        self.coalesce = worth_coalescing(self.pipeline)
+        if self.warm_up_index:
+            await loop.run_in_executor(None, warm_up)
+
+    def create_app(self):
+        # The default body limit (1 MB) is too small for a full batch of players
+        body_limit = max(1024 ** 2, self.max_players_per_request * MAX_BYTES_PER_PLAYER)
+        app = web.Application(middlewares=[self.track_latency], client_max_size=body_limit)
+        app.router.add_post("/score", self.score)
+        app.router.add_post("/score/batch", self.score_batch)
+        app.router.add_post("/plan", self.plan)
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_get("/health", self.health)
+        app.on_startup.append(self.on_startup)
+        return app
+
+
+def create_service(which='default', **settings):
+    """ Builds a ScoringService around a registered model. Raises ValueError if there is none. """
+    pipeline, model_info = load_model(which)
+    if pipeline is None:
+        raise ValueError(f"No registered model matches {which!r}. Train one in the app first.")
+    return ScoringService(pipeline, model_info, **settings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ChurnIQ scoring HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", default="default",
+                        help="Registered model to serve: default, promoted, latest or a version like 0003")
+    parser.add_argument("--plan-threshold", type=float, default=DEFAULT_PLAN_THRESHOLD)
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="How many LLM requests may run at the same time")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-batch-wait-ms", type=float, default=MAX_BATCH_WAIT_SECONDS * 1000)
+    parser.add_argument("--max-players-per-request", type=int, default=MAX_PLAYERS_PER_REQUEST,
+                        help="Largest /score/batch request; bigger ones get 413")
+    parser.add_argument("--no-warm-up", action="store_true", help="Load the strategy index on first use instead")
+    parser.add_argument("--stub-llm", action="store_true", help="Answer plans with the in-process stub LLM")
+    args = parser.parse_args(argv)
+
+    if args.stub_llm:
+        from src.llm import set_llm_backend
+        from src.stub_llm import StubBackend
+        set_llm_backend(StubBackend())
+
+    try:
+        service = create_service(args.model, plan_threshold=args.plan_threshold,
+                                 max_concurrency=args.max_concurrency, max_batch_size=args.max_batch_size,
+                                 max_wait_seconds=args.max_batch_wait_ms / 1000,
+                                 warm_up_index=args.no_warm_up == False,
+                                 max_players_per_request=args.max_players_per_request)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    print(f"Serving model {service.model_info.get('version')} ({service.model_info.get('model_type')}) "
+          f"on http://{args.host}:{args.port}")
+    web.run_app(service.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+stub_llm.py
+-----------
+A tiny local stand-in for the Groq API, so the agent can be run and tested
+without network access or an API key.
+
+It answers Groq's chat-completions endpoint with a fixed retention plan in
+the JSON structure the agent asks for. It can also pretend to be
+rate-limited every N requests, to exercise the retry/backoff logic.
+
+Run it, then point the agent at it:
+    python -m src.stub_llm --port 8765
+    GROQ_API_KEY=stub GROQ_API_BASE=http://127.0.0.1:8765 python -m streamlit run app.py
+
+StubBackend does the same thing in-process (no HTTP at all):
+    from src.llm import set_llm_backend
+    set_llm_backend(StubBackend())
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The plan every stub reply contains
+STUB_PLAN = {
+    "Summary": "Stub summary of the player.",
+    "Analysis": "Stub analysis of why the player may quit.",
+    "Plan": "Stub retention plan.",
+    "Refs": "Stub references.",
+    "Disclaimer": "Generated by the local stub LLM, not a real model."
+}
+
+
+class StubBackend:
+    """ An in-process LLM backend that always replies with STUB_PLAN. """
+
+    def __init__(self, delay_seconds=0.0):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.calls += 1
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return json.dumps(STUB_PLAN)
+
+    async def ainvoke(self, prompt):
+        import asyncio
+
+        with self.lock:
+            self.calls += 1
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        return json.dumps(STUB_PLAN)
+
+
+def make_handler(delay_seconds=0.0, rate_limit_every=0):
+    """ Builds the HTTP request handler class for the stub server. """
+    counter = {"requests": 0}
+    counter_lock = threading.Lock()
+
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with counter_lock:
+                counter["requests"] += 1
+                request_number = counter["requests"]
+
+            if rate_limit_every and request_number % rate_limit_every == 0:
+                self.send_json(429, {"error": {"message": "Rate limited by stub", "type": "rate_limit"}},
+                               extra_headers={"retry-after": "0.05"})
+                return
+
+            if delay_seconds:
+                time.sleep(delay_seconds)
+
+            request = json.loads(body or b"{}")
+            self.send_json(200, {
+                "id": f"stub-{request_number}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(STUB_PLAN)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+
+        def send_json(self, status, payload, extra_headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass   # keep the console quiet
+
+    return StubLLMHandler
+
+
+def start_stub_server(port=0, delay_seconds=0.0, rate_limit_every=0):
+    """
+    Starts the stub server in a background thread.
+    Returns (server, base_url). Call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay_seconds, rate_limit_every))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stub of the Groq chat API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each reply")
+    parser.add_argument("--rate-limit-every", type=int, default=0,
+                        help="Answer every Nth request with HTTP 429 (0 = never)")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay, args.rate_limit_every))
+    print(f"Stub LLM listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+thresholds.py
+-------------
+The churn threshold: the one rule that turns a churn probability into a
+"Churn" / "No Churn" label.
+
+It lives in its own small file because batch scoring, the agent, the HTTP
+service and the evaluation all use it, and none of them should have to import
+the others just to agree on it.
+"""
+
+import numpy as np
+
+# Players with a churn probability above this value are "at risk".
+# 0.5 matches what pipeline.predict() does for a binary classifier.
+CHURN_THRESHOLD = 0.5
+
+
+def churn_labels(probabilities, threshold=CHURN_THRESHOLD):
+    """
+    Converts churn probabilities into True/False churn labels.
+
+    - probabilities : a single probability or an array of them
+    - threshold     : probabilities ABOVE this value count as churn
+    """
+    return np.asarray(probabilities) > threshold
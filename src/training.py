@@ -0,0 +1,414 @@
+"""
+training.py
+-----------
+Helpers for training the churn models:
+1. Splitting the dataset into training and test sets
+2. Fitting a pipeline, optionally using every CPU core
+3. Cross-validating a model with the folds trained in parallel
+4. Re-training quickly when only the model type changes: the split and the
+   fitted preprocessing (scaler + encoder) are cached per dataset and reused,
+   so only the model itself is fitted again
+5. Out-of-core training for datasets bigger than memory: the data is
+   streamed in chunks, split by a hash of PlayerID, optionally reduced to a
+   stratified random sample, and the model is evaluated chunk by chunk
+
+Command line (out-of-core training, prints wall time and peak memory):
+    python -m src.training big_dataset.csv --model-type RandomForest --sample-size 200000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split, cross_validate, StratifiedKFold
+
+from src.data_loader import DEFAULT_CHUNK_SIZE, get_feature_lists, iter_labelled_chunks
+from src.evaluation import metrics_from_probabilities
+from src.lru_cache import LRUCache, MISSING
+from src.pipeline import create_pipeline, create_preprocessor, create_model, preprocessor_kind
+
+# Columns that are never used as model inputs
+NON_FEATURE_COLUMNS = ['PlayerID', 'Churn', 'EngagementLevel']
+
+# Split methods: sklearn's stratified random split, or the streaming-friendly
+# split by PlayerID hash (see hashed_test_mask)
+STRATIFIED_SPLIT = 'stratified'
+HASHED_SPLIT = 'hashed-player-id'
+
+# Fixed 16-character key, so a player lands in the same part on every run and machine
+SPLIT_HASH_KEY = 'churniq-split-v1'
+
+# Train/test splits and fitted preprocessors, shared by every session in this process
+_split_cache = LRUCache(max_size=4)
+_preprocessor_cache = LRUCache(max_size=8)
+
+
+def split_features(df, test_size=0.2, random_state=42):
+    """
+    Splits the dataset into X_train, X_test, y_train, y_test.
+    The split is stratified, so both parts have the same churn rate.
+    """
+    X = df.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
+    y = df['Churn']
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def train_pipeline(X_train, y_train, model_type='LogisticRegression', n_jobs=None, compact=False):
+    """
+    Creates and fits a pipeline.
+
+    - n_jobs : CPU cores used while fitting (-1 = all cores). After fitting,
+               the model is switched back to a single core, because spreading
+               a one-player prediction over many cores only adds overhead.
+    - compact : use the memory-saving float32 / sparse preprocessing (see pipeline.py)
+    """
+    numerical_features, categorical_features = get_feature_lists()
+    pipeline = create_pipeline(numerical_features, categorical_features, model_type=model_type, n_jobs=n_jobs,
+                               compact=compact)
+    pipeline.fit(X_train, y_train)
+
+    if 'n_jobs' in pipeline.named_steps['model'].get_params():
+        pipeline.set_params(model__n_jobs=None)
+    return pipeline
+
+
+def cross_validate_pipeline(X, y, model_type='LogisticRegression', folds=5, n_jobs=-1):
+    """
+    K-fold cross-validation with the folds trained in parallel (one per core).
+
+    Returns a dictionary with the mean and standard deviation of each metric,
+    plus the average fit time per fold in seconds.
+    """
+    numerical_features, categorical_features = get_feature_lists()
+    pipeline = create_pipeline(numerical_features, categorical_features, model_type=model_type)
+    scores = cross_validate(
+        pipeline, X, y,
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=42),
+        scoring={'Accuracy': 'accuracy', 'Precision': 'precision', 'Recall': 'recall', 'AUC': 'roc_auc'},
+        n_jobs=n_jobs
+    )
+
+    summary = {}
+    for metric in ['Accuracy', 'Precision', 'Recall', 'AUC']:
+        summary[metric] = float(np.mean(scores[f'test_{metric}']))
+        summary[f'{metric} (std)'] = float(np.std(scores[f'test_{metric}']))
+    summary['Fit Time (s)'] = float(np.mean(scores['fit_time']))
+    return summary
+
+
+def hashed_test_mask(chunk, test_size, first_row=0):
+    """
+    True for the rows of 'chunk' that belong to the test set.
+
+    Each PlayerID is hashed to a number between 0 and 1; players below
+    test_size are test players. The answer depends only on the PlayerID, so
+    every chunk can be split on its own, the same player is always in the
+    same part, and nothing has to be shuffled or copied. Without a PlayerID
+    column the row position (first_row = position of the chunk's first row)
+    is hashed instead.
+    """
+    if 'PlayerID' in chunk.columns:
+        ids = chunk['PlayerID'].to_numpy()
+    else:
+        ids = np.arange(first_row, first_row + len(chunk))
+    hashes = pd.util.hash_array(ids, hash_key=SPLIT_HASH_KEY)
+    return hashes / 2.0 ** 64 < test_size
+
+
+def hashed_split(df, test_size=0.2):
+    """ X_train, X_test, y_train, y_test of an in-memory dataset, split by hashed_test_mask. """
+    is_test = hashed_test_mask(df, test_size)
+    X = df.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
+    return X[is_test == False], X[is_test], df['Churn'][is_test == False], df['Churn'][is_test]
+
+
+def _split_cache_key(df, test_size, random_state, method=STRATIFIED_SPLIT):
+    """
+    Identifies a split: the dataset's fingerprint (set by load_data), the split
+    settings and the feature lists. None if the dataset has no fingerprint.
+    """
+    fingerprint = df.attrs.get('fingerprint')
+    if fingerprint is None:
+        return None
+    return _split_key(fingerprint, test_size, random_state, method)
+
+
+def _split_key(fingerprint, test_size, random_state, method=STRATIFIED_SPLIT):
+    numerical_features, categorical_features = get_feature_lists()
+    key = (fingerprint, round(float(test_size), 6), random_state,
+           tuple(numerical_features), tuple(categorical_features))
+    # Stratified keys keep their original shape (the preprocessor cache uses them too)
+    return key if method == STRATIFIED_SPLIT else key + (method,)
+
+
+def has_cached_split(fingerprint, test_size=0.2, random_state=42, method=STRATIFIED_SPLIT):
+    """
+    True if the split of the dataset with this fingerprint is in the cache,
+    so cached_split would not need the data itself (only its fingerprint).
+    """
+    return _split_key(fingerprint, test_size, random_state, method) in _split_cache
+
+
+def cached_split(df, test_size=0.2, random_state=42, method=STRATIFIED_SPLIT):
+    """
+    Same as split_features (or hashed_split, with method=HASHED_SPLIT), but
+    the result is reused for the same dataset and settings.
+    """
+    def split():
+        if method == HASHED_SPLIT:
+            return hashed_split(df, test_size)
+        return split_features(df, test_size, random_state)
+
+    key = _split_cache_key(df, test_size, random_state, method)
+    if key is None:
+        return split()
+
+    result = _split_cache.get(key)
+    if result is MISSING:
+        result = split()
+        _split_cache.put(key, result)
+    return result
+
+
+def fitted_preprocessor(df, model_type='LogisticRegression', test_size=0.2, random_state=42, compact=False):
+    """
+    Returns (preprocessor, X_train_transformed): the preprocessing step for
+    this model type, fitted on the training split, and the transformed
+    training rows. Model types that need the same preprocessing (e.g.
+    LogisticRegression, DecisionTree and RandomForest) share one cached copy.
+    """
+    X_train, X_test, y_train, y_test = cached_split(df, test_size, random_state)
+    split_key = _split_cache_key(df, test_size, random_state)
+    key = (split_key, preprocessor_kind(model_type, compact))
+
+    cached = _preprocessor_cache.get(key) if split_key is not None else MISSING
+    if cached is MISSING:
+        numerical_features, categorical_features = get_feature_lists()
+        preprocessor = create_preprocessor(numerical_features, categorical_features, model_type, compact=compact)
+        cached = (preprocessor, preprocessor.fit_transform(X_train))
+        if split_key is not None:
+            _preprocessor_cache.put(key, cached)
+    return cached
+
+
+def train_model(df, model_type='LogisticRegression', test_size=0.2, n_jobs=None, random_state=42, compact=False):
+    """
+    Splits the dataset and trains a pipeline, reusing the cached split and
+    fitted preprocessing when the dataset and test_size have not changed.
+
+    - compact : use the memory-saving float32 / sparse preprocessing (see pipeline.py)
+
+    The returned pipeline shares its fitted preprocessor with other pipelines
+    trained on the same split, so it should not be fitted again (clone it first).
+
+    Returns:
+    - pipeline, X_train, X_test, y_train, y_test
+    """
+    X_train, X_test, y_train, y_test = cached_split(df, test_size, random_state)
+    preprocessor, X_train_transformed = fitted_preprocessor(df, model_type, test_size, random_state, compact)
+
+    numerical_features, categorical_features = get_feature_lists()
+    model = create_model(model_type, numerical_features, categorical_features, n_jobs=n_jobs)
+    model.fit(X_train_transformed, y_train)
+
+    # Back to one core for predictions (see train_pipeline)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+
+    pipeline = Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('model', model)
+    ])
+    return pipeline, X_train, X_test, y_train, y_test
+
+
+# ── Out-of-core training ───────────────────────────────────────────────────
+class StratifiedReservoir:
+    """
+    Keeps a uniform random sample of at most 'sample_size' rows from a stream
+    of chunks, with the same churn rate as the whole stream.
+
+    Every row gets a random number; per class we keep the rows with the
+    smallest numbers seen so far (a uniform sample of that class). At the end
+    each class gets its share of the sample, in proportion to how often it
+    appeared. Memory stays around sample_size rows per class.
+    """
+
+    def __init__(self, sample_size, random_state=42):
+        self.sample_size = sample_size
+        self.random = np.random.default_rng(random_state)
+        self.kept = {}       # class → (rows, random numbers)
+        self.seen = {}       # class → rows seen
+
+    def add(self, rows, labels):
+        keys = self.random.random(len(rows))
+        labels = np.asarray(labels)
+        for label in np.unique(labels):
+            is_label = labels == label
+            self.seen[label] = self.seen.get(label, 0) + int(is_label.sum())
+            new_rows, new_keys = rows[is_label], keys[is_label]
+            if label in self.kept:
+                old_rows, old_keys = self.kept[label]
+                new_rows, new_keys = pd.concat([old_rows, new_rows]), np.concatenate([old_keys, new_keys])
+            if len(new_keys) > self.sample_size:
+                smallest = np.argpartition(new_keys, self.sample_size)[:self.sample_size]
+                new_rows, new_keys = new_rows.iloc[smallest], new_keys[smallest]
+            self.kept[label] = (new_rows, new_keys)
+
+    def sample(self):
+        """ The sample as one DataFrame (rows of every class, in random order). """
+        total = sum(self.seen.values())
+        parts = []
+        for label, (rows, keys) in self.kept.items():
+            share = max(1, round(self.sample_size * self.seen[label] / total)) if total > self.sample_size \
+                else len(rows)
+            smallest = np.argsort(keys)[:share]
+            parts.append((rows.iloc[smallest], keys[smallest]))
+        if len(parts) == 0:
+            return pd.DataFrame()
+        rows = pd.concat([part_rows for part_rows, _ in parts])
+        order = np.argsort(np.concatenate([part_keys for _, part_keys in parts]))
+        return rows.iloc[order]
+
+
+def peak_memory_mb():
+    """ The most memory this process has used so far (in MB), or None where unsupported. """
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def train_out_of_core(source, model_type='LogisticRegression', test_size=0.2, sample_size=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE, n_jobs=None, random_state=42, compact=False, progress=None):
+    """
+    Trains a pipeline without ever holding the whole dataset in memory.
+
+    1. Stream the data (see data_loader.iter_labelled_chunks) and split every
+       chunk by hashed PlayerID (hashed_test_mask). Training rows are kept:
+       all of them, or a stratified random sample of 'sample_size' rows
+    2. Fit the pipeline on the kept training rows
+
+    NOTE: the fit itself is NOT out of core. With sample_size=None every
+    training row is kept, so the memory needed grows with the file; give a
+    sample_size for files that do not fit in memory.
+    3. Stream the data again and score the test rows chunk by chunk; only
+       their labels and churn probabilities are kept for the metrics
+
+    - source   : CSV path / upload, cached .feather file, or a DataFrame
+    - progress : optional function(stage, fraction) called along the way
+
+    Returns (pipeline, report). The report has the metrics, row counts,
+    wall time per phase and the process's peak memory in MB.
+    """
+    def report_progress(stage, fraction):
+        if progress is not None:
+            progress(stage, fraction)
+
+    start = time.perf_counter()
+    reservoir = StratifiedReservoir(sample_size, random_state) if sample_size else None
+    kept_chunks = []
+    rows_seen = train_rows = test_rows = 0
+
+    report_progress("Streaming and splitting the data", 0.05)
+    for chunk in iter_labelled_chunks(source, chunk_size):
+        is_test = hashed_test_mask(chunk, test_size, first_row=rows_seen)
+        rows_seen += len(chunk)
+        test_rows += int(is_test.sum())
+        train_chunk = chunk[is_test == False]
+        train_rows += len(train_chunk)
+        if reservoir is not None:
+            reservoir.add(train_chunk, train_chunk['Churn'])
+        else:
+            kept_chunks.append(train_chunk)
+    if train_rows == 0 or test_rows == 0:
+        raise ValueError("Not enough rows to train and test on")
+
+    training_data = reservoir.sample() if reservoir is not None else pd.concat(kept_chunks)
+    del kept_chunks
+    read_seconds = time.perf_counter() - start
+
+    report_progress(f"Fitting on {len(training_data):,} rows", 0.3)
+    fit_start = time.perf_counter()
+    pipeline = train_pipeline(training_data.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore'),
+                              training_data['Churn'], model_type, n_jobs=n_jobs, compact=compact)
+    fitted_rows = len(training_data)
+    del training_data
+    fit_seconds = time.perf_counter() - fit_start
+
+    report_progress("Scoring the test rows", 0.8)
+    evaluation_start = time.perf_counter()
+    labels, probabilities = [], []
+    first_row = 0
+    for chunk in iter_labelled_chunks(source, chunk_size):
+        test_chunk = chunk[hashed_test_mask(chunk, test_size, first_row=first_row)]
+        first_row += len(chunk)
+        if len(test_chunk):
+            probabilities.append(pipeline.predict_proba(test_chunk.drop(NON_FEATURE_COLUMNS, axis=1,
+                                                                        errors='ignore'))[:, 1])
+            labels.append(test_chunk['Churn'].to_numpy())
+    metrics, _ = metrics_from_probabilities(np.concatenate(labels), np.concatenate(probabilities))
+    evaluation_seconds = time.perf_counter() - evaluation_start
+
+    report = {
+        'metrics': metrics,
+        'rows_seen': rows_seen,
+        'train_rows': train_rows,
+        'fitted_rows': fitted_rows,
+        'test_rows': test_rows,
+        'read_seconds': read_seconds,
+        'fit_seconds': fit_seconds,
+        'evaluation_seconds': evaluation_seconds,
+        'wall_seconds': time.perf_counter() - start,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+    return pipeline, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train a churn model out of core (streamed, optionally sampled).")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--model-type", default="LogisticRegression",
+                        help="LogisticRegression, DecisionTree, RandomForest, HistGradientBoosting or SGDLogistic")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--sample-size", type=int, default=None,
+                        help="Train on a stratified random sample of this many training rows. "
+                             "Without it ALL training rows are loaded into memory for the fit")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--compact", action="store_true", help="Use the float32 / sparse preprocessing")
+    parser.add_argument("--register", action="store_true", help="Save the model in the model registry")
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline, report = train_out_of_core(args.dataset, args.model_type, args.test_size, args.sample_size,
+                                             args.chunk_size, n_jobs=-1, compact=args.compact)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    print(f"{args.model_type}: fitted on {report['fitted_rows']:,} of {report['train_rows']:,} training rows, "
+          f"tested on {report['test_rows']:,}")
+    print("  " + "  ".join(f"{name} {value:.3f}" for name, value in report['metrics'].items()))
+    print(f"  read {report['read_seconds']:.1f}s · fit {report['fit_seconds']:.1f}s · "
+          f"evaluate {report['evaluation_seconds']:.1f}s · total {report['wall_seconds']:.1f}s")
+    if report['peak_memory_mb'] is not None:
+        print(f"  peak memory {report['peak_memory_mb']:.0f} MB")
+
+    if args.register:
+        from src.model_registry import register_model
+        numerical_features, categorical_features = get_feature_lists()
+        metadata = register_model(
+            pipeline, args.model_type, numerical_features, categorical_features, metrics=report['metrics'],
+            extra_metadata={"test_size": args.test_size, "split": HASHED_SPLIT, "train_rows": report['train_rows'],
+                            "sample_rows": report['fitted_rows'], "compact_features": args.compact}
+        )
+        print(f"Registered model {metadata['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+tuning.py
+---------
+Hyperparameter search across our model types, using every CPU core.
+
+We use Successive Halving (scikit-learn's HalvingRandomSearchCV):
+1. Try many random settings on a SMALL sample of the data
+2. Keep the best third, give them three times more data
+3. Repeat until the survivors are trained on the full training set
+Bad settings are thrown out early and cheaply, so the search is far faster
+than trying every setting on all the data.
+
+Cross-validation folds and candidates are trained in parallel (n_jobs=-1).
+A time budget stops the search from starting new model types once the time
+is used up. In the app the search runs as a background job (see jobs.py),
+which reports progress and can be cancelled between model types.
+
+Command line:
+    python -m src.tuning data/online_gaming_behavior_dataset.csv --budget 300
+"""
+
+import argparse
+import math
+import time
+
+import pandas as pd
+from scipy.stats import loguniform, randint
+
+# HalvingRandomSearchCV is still marked experimental in scikit-learn
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+
+from src.data_loader import get_feature_lists, load_data
+from src.pipeline import create_pipeline
+from src.training import NON_FEATURE_COLUMNS
+
+# The settings we search for each model type (names follow the pipeline steps)
+SEARCH_SPACES = {
+    'LogisticRegression': {
+        'model__C': loguniform(1e-3, 1e2),
+    },
+    'DecisionTree': {
+        'model__max_depth': randint(2, 20),
+        'model__min_samples_leaf': randint(1, 100),
+    },
+    'RandomForest': {
+        'model__n_estimators': randint(50, 300),
+        'model__max_depth': randint(4, 20),
+        'model__min_samples_leaf': randint(1, 50),
+        'model__max_features': ['sqrt', 'log2', 0.5],
+    },
+    'HistGradientBoosting': {
+        'model__learning_rate': loguniform(0.02, 0.3),
+        'model__max_leaf_nodes': randint(8, 64),
+        'model__min_samples_leaf': randint(10, 200),
+        'model__l2_regularization': loguniform(1e-4, 10),
+    },
+}
+
+DEFAULT_TIME_BUDGET_SECONDS = 300
+DEFAULT_CANDIDATES = 24
+
+# Each round keeps 1 / HALVING_FACTOR of the candidates and gives them
+# HALVING_FACTOR times more rows
+HALVING_FACTOR = 3
+
+# The first round never uses fewer rows than this (tiny samples can contain
+# only one class, which makes the scores meaningless)
+MIN_ROWS_FIRST_ROUND = 1000
+
+
+def tune_models(X, y, model_types=None, time_budget_seconds=DEFAULT_TIME_BUDGET_SECONDS,
+                n_candidates=DEFAULT_CANDIDATES, folds=3, scoring='roc_auc', n_jobs=-1, random_state=42,
+                progress=None):
+    """
+    Runs a successive-halving search for each model type.
+
+    Parameters:
+    - X, y                : training features and churn labels
+    - model_types         : which models to tune (default: all in SEARCH_SPACES)
+    - time_budget_seconds : no new model type is started after this much time
+    - n_candidates        : random settings tried per model type in the first round
+    - folds               : cross-validation folds per candidate
+    - n_jobs              : CPU cores to use (-1 = all)
+    - progress            : optional function(stage, fraction) called before
+                            each model type (it may raise to stop the search)
+
+    Returns:
+    - results : a DataFrame, one row per model type, best first
+                (best score, best settings, fit time, candidates tried, status)
+    - best_pipelines : {model_type: best pipeline, refitted on all of X}
+    """
+    model_types = model_types or list(SEARCH_SPACES)
+    numerical_features, categorical_features = get_feature_lists()
+
+    start = time.perf_counter()
+    rows = []
+    best_pipelines = {}
+    for index, model_type in enumerate(model_types):
+        if progress is not None:
+            progress(f"Tuning {model_type} ({index + 1} of {len(model_types)})", index / len(model_types))
+        elapsed = time.perf_counter() - start
+        if elapsed >= time_budget_seconds:
+            rows.append({'Model': model_type, 'Status': 'skipped (time budget used up)'})
+            continue
+
+        # Enough rounds to narrow n_candidates down to one, ending on all rows
+        rounds = 1 + int(math.floor(math.log(n_candidates, HALVING_FACTOR)))
+        min_rows = max(MIN_ROWS_FIRST_ROUND, len(X) // HALVING_FACTOR ** (rounds - 1))
+
+        search = HalvingRandomSearchCV(
+            create_pipeline(numerical_features, categorical_features, model_type=model_type),
+            SEARCH_SPACES[model_type],
+            n_candidates=n_candidates,
+            factor=HALVING_FACTOR,
+            resource='n_samples',
+            min_resources=min(min_rows, len(X)),
+            cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state),
+            scoring=scoring,
+            n_jobs=n_jobs,
+            random_state=random_state,
+        )
+        search_start = time.perf_counter()
+        search.fit(X, y)
+
+        best_pipelines[model_type] = search.best_estimator_
+        rows.append({
+            'Model': model_type,
+            'Best Score': float(search.best_score_),
+            'Best Settings': {name.replace('model__', ''): value for name, value in search.best_params_.items()},
+            'Candidates': int(search.n_candidates_[0]),
+            'Rounds': int(search.n_iterations_),
+            'Search Time (s)': round(time.perf_counter() - search_start, 2),
+            'Status': 'done',
+        })
+
+    results = pd.DataFrame(rows)
+    if 'Best Score' in results.columns:
+        results = results.sort_values('Best Score', ascending=False, na_position='last').reset_index(drop=True)
+    return results, best_pipelines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune every model type with successive halving.")
+    parser.add_argument("dataset", help="Labelled CSV (with EngagementLevel)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_TIME_BUDGET_SECONDS,
+                        help="Time budget in seconds")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--models", nargs="*", default=None, help="Model types to tune (default: all)")
+    args = parser.parse_args(argv)
+
+    df = load_data(args.dataset)
+    if df is None:
+        raise SystemExit(f"Could not load {args.dataset}")
+
+    X = df.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
+    results, _ = tune_models(X, df['Churn'], args.models, args.budget, args.candidates)
+    print(results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Checks the request coalescer: batched answers equal predict_proba, and one
+bad request never fails the others in its batch.
+"""
+
+import pytest
+
+from src.coalescer import RequestCoalescer
+from src.data_loader import load_data
+from src.training import train_model
+
+
+@pytest.fixture(scope="module")
+def trained():
+    df = load_data('data/online_gaming_behavior_dataset.csv', use_cache=False)
+    pipeline, _, X_test, _, _ = train_model(df, 'HistGradientBoosting')
+    return pipeline, X_test.head(20)
+
+
+def test_batched_answers_match_predict_proba(trained):
+    pipeline, X = trained
+    coalescer = RequestCoalescer(pipeline, max_wait_seconds=0.05)
+    futures = [coalescer.submit(record) for record in X.to_dict('records')]
+
+    expected = pipeline.predict_proba(X)[:, 1]
+    assert [future.result(10) for future in futures] == pytest.approx(list(expected))
+
+
+def test_a_bad_request_fails_alone(trained):
+    pipeline, X = trained
+    records = X.head(3).to_dict('records')
+    records[1] = dict(records[1], Age="abc")
+    coalescer = RequestCoalescer(pipeline, max_wait_seconds=0.05)
+    # Pretend the last batch was big, so the three requests wait for each other
+    coalescer.last_batch_size = 3
+    futures = [coalescer.submit(record) for record in records]
+
+    assert futures[0].result(10) == pytest.approx(pipeline.predict_proba(X.head(1))[0, 1])
+    assert futures[2].result(10) == pytest.approx(pipeline.predict_proba(X.iloc[2:3])[0, 1])
+    with pytest.raises(Exception):
+        futures[1].result(10)
@@ -0,0 +1,79 @@
+"""
+Checks that both ways of reading a CSV (load_data all at once, iter_data in
+chunks) give the same typed data.
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from src.data_loader import iter_data, load_data
+
+DATASET = 'data/online_gaming_behavior_dataset.csv'
+
+
+def csv_text(change=None):
+    """ The bundled dataset as CSV text, after change(raw DataFrame) if given. """
+    raw = pd.read_csv(DATASET)
+    if change is not None:
+        change(raw)
+    buffer = io.StringIO()
+    raw.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def both_paths(text, chunksize=7_000):
+    """ (load_data result, iter_data chunks put back together) for the same CSV text. """
+    loaded = load_data(io.StringIO(text), use_cache=False)
+    streamed = pd.concat(iter_data(io.StringIO(text), chunksize))
+    return loaded, streamed
+
+
+def test_both_paths_agree():
+    loaded, streamed = both_paths(csv_text())
+
+    assert dict(loaded.dtypes) == dict(streamed.dtypes)
+    assert loaded.equals(streamed)
+    # Small integer types and categoricals, not int64 / object
+    assert loaded['Age'].dtype.itemsize < 8
+    assert isinstance(loaded['GameGenre'].dtype, pd.CategoricalDtype)
+
+
+def test_a_blank_integer_cell_is_read_as_missing():
+    def blank_age(raw):
+        raw.loc[5, 'Age'] = None
+
+    loaded, streamed = both_paths(csv_text(blank_age))
+
+    assert dict(loaded.dtypes) == dict(streamed.dtypes)
+    assert loaded['Age'].isna().sum() == streamed['Age'].isna().sum() == 1
+    assert loaded.equals(streamed)
+
+
+@pytest.mark.parametrize("chunksize", [1_000, 50_000])
+def test_chunks_are_numbered_like_read_csv(chunksize):
+    chunks = list(iter_data(DATASET, chunksize))
+    assert [len(chunk) for chunk in chunks[:-1]] == [chunksize] * (len(chunks) - 1)
+    assert pd.concat(chunks).index.equals(pd.RangeIndex(sum(len(chunk) for chunk in chunks)))
+
+
+def test_unknown_categories_are_kept_and_decided_once_per_stream():
+    def new_location(raw):
+        # Only a late chunk has it
+        raw.loc[35_000, 'Location'] = 'Oceania'
+
+    text = csv_text(new_location)
+    with pytest.warns(UserWarning) as warned:
+        chunks = list(iter_data(io.StringIO(text), 5_000))
+    assert len([warning for warning in warned if 'Oceania' in str(warning.message)]) == 1
+
+    # Every chunk has the same, widened categories, so they concatenate as a categorical
+    categories = {tuple(chunk['Location'].cat.categories) for chunk in chunks}
+    assert len(categories) == 1 and 'Oceania' in categories.pop()
+    streamed = pd.concat(chunks)
+    assert streamed['Location'].isna().sum() == 0
+
+    with pytest.warns(UserWarning, match='Oceania'):
+        loaded = load_data(io.StringIO(text), use_cache=False)
+    assert loaded.equals(streamed)
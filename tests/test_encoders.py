@@ -0,0 +1,93 @@
+"""
+Checks the fixed-vocabulary encoders: codes and strings give the same
+answer, and values outside the vocabulary are never silently lost.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.encoders import CodeOneHotEncoder, CodeOrdinalEncoder, category_codes
+
+VOCABULARY = [['Easy', 'Medium', 'Hard'], ['Male', 'Female']]
+
+
+def players(difficulty, gender, categorical=True):
+    """ A two-column frame, stored as categoricals with the vocabulary (like load_data) or as strings. """
+    frame = pd.DataFrame({'GameDifficulty': difficulty, 'Gender': gender})
+    if categorical:
+        for column, values in zip(frame.columns, VOCABULARY):
+            frame[column] = pd.Categorical(frame[column], categories=values)
+    return frame
+
+
+def test_codes_from_categoricals_and_strings_agree():
+    values = ['Hard', 'Easy', 'Medium', 'Hard']
+    as_category = pd.Series(pd.Categorical(values, categories=VOCABULARY[0]))
+    other_order = pd.Series(pd.Categorical(values, categories=['Medium', 'Hard', 'Easy']))
+
+    expected = [2, 0, 1, 2]
+    assert category_codes(as_category, VOCABULARY[0]).tolist() == expected
+    assert category_codes(other_order, VOCABULARY[0]).tolist() == expected
+    assert category_codes(np.array(values, dtype=object), VOCABULARY[0]).tolist() == expected
+    assert category_codes(['Extreme', None], VOCABULARY[0]).tolist() == [-1, -1]
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_one_hot_encoding(categorical):
+    train = players(['Easy', 'Hard', 'Medium'], ['Male', 'Female', 'Male'], categorical)
+    encoder = CodeOneHotEncoder(VOCABULARY).fit(train)
+
+    assert encoder.transform(train).tolist() == [[1, 0, 0, 1, 0], [0, 0, 1, 0, 1], [0, 1, 0, 1, 0]]
+    assert encoder.get_feature_names_out().tolist() == [
+        'GameDifficulty_Easy', 'GameDifficulty_Medium', 'GameDifficulty_Hard', 'Gender_Male', 'Gender_Female']
+
+    # Unknown values at predict time: all-zero columns, like handle_unknown='ignore'
+    new = players(['Extreme'], ['Female'], categorical=False)
+    assert encoder.transform(new).tolist() == [[0, 0, 0, 0, 1]]
+    sparse = CodeOneHotEncoder(VOCABULARY, sparse_output=True).fit(train)
+    assert (sparse.transform(new).toarray() == encoder.transform(new)).all()
+
+
+def test_ordinal_encoding_turns_unknown_values_into_nan():
+    train = players(['Easy', 'Hard'], ['Male', 'Female'])
+    encoder = CodeOrdinalEncoder(VOCABULARY).fit(train)
+
+    assert encoder.transform(train).tolist() == [[0, 0], [2, 1]]
+    encoded = encoder.transform(players(['Extreme'], ['Male'], categorical=False))
+    assert np.isnan(encoded[0, 0]) and encoded[0, 1] == 0
+
+
+@pytest.mark.parametrize("encoder_class", [CodeOneHotEncoder, CodeOrdinalEncoder])
+def test_unknown_training_values_are_learned_with_a_warning(encoder_class):
+    train = players(['Easy', 'Extreme', 'Hard'], ['Male', 'Female', 'Male'], categorical=False)
+
+    with pytest.warns(UserWarning, match="'GameDifficulty' has values outside its vocabulary"):
+        encoder = encoder_class(VOCABULARY).fit(train)
+
+    # That column learns its categories (sorted), the other keeps the vocabulary
+    assert encoder.categories_[0].tolist() == ['Easy', 'Extreme', 'Hard']
+    assert encoder.categories_[1].tolist() == ['Male', 'Female']
+    encoded = encoder.transform(train)
+    if encoder_class is CodeOneHotEncoder:
+        assert encoded[:, :3].tolist() == [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    else:
+        assert encoded[:, 0].tolist() == [0, 1, 2]
+
+
+def test_missing_values_are_not_unknown_categories():
+    train = players(['Easy', None, 'Hard'], ['Male', 'Female', None], categorical=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        encoder = CodeOneHotEncoder(VOCABULARY).fit(train)
+
+    assert encoder.categories_[0].tolist() == VOCABULARY[0]
+    assert encoder.transform(train)[1, :3].tolist() == [0, 0, 0]
+
+
+def test_wrong_number_of_columns_is_an_error():
+    with pytest.raises(ValueError, match="2 vocabularies but got 1 columns"):
+        CodeOneHotEncoder(VOCABULARY).fit(pd.DataFrame({'GameDifficulty': ['Easy']}))
@@ -0,0 +1,61 @@
+"""
+Checks that threshold_sweep agrees with sklearn's metrics at every threshold.
+"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import (average_precision_score, f1_score, precision_score, recall_score,
+                             roc_auc_score)
+
+from src.evaluation import threshold_sweep
+from src.thresholds import churn_labels
+
+
+def random_scores(seed, rows=500, zeros=0):
+    """ Labels and rounded probabilities (rounding creates ties), the first 'zeros' set to exactly 0. """
+    rng = np.random.default_rng(seed)
+    y_test = rng.integers(0, 2, rows)
+    y_prob = np.round(np.clip(rng.normal(0.3 + 0.4 * y_test, 0.2), 0, 1), 2)
+    y_prob[:zeros] = 0.0
+    return y_test, y_prob
+
+
+@pytest.mark.parametrize("zeros", [0, 25])
+def test_every_row_matches_sklearn(zeros):
+    y_test, y_prob = random_scores(seed=zeros, zeros=zeros)
+    curve = threshold_sweep(y_test, y_prob)['curve']
+
+    for row in curve.itertuples():
+        y_pred = churn_labels(y_prob, row.Threshold).astype(int)
+        assert row.TP == int(((y_pred == 1) & (y_test == 1)).sum())
+        assert row.FP == int(((y_pred == 1) & (y_test == 0)).sum())
+        assert row.Recall == pytest.approx(recall_score(y_test, y_pred))
+        assert row.Precision == pytest.approx(precision_score(y_test, y_pred, zero_division=1))
+        assert row.F1 == pytest.approx(f1_score(y_test, y_pred, zero_division=0))
+
+
+def test_first_row_selects_nobody_and_last_row_everybody():
+    y_test, y_prob = random_scores(seed=1, zeros=10)
+    curve = threshold_sweep(y_test, y_prob)['curve']
+
+    assert churn_labels(y_prob, curve['Threshold'].iloc[0]).sum() == 0
+    # Players with a probability of exactly 0 are included in the last row
+    assert churn_labels(y_prob, curve['Threshold'].iloc[-1]).all()
+    assert curve['TP'].iloc[-1] + curve['FP'].iloc[-1] == len(y_test)
+
+
+def test_areas_match_sklearn():
+    y_test, y_prob = random_scores(seed=2)
+    sweep = threshold_sweep(y_test, y_prob)
+
+    assert sweep['AUC'] == pytest.approx(roc_auc_score(y_test, y_prob))
+    assert sweep['Average Precision'] == pytest.approx(average_precision_score(y_test, y_prob))
+
+
+def test_best_cost_threshold_has_the_lowest_cost():
+    y_test, y_prob = random_scores(seed=3)
+    sweep = threshold_sweep(y_test, y_prob, false_positive_cost=1.0, false_negative_cost=5.0)
+
+    y_pred = churn_labels(y_prob, sweep['best_cost_threshold']['Threshold'])
+    cost = ((y_pred == 1) & (y_test == 0)).sum() * 1.0 + ((y_pred == 0) & (y_test == 1)).sum() * 5.0
+    assert cost == sweep['curve']['Cost'].min()
@@ -0,0 +1,69 @@
+"""
+Checks that the compiled single-player scorer gives the same churn
+probabilities as pipeline.predict_proba, and that a scorer that doesn't is
+never used.
+"""
+
+import numpy as np
+import pytest
+
+import src.fast_inference as fast_inference
+from src.data_loader import load_data
+from src.fast_inference import churn_probability, compile_pipeline, get_fast_scorer, verify_parity
+from src.training import train_model
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return load_data('data/online_gaming_behavior_dataset.csv', use_cache=False)
+
+
+@pytest.mark.parametrize("model_type", ['LogisticRegression', 'DecisionTree', 'RandomForest', 'SGDLogistic'])
+@pytest.mark.parametrize("compact", [False, True])
+def test_scorer_matches_predict_proba(dataset, model_type, compact):
+    pipeline, _, X_test, _, _ = train_model(dataset, model_type, compact=compact)
+    X_check = X_test.head(300)
+
+    ok, difference = verify_parity(pipeline, X_check)
+    assert ok, f"largest difference {difference}"
+
+    scorer = get_fast_scorer(pipeline)
+    assert scorer is not None
+    player = X_check.iloc[0].to_dict()
+    assert churn_probability(pipeline, player) == pytest.approx(pipeline.predict_proba(X_check.head(1))[0, 1],
+                                                                abs=1e-6)
+
+
+def test_unsupported_pipelines_fall_back_to_predict_proba(dataset):
+    pipeline, _, X_test, _, _ = train_model(dataset, 'HistGradientBoosting')
+    assert get_fast_scorer(pipeline) is None
+    player = X_test.iloc[0].to_dict()
+    assert churn_probability(pipeline, player) == pytest.approx(pipeline.predict_proba(X_test.head(1))[0, 1])
+
+
+def test_parity_check_catches_a_wrong_scorer(dataset):
+    pipeline, _, X_test, _, _ = train_model(dataset, 'LogisticRegression')
+    scorer = compile_pipeline(pipeline)
+    # The model changes after it was compiled: the scorer is now out of date
+    pipeline.named_steps['model'].intercept_ = pipeline.named_steps['model'].intercept_ + 1.0
+    try:
+        ok, difference = verify_parity(pipeline, X_test.head(100), scorer)
+        assert ok == False and difference > 0.01
+    finally:
+        pipeline.named_steps['model'].intercept_ = pipeline.named_steps['model'].intercept_ - 1.0
+
+
+def test_a_scorer_that_fails_the_check_is_not_used(dataset, monkeypatch):
+    pipeline, _, X_test, _, _ = train_model(dataset, 'DecisionTree')
+    real_compile = fast_inference.compile_pipeline
+
+    def compile_wrongly(pipeline, check_rows=None):
+        scorer = real_compile(pipeline)
+        scorer.churn_probabilities = lambda records: np.zeros(len(records))
+        return scorer
+
+    monkeypatch.setattr(fast_inference, 'compile_pipeline', compile_wrongly)
+    assert get_fast_scorer(pipeline) is None
+    # Scoring still works, through predict_proba
+    player = X_test.iloc[0].to_dict()
+    assert churn_probability(pipeline, player) == pytest.approx(pipeline.predict_proba(X_test.head(1))[0, 1])
@@ -0,0 +1,79 @@
+"""
+Checks the plan cache: equivalent requests share a key, old plans expire
+(TTL) and the least recently used plans are evicted above max_entries.
+"""
+
+import pytest
+
+import src.plan_cache as plan_cache
+from src.plan_cache import PlanCache, plan_cache_key
+
+
+class FakeClock:
+    """ Stands in for time.time, so the tests decide how much time goes by. """
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(plan_cache.time, 'time', clock)
+    return clock
+
+
+PLAYER = {'Age': 25, 'PlayTimeHours': 12.3, 'SessionsPerWeek': 4, 'GameGenre': 'Action'}
+
+
+def test_equivalent_requests_share_a_key():
+    strategies = [{'id': 'b'}, {'id': 'a'}]
+    key = plan_cache_key(PLAYER, 0.73, strategies, 'model-1')
+    # Strategy order and a probability in the same band don't matter
+    assert key == plan_cache_key(PLAYER, 0.71, list(reversed(strategies)), 'model-1')
+    assert key != plan_cache_key(PLAYER, 0.73, strategies, 'model-2')
+    assert key != plan_cache_key(PLAYER, 0.93, strategies, 'model-1')
+
+
+def test_plans_expire_after_the_ttl(clock):
+    cache = PlanCache(':memory:', ttl_seconds=60)
+    cache.put('key', {'plan': 'Send a quest reward'})
+
+    clock.now += 59
+    assert cache.get('key') == {'plan': 'Send a quest reward'}
+
+    clock.now += 2
+    assert cache.get('key') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_plans_are_evicted(clock):
+    cache = PlanCache(':memory:', max_entries=2)
+    cache.put('a', 'plan a')
+    clock.now += 1
+    cache.put('b', 'plan b')
+    clock.now += 1
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') == 'plan a'
+    clock.now += 1
+    cache.put('c', 'plan c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'plan a'
+    assert cache.get('c') == 'plan c'
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_clear_resets_the_counters():
+    cache = PlanCache(':memory:')
+    cache.put('a', 'plan a')
+    cache.get('a')
+    cache.get('missing')
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0, 'size': 0,
+                             'max_entries': cache.max_entries}
@@ -0,0 +1,72 @@
+"""
+Checks the scoring service's request validation: bad players and oversized
+batches are turned away before anything is scored.
+"""
+
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.data_loader import get_feature_lists, load_data
+from src.service import ScoringService
+from src.training import train_model
+
+
+@pytest.fixture(scope="module")
+def service():
+    df = load_data('data/online_gaming_behavior_dataset.csv', use_cache=False)
+    pipeline, _, X_test, _, _ = train_model(df, 'LogisticRegression')
+    numerical_features, categorical_features = get_feature_lists()
+    service = ScoringService(pipeline, {"features": {"numerical": numerical_features,
+                                                     "categorical": categorical_features}},
+                             warm_up_index=False, max_players_per_request=5)
+    # A valid player, with plain Python values (as they come out of JSON)
+    service.example_player = {name: value.item() if hasattr(value, 'item') else value
+                              for name, value in X_test.iloc[0].to_dict().items()}
+    return service
+
+
+def post(service, path, body):
+    """ Sends one request to the service; returns (status, JSON answer). """
+    async def send():
+        async with TestClient(TestServer(service.create_app())) as client:
+            response = await client.post(path, json=body)
+            return response.status, await response.json()
+    return asyncio.run(send())
+
+
+def test_valid_player_passes(service):
+    assert service.check_player(service.example_player) is None
+
+
+@pytest.mark.parametrize("feature, value", [
+    ('Age', "abc"), ('Age', None), ('Age', True), ('Age', float('nan')), ('Age', float('inf')),
+    ('Gender', 3), ('Location', None),
+])
+def test_bad_values_are_rejected(service, feature, value):
+    error = service.check_player(dict(service.example_player, **{feature: value}))
+    assert feature in error
+
+
+def test_missing_features_and_non_objects_are_rejected(service):
+    player = dict(service.example_player)
+    del player['Age']
+    assert "Missing features: Age" == service.check_player(player)
+    assert service.check_player([1, 2, 3]) is not None
+
+
+def test_bad_player_in_a_batch_is_named(service):
+    status, answer = post(service, '/score/batch', {"players": [service.example_player,
+                                                                dict(service.example_player, Age="x")]})
+    assert status == 400
+    assert answer['error'].startswith("players[1]:")
+
+
+def test_batch_size_limit(service):
+    status, answer = post(service, '/score/batch', {"players": [service.example_player] * 5})
+    assert status == 200 and len(answer['results']) == 5
+
+    status, answer = post(service, '/score/batch', {"players": [service.example_player] * 6})
+    assert status == 413
+    assert "Too many players" in answer['error']
@@ -0,0 +1,68 @@
+"""
+Checks the hashed train/test split (it must never change between runs,
+chunk sizes or row orders) and the chunks out-of-core training reads.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+from src.data_loader import iter_labelled_chunks, load_data
+from src.training import hashed_test_mask, train_out_of_core
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return load_data('data/online_gaming_behavior_dataset.csv', use_cache=False)
+
+
+def test_test_players_never_change():
+    # Pinned: a different answer here means models trained before and after
+    # the change were tested on different players
+    players = pd.DataFrame({'PlayerID': np.arange(9000, 9040)})
+    test_players = players['PlayerID'][hashed_test_mask(players, 0.2)]
+    assert test_players.tolist() == [9002, 9005, 9007, 9010, 9011, 9014, 9019, 9021, 9022, 9027, 9031]
+
+
+def test_rows_without_player_ids_are_split_by_position():
+    rows = pd.DataFrame({'Age': np.zeros(40)})
+    positions = np.flatnonzero(hashed_test_mask(rows, 0.2, first_row=100)) + 100
+    assert positions.tolist() == [100, 105, 106, 109, 112, 118, 120, 124, 125, 135, 138]
+
+
+def test_split_does_not_depend_on_chunks_or_order(dataset):
+    whole = hashed_test_mask(dataset, 0.2)
+
+    chunked = np.concatenate([hashed_test_mask(dataset.iloc[start:start + 7000], 0.2)
+                              for start in range(0, len(dataset), 7000)])
+    assert (chunked == whole).all()
+
+    shuffled = dataset.sample(frac=1.0, random_state=0)
+    assert (hashed_test_mask(shuffled, 0.2) == pd.Series(whole, index=dataset.index)[shuffled.index]).all()
+
+
+def test_test_share_is_close_to_test_size(dataset):
+    for test_size in (0.1, 0.2, 0.3):
+        assert hashed_test_mask(dataset, test_size).mean() == pytest.approx(test_size, abs=0.01)
+
+
+def test_feather_files_are_read_in_chunks_of_chunksize(dataset, tmp_path):
+    path = tmp_path / 'players.feather'
+    # Record batches of 10,000 rows, read in chunks of 15,000
+    feather.write_feather(dataset, path, chunksize=10_000)
+
+    chunks = list(iter_labelled_chunks(str(path), 15_000))
+    assert [len(chunk) for chunk in chunks][:-1] == [15_000] * (len(chunks) - 1)
+    assert chunks[1].index[0] == 15_000
+    assert pd.concat(chunks).equals(dataset.reset_index(drop=True))
+
+
+def test_out_of_core_training_uses_every_row_once(dataset):
+    _, report = train_out_of_core(dataset, 'LogisticRegression', 0.2, sample_size=5_000, chunk_size=6_000)
+
+    assert report['rows_seen'] == len(dataset)
+    assert report['train_rows'] + report['test_rows'] == len(dataset)
+    assert report['test_rows'] == hashed_test_mask(dataset, 0.2).sum()
+    assert report['fitted_rows'] == pytest.approx(5_000, abs=2)
+    assert report['metrics']['AUC'] > 0.8